@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class AIOverloaded(Exception):
+    """Raised when an AI request cannot get a slot in time"""
+
+
+class Slot:
+    """A held slot; `release_after` keeps it held past the block until work it started is done"""
+
+    def __init__(self):
+        self.pending = None
+
+    def release_after(self, future):
+        self.pending = future
+
+
+class ConcurrencyLimiter:
+    """
+    Global and per-user caps on concurrent AI calls.
+
+    Callers beyond the caps wait in a bounded queue; when the queue is full,
+    or a caller has waited longer than `queue_timeout`, AIOverloaded is raised.
+    """
+
+    def __init__(self, global_limit: int, per_user_limit: int, max_queue: int, queue_timeout: float):
+        self.global_limit = global_limit
+        self.per_user_limit = per_user_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._global = asyncio.Semaphore(global_limit)
+        self._users = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.counters = {"completed": 0, "failed": 0, "rejected": 0, "timed_out": 0}
+        self._wait_total = 0.0
+        self._acquired_total = 0
+
+    def _user_semaphore(self, user_id: str):
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = [asyncio.Semaphore(self.per_user_limit), 0]
+        entry[1] += 1
+        return entry
+
+    def _release_user(self, user_id: str, entry):
+        entry[1] -= 1
+        if entry[1] == 0 and self._users.get(user_id) is entry:
+            del self._users[user_id]
+
+    def _release(self, user_id: str, user_entry):
+        self.in_flight -= 1
+        self._global.release()
+        if user_entry is not None:
+            user_entry[0].release()
+            self._release_user(user_id, user_entry)
+
+    async def _acquire(self, user_entry):
+        if user_entry is not None:
+            await user_entry[0].acquire()
+        try:
+            await self._global.acquire()
+        except BaseException:
+            if user_entry is not None:
+                user_entry[0].release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, user_id: str = None):
+        """Hold one AI slot for the duration of the block (and of any work passed to `release_after`)"""
+        if self.queued >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise AIOverloaded("The AI assistant is busy, please try again shortly")
+
+        user_entry = self._user_semaphore(user_id) if user_id else None
+        started = time.perf_counter()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._acquire(user_entry), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            if user_entry is not None:
+                self._release_user(user_id, user_entry)
+            raise AIOverloaded("Timed out waiting for the AI assistant")
+        except BaseException:
+            if user_entry is not None:
+                self._release_user(user_id, user_entry)
+            raise
+        finally:
+            self.queued -= 1
+
+        self._wait_total += time.perf_counter() - started
+        self._acquired_total += 1
+        self.in_flight += 1
+        slot = Slot()
+        try:
+            yield slot
+            self.counters["completed"] += 1
+        except BaseException:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            if slot.pending is not None and not slot.pending.done():
+                # A worker thread is still busy (e.g. the caller was cancelled); its slot is not free yet
+                slot.pending.add_done_callback(lambda _: self._release(user_id, user_entry))
+            else:
+                self._release(user_id, user_entry)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "active_users": len(self._users),
+            "global_limit": self.global_limit,
+            "per_user_limit": self.per_user_limit,
+            "avg_wait_ms": round(1000 * self._wait_total / self._acquired_total, 2) if self._acquired_total else 0.0,
+        }
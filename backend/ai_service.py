@@ -1,14 +1,76 @@
 from zhipuai import ZhipuAI
 from config import settings
+from singleflight import SingleFlight
+from ai_limiter import ConcurrencyLimiter, AIOverloaded
+from chat_cache import SemanticChatCache
+from cache import CacheEntry, LRUCache
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+_STREAM_END = object()
+
+LANGUAGE_NAMES = {
+    "en": "English",
+    "ms": "Malay",
+    "ur": "Urdu",
+    "id": "Indonesian"
+}
+
+EXPLAIN_VERSE_PROMPT = """Please explain this verse from the Holy Quran:
+
+Surah {surah_name} ({surah_number}), Ayat {ayat_number}
+
+Arabic: {arabic_text}
+Translation: {translation}
+
+Provide:
+1. Context and background of revelation (if known)
+2. Key themes and lessons
+3. Practical application in daily life
+4. Related verses if applicable
+
+Please structure your response clearly and keep it educational yet accessible. Respond in {language_name}."""
+
+HELP_INSTRUCTIONS = "\nProvide brief, helpful guidance for using the app feature."
+
+HELP_PROMPTS = {
+    "home": "Guide the user on how to start reading the Quran, explore features, and navigate the app.",
+    "reading": "Help the user understand how to read, listen to recitation, and use reading features.",
+    "search": "Explain how to search for verses, topics, and themes in the Quran.",
+    "bookmarks": "Guide on how to save, organize, and manage favorite verses.",
+    "prayer": "Explain prayer times feature and Qibla direction.",
+    "progress": "Help user understand their reading progress and streak."
+}
+
 class AIService:
     def __init__(self):
         self.client = ZhipuAI(api_key=settings.glm_api_key)
         # Using glm-4-plus - tested and working with current API key
         self.model = "glm-4-plus"
+        self.flight = SingleFlight()
+        # The ZhipuAI SDK is synchronous; completions run on this pool so the event loop stays free
+        self.executor = ThreadPoolExecutor(max_workers=settings.ai_max_concurrency, thread_name_prefix="glm")
+        self.limiter = ConcurrencyLimiter(
+            global_limit=settings.ai_max_concurrency,
+            per_user_limit=settings.ai_per_user_concurrency,
+            max_queue=settings.ai_max_queue,
+            queue_timeout=settings.ai_queue_timeout,
+        )
+        self.chat_cache = SemanticChatCache(
+            max_entries=settings.chat_cache_max_entries,
+            threshold=settings.chat_cache_threshold,
+        ) if settings.chat_cache_enabled else None
+        # Contextual help: (screen, language, help_prompt_version) -> text, and a short-lived cache for help with a query.
+        # Screens and languages are normalised to a closed set, so help_cache cannot grow past that.
+        self.help_cache = {}
+        self.help_query_cache = LRUCache(settings.help_query_cache_max_bytes)
         
         # AI Ustaz/Ustazah persona system prompt
         self.system_prompt = """You are a knowledgeable and patient Islamic teacher (Ustaz/Ustazah) helping Muslims learn and understand the Quran. You follow Malaysian Islamic guidelines (JAKIM/JAIS).
@@ -33,37 +95,85 @@ Your tone should be:
 - Respectful of different levels of Islamic knowledge
 """
 
-    async def chat(self, message: str, conversation_history: list = None, context: dict = None):
+    async def _complete(self, user_id: str = None, **kwargs):
+        """Run a chat completion off the event loop, within the concurrency limits"""
+        async with self.limiter.slot(user_id) as slot:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.executor,
+                functools.partial(self.client.chat.completions.create, model=self.model, **kwargs),
+            )
+            # A cancelled caller leaves the call running on its thread; keep the slot until it returns
+            slot.release_after(future)
+            return await asyncio.shield(future)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _chat_messages(self, message: str, conversation_history: list = None, context: dict = None,
+                       language: str = None) -> list:
+        """Build the prompt for a chat turn"""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if language in LANGUAGE_NAMES:
+            messages.append({"role": "system", "content": f"Respond in {LANGUAGE_NAMES[language]}."})
+        
+        # Add context if provided (e.g., current verse being read)
+        if context:
+            context_msg = self._format_context(context)
+            messages.append({"role": "system", "content": context_msg})
+        
+        # Add conversation history
+        if conversation_history:
+            messages.extend(conversation_history[-10:])  # Last 10 messages for context
+        
+        # Add current message
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    def _chat_cache_partition(self, conversation_history: list = None, context: dict = None, language: str = None):
+        """(language, context) partition for a cacheable turn, or None if the answer depends on the conversation"""
+        if self.chat_cache is None or len(conversation_history or []) > settings.chat_cache_max_history:
+            return None
+        # Answers about the ayah being read are not reusable; the screen alone is
+        if context and set(context) - {"screen"}:
+            return None
+        return (language if language in LANGUAGE_NAMES else "auto", self._format_context(context) if context else "")
+
+    async def chat(self, message: str, conversation_history: list = None, context: dict = None, user_id: str = None,
+                   language: str = None):
         """Chat with AI Ustaz/Ustazah"""
         try:
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            # Add context if provided (e.g., current verse being read)
-            if context:
-                context_msg = self._format_context(context)
-                messages.append({"role": "system", "content": context_msg})
-            
-            # Add conversation history
-            if conversation_history:
-                messages.extend(conversation_history[-10:])  # Last 10 messages for context
+            partition = self._chat_cache_partition(conversation_history, context, language)
+            if partition is not None:
+                cached = self.chat_cache.get(message, *partition)
+                if cached is not None:
+                    return {
+                        "success": True,
+                        "message": cached,
+                        "role": "assistant",
+                        "cached": True
+                    }
             
-            # Add current message
-            messages.append({"role": "user", "content": message})
+            messages = self._chat_messages(message, conversation_history, context, language)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = await self._complete(
+                user_id,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=1000
             )
             
             assistant_message = response.choices[0].message.content
+            if partition is not None:
+                self.chat_cache.set(message, partition[0], assistant_message, partition[1])
             return {
                 "success": True,
                 "message": assistant_message,
                 "role": "assistant"
             }
             
+        except AIOverloaded:
+            raise
         except Exception as e:
             logger.error(f"AI chat error: {e}")
             return {
@@ -72,26 +182,110 @@ Your tone should be:
                 "error": str(e)
             }
 
-    async def explain_verse(self, surah_number: int, ayat_number: int, surah_name: str, arabic_text: str, translation: str):
-        """Explain a specific verse with context"""
-        try:
-            prompt = f"""Please explain this verse from the Holy Quran:
+    async def chat_stream(self, message: str, conversation_history: list = None, context: dict = None,
+                          user_id: str = None, language: str = None):
+        """Yield the assistant's reply in chunks as the model generates it.
 
-Surah {surah_name} ({surah_number}), Ayat {ayat_number}
+        The SDK's stream is consumed on the worker pool and handed over through
+        a queue. Closing this generator (e.g. the client disconnected) stops
+        the worker at the next chunk and closes the upstream response, so the
+        generation is abandoned instead of running to max_tokens. The limiter
+        slot is held until the worker has actually exited.
+        """
+        partition = self._chat_cache_partition(conversation_history, context, language)
+        if partition is not None:
+            cached = self.chat_cache.get(message, *partition)
+            if cached is not None:
+                yield cached
+                return
+        
+        messages = self._chat_messages(message, conversation_history, context, language)
+        parts = []
+        async with self.limiter.slot(user_id) as slot:
+            loop = asyncio.get_running_loop()
+            queue = asyncio.Queue()
+            cancelled = threading.Event()
 
-Arabic: {arabic_text}
-Translation: {translation}
+            def emit(item):
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+                except RuntimeError:
+                    cancelled.set()  # event loop already closed
 
-Provide:
-1. Context and background of revelation (if known)
-2. Key themes and lessons
-3. Practical application in daily life
-4. Related verses if applicable
+            def produce():
+                stream = None
+                try:
+                    stream = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.7,
+                        max_tokens=1000,
+                        stream=True
+                    )
+                    for chunk in stream:
+                        if cancelled.is_set():
+                            break
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            emit(delta)
+                    emit(_STREAM_END)
+                except Exception as e:
+                    emit(e)
+                finally:
+                    if stream is not None:
+                        stream.response.close()
+
+            # The worker may still be blocked in the SDK iterator after a disconnect;
+            # the slot (and so its pool thread) stays taken until produce() returns
+            slot.release_after(loop.run_in_executor(self.executor, produce))
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is _STREAM_END:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    parts.append(item)
+                    yield item
+            finally:
+                cancelled.set()
+        if partition is not None and parts:
+            self.chat_cache.set(message, partition[0], "".join(parts), partition[1])
+
+    @property
+    def prompt_version(self) -> str:
+        """Fingerprint of the persona and explain-verse prompt; changes invalidate stored explanations"""
+        return hashlib.sha256((self.system_prompt + EXPLAIN_VERSE_PROMPT).encode("utf-8")).hexdigest()[:12]
 
-Please structure your response clearly and keep it educational yet accessible."""
+    @property
+    def help_prompt_version(self) -> str:
+        """Fingerprint of the persona and the contextual help prompts; changes invalidate stored help"""
+        prompts = self.system_prompt + HELP_INSTRUCTIONS + "".join(f"{k}:{v}" for k, v in sorted(HELP_PROMPTS.items()))
+        return hashlib.sha256(prompts.encode("utf-8")).hexdigest()[:12]
 
-            response = self.client.chat.completions.create(
-                model=self.model,
+    async def explain_verse(self, surah_number: int, ayat_number: int, surah_name: str, arabic_text: str, translation: str,
+                            user_id: str = None, language: str = "en"):
+        """Explain a specific verse with context"""
+        # Concurrent requests for the same verse share one generation
+        return await self.flight.do(
+            ("explain_verse", surah_number, ayat_number, self.model, language, translation),
+            lambda: self._explain_verse(surah_number, ayat_number, surah_name, arabic_text, translation, user_id, language),
+        )
+
+    async def _explain_verse(self, surah_number: int, ayat_number: int, surah_name: str, arabic_text: str, translation: str,
+                             user_id: str = None, language: str = "en"):
+        try:
+            prompt = EXPLAIN_VERSE_PROMPT.format(
+                surah_name=surah_name,
+                surah_number=surah_number,
+                ayat_number=ayat_number,
+                arabic_text=arabic_text,
+                translation=translation,
+                language_name=LANGUAGE_NAMES.get(language, "English")
+            )
+
+            response = await self._complete(
+                user_id,
                 messages=[
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": prompt}
@@ -105,6 +299,8 @@ Please structure your response clearly and keep it educational yet accessible.""
                 "explanation": response.choices[0].message.content
             }
             
+        except AIOverloaded:
+            raise
         except Exception as e:
             logger.error(f"Verse explanation error: {e}")
             return {
@@ -112,29 +308,78 @@ Please structure your response clearly and keep it educational yet accessible.""
                 "error": str(e)
             }
 
-    async def contextual_help(self, screen: str, user_query: str = None):
+    async def contextual_help(self, screen: str, user_query: str = None, user_id: str = None, language: str = "en"):
         """Provide contextual help based on current screen"""
+        if screen not in HELP_PROMPTS:
+            screen = None
+        if language not in LANGUAGE_NAMES:
+            language = "en"
+        
+        # Query-less help is deterministic per screen and language: kept warm in memory
+        if not user_query:
+            key = (screen, language, self.help_prompt_version)
+            if key in self.help_cache:
+                return {"success": True, "help": self.help_cache[key], "cached": True}
+            response = await self.flight.do(
+                ("contextual_help", screen, language),
+                lambda: self._contextual_help(screen, None, user_id, language),
+            )
+            if response["success"]:
+                self.help_cache[key] = response["help"]
+            return response
+        
+        key = f"{screen}:{language}:{' '.join(user_query.casefold().split())}"
+        entry = self.help_query_cache.get(key)
+        if entry is not None and time.time() < entry.fresh_until:
+            return {"success": True, "help": entry.value, "cached": True}
+        response = await self._contextual_help(screen, user_query, user_id, language)
+        if response["success"]:
+            expires = time.time() + settings.help_query_cache_ttl
+            self.help_query_cache.set(key, CacheEntry(response["help"], len(response["help"]), expires, expires))
+        return response
+
+    async def warm_contextual_help(self, languages: list = None, stored: dict = None) -> dict:
+        """
+        Precompute query-less help for every screen in the given languages.
+
+        `stored` maps (screen, language) to help already persisted for the
+        current help_prompt_version; only the other screens are generated.
+        Returns the newly generated help, keyed the same way.
+        """
+        if languages is None:
+            languages = [language.strip() for language in settings.help_precompute_languages.split(",") if language.strip()]
+        version = self.help_prompt_version
+        for (screen, language), text in (stored or {}).items():
+            self.help_cache[(screen, language, version)] = text
+        missing = [
+            (screen, language) for language in languages for screen in HELP_PROMPTS
+            if (screen, language, version) not in self.help_cache
+        ]
+        results = await asyncio.gather(*(
+            self.contextual_help(screen, language=language) for screen, language in missing
+        ), return_exceptions=True)
+        generated = {
+            key: result["help"] for key, result in zip(missing, results)
+            if not isinstance(result, Exception) and result["success"]
+        }
+        logger.info(f"Precomputed contextual help for {len(generated)}/{len(missing)} screens "
+                    f"({len(stored or {})} already stored)")
+        return generated
+
+    async def _contextual_help(self, screen: str, user_query: str = None, user_id: str = None, language: str = "en"):
         try:
-            help_prompts = {
-                "home": "Guide the user on how to start reading the Quran, explore features, and navigate the app.",
-                "reading": "Help the user understand how to read, listen to recitation, and use reading features.",
-                "search": "Explain how to search for verses, topics, and themes in the Quran.",
-                "bookmarks": "Guide on how to save, organize, and manage favorite verses.",
-                "prayer": "Explain prayer times feature and Qibla direction.",
-                "progress": "Help user understand their reading progress and streak."
-            }
-            
-            base_prompt = help_prompts.get(screen, "Help the user with their current task in the app.")
+            base_prompt = HELP_PROMPTS.get(screen, "Help the user with their current task in the app.")
             
             if user_query:
                 prompt = f"{base_prompt}\n\nUser's specific question: {user_query}"
             else:
                 prompt = base_prompt
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = await self._complete(
+                user_id,
                 messages=[
-                    {"role": "system", "content": self.system_prompt + "\nProvide brief, helpful guidance for using the app feature."},
+                    {"role": "system", "content": self.system_prompt + HELP_INSTRUCTIONS
+                     + f" Respond in {LANGUAGE_NAMES[language]}."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
@@ -146,6 +391,8 @@ Please structure your response clearly and keep it educational yet accessible.""
                 "help": response.choices[0].message.content
             }
             
+        except AIOverloaded:
+            raise
         except Exception as e:
             logger.error(f"Contextual help error: {e}")
             return {
@@ -1,49 +1,92 @@
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
+from collections import OrderedDict
 from config import settings
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
+class VerifiedTokenCache:
+    """Bounded LRU of verified claims keyed by token hash; entries expire with the token's `exp`"""
+
+    def __init__(self, max_entries: int, max_ttl: int):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return claims
+
+    def set(self, token: str, claims: dict):
+        expires_at = time.time() + self.max_ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        key = self._key(token)
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+token_cache = VerifiedTokenCache(settings.auth_cache_max_entries, settings.auth_cache_max_ttl)
+
+def verify_token(token: str) -> dict:
+    """Verify a Supabase JWT once and return its claims; raises JWTError if invalid"""
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(
+            token,
+            settings.supabase_jwt_secret,
+            algorithms=["HS256"],
+            options={"verify_aud": False}
+        )
+        token_cache.set(token, claims)
+    return claims
+
 class JWTBearer(HTTPBearer):
+    """Dependency that verifies the bearer token and returns its claims"""
+
     def __init__(self, auto_error: bool = True):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
-    async def __call__(self, credentials: HTTPAuthorizationCredentials = Security(security)):
+    async def __call__(self, credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
         if credentials:
             if not credentials.scheme == "Bearer":
                 raise HTTPException(status_code=403, detail="Invalid authentication scheme.")
-            if not self.verify_jwt(credentials.credentials):
+            try:
+                return verify_token(credentials.credentials)
+            except JWTError as e:
+                logger.error(f"JWT verification failed: {e}")
                 raise HTTPException(status_code=403, detail="Invalid token or expired token.")
-            return credentials.credentials
         else:
             raise HTTPException(status_code=403, detail="Invalid authorization code.")
-
-    def verify_jwt(self, token: str) -> bool:
-        try:
-            payload = jwt.decode(
-                token,
-                settings.supabase_jwt_secret,
-                algorithms=["HS256"],
-                options={"verify_aud": False}
-            )
-            return payload is not None
-        except JWTError as e:
-            logger.error(f"JWT verification failed: {e}")
-            return False
-
-def get_user_from_token(token: str):
-    """Extract user info from JWT token"""
-    try:
-        payload = jwt.decode(
-            token,
-            settings.supabase_jwt_secret,
-            algorithms=["HS256"],
-            options={"verify_aud": False}
-        )
-        return payload
-    except JWTError as e:
-        logger.error(f"Failed to decode token: {e}")
-        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Micro-benchmarks for locally served Quran views.
+
+    python benchmark.py divisions --edition quran-uthmani --repeat 200
+
+Times assembling juz, pages, rukus, ... from the local corpus (a slice of
+the memoised per-edition ayah list) and, separately, encoding them with
+orjson as the HTTP layer does on a response-cache miss.
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+
+import orjson
+
+from config import settings
+from quran_store import QuranStore
+from quran_structure import structure
+
+
+def _time(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[int(len(samples) * 0.95) - 1],
+        "max_ms": samples[-1],
+    }
+
+
+def divisions(store: QuranStore, edition: str, repeat: int):
+    started = time.perf_counter()
+    store.ayahs(edition, with_surah=True)
+    print(f"one-time decode of {edition}: {(time.perf_counter() - started) * 1000:.1f} ms")
+    cases = [
+        (f"{division} {number}", lambda d=division, n=number: store.division(d, n, edition, structure))
+        for division, number in (("juz", 30), ("juz", 1), ("page", 1), ("page", 300), ("hizbQuarter", 120),
+                                 ("ruku", 100), ("hizb", 60))
+    ]
+
+    print(f"{'view':16} {'ayahs':>6} {'median ms':>10} {'p95 ms':>8} {'max ms':>8} {'encode ms':>10}")
+    for name, fn in cases:
+        view = fn()
+        result = _time(fn, repeat)
+        encode = _time(lambda: orjson.dumps(view), repeat)
+        print(f"{name:16} {len(view['data']['ayahs']):>6} {result['median_ms']:>10.3f} {result['p95_ms']:>8.3f} "
+              f"{result['max_ms']:>8.3f} {encode['median_ms']:>10.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark locally served Quran views")
+    parser.add_argument("command", choices=["divisions"])
+    parser.add_argument("--data-dir", default=settings.quran_data_dir)
+    parser.add_argument("--edition", default="quran-uthmani")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    store = QuranStore(args.data_dir)
+    if not store.load():
+        return 1
+    divisions(store, args.edition, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
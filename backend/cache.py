@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    __slots__ = ("value", "size", "fresh_until", "stale_until")
+
+    def __init__(self, value, size: int, fresh_until: float, stale_until: float):
+        self.value = value
+        self.size = size
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class LRUCache:
+    """In-process LRU bounded by the total (approximate) size of its entries"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        self.pop(key)
+        self._entries[key] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.size
+            self.evictions += 1
+
+    def pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+
+class TieredCache:
+    """
+    Two-level cache: a size-bounded in-process LRU in front of a MongoDB
+    collection shared by all workers.
+
+    Entries are fresh for `ttl` seconds; after that they are still served
+    for up to `stale_ttl` more seconds while a background task refreshes
+    them (stale-while-revalidate).
+    """
+
+    def __init__(self, collection: str, max_bytes: int, ttl: int, stale_ttl: int):
+        self.collection = collection
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.memory = LRUCache(max_bytes)
+        self.counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "mongo_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+        self._refreshing = {}
+
+    def _collection(self):
+        db = get_database()
+        return db[self.collection] if db is not None else None
+
+    def _entry(self, value, size: int = None) -> CacheEntry:
+        if size is None:
+            size = len(json.dumps(value, ensure_ascii=False, default=str))
+        now = time.time()
+        return CacheEntry(value, size, now + self.ttl, now + self.ttl + self.stale_ttl)
+
+    async def _load(self, key: str):
+        collection = self._collection()
+        if collection is None:
+            return None
+        try:
+            doc = await collection.find_one({"_id": key})
+        except Exception as e:
+            logger.error(f"Cache read failed for {key}: {e}")
+            return None
+        if not doc:
+            return None
+        return CacheEntry(
+            doc["value"],
+            doc.get("size", 0),
+            doc["fresh_until"].replace(tzinfo=timezone.utc).timestamp(),
+            doc["stale_until"].replace(tzinfo=timezone.utc).timestamp(),
+        )
+
+    async def _save(self, key: str, entry: CacheEntry):
+        self.memory.set(key, entry)
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.replace_one(
+                {"_id": key},
+                {
+                    "value": entry.value,
+                    "size": entry.size,
+                    "fresh_until": datetime.utcfromtimestamp(entry.fresh_until),
+                    "stale_until": datetime.utcfromtimestamp(entry.stale_until),
+                    "updated_at": datetime.utcnow(),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.error(f"Cache write failed for {key}: {e}")
+
+    def _schedule_refresh(self, key: str, fetch):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                await self._save(key, self._entry(await fetch()))
+                self.counters["refreshes"] += 1
+            except Exception as e:
+                self.counters["refresh_errors"] += 1
+                logger.warning(f"Background refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    async def get_or_fetch(self, key: str, fetch):
+        """Return the cached value for key, calling `await fetch()` on a miss"""
+        entry = self.memory.get(key)
+        if entry is None:
+            entry = await self._load(key)
+            if entry is not None:
+                self.counters["mongo_hits"] += 1
+                self.memory.set(key, entry)
+
+        now = time.time()
+        if entry is not None:
+            if now < entry.fresh_until:
+                self.counters["hits"] += 1
+                return entry.value
+            if now < entry.stale_until:
+                self.counters["stale_hits"] += 1
+                self._schedule_refresh(key, fetch)
+                return entry.value
+
+        self.counters["misses"] += 1
+        value = await fetch()
+        await self._save(key, self._entry(value))
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round((lookups - self.counters["misses"]) / lookups, 4) if lookups else 0.0,
+            "entries": len(self.memory),
+            "bytes": self.memory.current_bytes,
+            "max_bytes": self.memory.max_bytes,
+            "evictions": self.memory.evictions,
+        }
@@ -0,0 +1,199 @@
+"""
+Semantic cache for context-free AI chat questions.
+
+Messages are normalised and embedded locally by hashing the character
+trigrams of their content words, so "meaning of Al-Fatihah" and "what's the
+meaning of al fatiha?" land close together - no model or network call is
+needed.
+
+Vector similarity only picks candidates. Questions that share most of their
+words can still ask opposite things ("can a woman pray/fast during her
+period", "explain 2:255/2:256"), so a candidate is served only if its
+content words are the same as the question's, up to spelling variants of
+individual words; a differing number is never a spelling variant.
+
+Each language/context partition keeps its vectors in one contiguous float32
+matrix, so a lookup is a single matrix-vector product. Partitions are
+bounded; the least frequently used entry (least recently used on ties) is
+evicted first.
+"""
+import logging
+import time
+import zlib
+
+import numpy as np
+
+from search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Function words (and "al", "surah", "meaning") would dominate short questions
+STOPWORDS = frozenset(
+    "a about al an and are can could do does explain for how i in is it me mean meaning "
+    "means of on please s surah surat tell the to what whats which you your".split()
+)
+# Minimum trigram similarity for two differing words to count as spellings of one word
+SPELLING_SIMILARITY = 0.8
+# Candidates above the vector threshold that are checked word by word
+CANDIDATES = 5
+
+
+def normalize_message(message: str) -> list:
+    """Case-, punctuation- and harakat-insensitive content tokens"""
+    return [token for token in tokenize(message) if token not in STOPWORDS]
+
+
+def embed(tokens: list, dimensions: int):
+    """L2-normalised hashed bag of character trigrams; every word gets unit weight"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in tokens:
+        padded = f" {token} "
+        grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+        weight = 1.0 / len(grams) ** 0.5
+        for gram in grams:
+            vector[zlib.crc32(gram.encode("utf-8")) % dimensions] += weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _word_trigrams(token: str) -> set:
+    padded = f" {token}"
+    return {padded[i:i + 3] for i in range(max(len(padded) - 2, 1))}
+
+
+def spelling_similarity(a: str, b: str) -> float:
+    """Dice coefficient of the two words' trigrams; 0 if either contains a digit"""
+    if any(char.isdigit() for char in a + b):
+        return 0.0
+    grams_a, grams_b = _word_trigrams(a), _word_trigrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def same_question(tokens: list, other: list) -> bool:
+    """True if the content words match, allowing only spelling variants of single words"""
+    if sorted(tokens) == sorted(other):
+        return True
+    remaining = list(other)
+    unmatched = []
+    for token in tokens:
+        if token in remaining:
+            remaining.remove(token)
+        else:
+            unmatched.append(token)
+    if len(unmatched) != len(remaining):
+        return False
+    for token in unmatched:
+        best = max(remaining, key=lambda candidate: spelling_similarity(token, candidate))
+        if spelling_similarity(token, best) < SPELLING_SIMILARITY:
+            return False
+        remaining.remove(best)
+    return True
+
+
+class _Partition:
+    """Fixed-capacity vector table for one (language, context) pair"""
+
+    def __init__(self, capacity: int, dimensions: int):
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.answers = [None] * capacity
+        self.tokens = [None] * capacity
+        self.hits = np.zeros(capacity, dtype=np.int64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.size = 0
+
+    def lookup(self, vector, tokens: list, threshold: float):
+        """Slot of a stored question that is the same as `tokens`, or None"""
+        if not self.size:
+            return None
+        scores = self.vectors[:self.size] @ vector
+        count = min(CANDIDATES, self.size)
+        candidates = np.argpartition(-scores, count - 1)[:count]
+        for slot in sorted(candidates.tolist(), key=lambda slot: -scores[slot]):
+            if scores[slot] < threshold:
+                break
+            if same_question(tokens, self.tokens[slot]):
+                return slot
+        return None
+
+    def victim(self) -> int:
+        """Slot to overwrite: a free one, else the LFU entry (oldest first on ties)"""
+        if self.size < len(self.answers):
+            self.size += 1
+            return self.size - 1
+        return int(np.lexsort((self.last_used, self.hits))[0])
+
+
+class SemanticChatCache:
+    def __init__(self, max_entries: int, threshold: float, dimensions: int = 1024, max_partitions: int = 32):
+        self.max_entries = max_entries
+        self.max_partitions = max_partitions
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self.partitions = {}
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self.language_counters = {}
+
+    def _count(self, language: str, name: str):
+        self.counters[name] += 1
+        counters = self.language_counters.setdefault(language, {"hits": 0, "misses": 0})
+        if name in counters:
+            counters[name] += 1
+
+    def get(self, message: str, language: str, context: str = ""):
+        """Cached answer for a near-duplicate question, or None"""
+        tokens = normalize_message(message)
+        partition = self.partitions.get((language, context))
+        if not tokens or partition is None:
+            self._count(language, "misses")
+            return None
+
+        slot = partition.lookup(embed(tokens, self.dimensions), tokens, self.threshold)
+        if slot is None:
+            self._count(language, "misses")
+            return None
+        partition.hits[slot] += 1
+        partition.last_used[slot] = time.monotonic()
+        self._count(language, "hits")
+        return partition.answers[slot]
+
+    def set(self, message: str, language: str, answer: str, context: str = ""):
+        tokens = normalize_message(message)
+        if not tokens:
+            return
+        vector = embed(tokens, self.dimensions)
+        partition = self.partitions.get((language, context))
+        if partition is None:
+            if len(self.partitions) >= self.max_partitions:
+                return
+            partition = self.partitions[(language, context)] = _Partition(self.max_entries, self.dimensions)
+
+        slot = partition.lookup(vector, tokens, self.threshold)
+        if slot is None:
+            evicting = partition.size == self.max_entries
+            slot = partition.victim()
+            if evicting:
+                self.counters["evictions"] += 1
+            partition.hits[slot] = 0
+        partition.vectors[slot] = vector
+        partition.answers[slot] = answer
+        partition.tokens[slot] = tokens
+        partition.last_used[slot] = time.monotonic()
+        self.counters["stores"] += 1
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": sum(partition.size for partition in self.partitions.values()),
+            "partitions": len(self.partitions),
+            "threshold": self.threshold,
+            "languages": {
+                language: {
+                    **counters,
+                    "hit_rate": round(counters["hits"] / (counters["hits"] + counters["misses"]), 4)
+                    if counters["hits"] + counters["misses"] else 0.0,
+                }
+                for language, counters in self.language_counters.items()
+            },
+        }
@@ -0,0 +1,127 @@
+"""
+AI chat history.
+
+`ai_conversations` holds one small document per user with the hot window of
+recent messages the model sees; turns are appended atomically with
+$push/$each/$slice, so concurrent turns never overwrite each other and the
+write does not grow with the history. Every message is also appended to
+`ai_messages`, the full archive behind /api/ai/history.
+
+Copy hot windows written before the archive existed into it with:
+
+    python chat_history.py migrate
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+from database import connect_to_mongo, close_mongo_connection, get_database
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE = "ai_messages"
+
+
+async def recent_messages(db, user_id: str, limit: int = 10) -> list:
+    """The last `limit` messages as {"role", "content"} dicts, ready for the model"""
+    conversation = await db.ai_conversations.find_one(
+        {"user_id": user_id},
+        {"_id": 0, "messages": {"$slice": -limit}}
+    )
+    if not conversation:
+        return []
+    return [{"role": m["role"], "content": m["content"]} for m in conversation.get("messages", [])]
+
+
+async def _push_window(db, user_id: str, messages: list, context: dict, now: datetime):
+    update = {
+        "$push": {"messages": {"$each": messages, "$slice": -settings.chat_history_window}},
+        "$set": {"updated_at": now},
+        "$setOnInsert": {"context": context, "created_at": now}
+    }
+    try:
+        await db.ai_conversations.update_one({"user_id": user_id}, update, upsert=True)
+    except DuplicateKeyError:
+        # A concurrent first turn created the document; append to it
+        await db.ai_conversations.update_one({"user_id": user_id}, update)
+
+
+async def append_turn(db, user_id: str, user_message: str, assistant_message: str, context: dict = None):
+    """Persist one user/assistant exchange"""
+    now = datetime.utcnow()
+    messages = [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": assistant_message}
+    ]
+    await asyncio.gather(
+        _push_window(db, user_id, messages, context, now),
+        db[ARCHIVE].insert_many([
+            {"user_id": user_id, **message, "context": context, "created_at": now}
+            for message in messages
+        ])
+    )
+
+
+async def history_page(db, user_id: str, before: str = None, limit: int = 50) -> dict:
+    """Archived messages newest first, `limit` at a time; pass next_cursor back as `before`"""
+    query = {"user_id": user_id}
+    if before:
+        query["_id"] = {"$lt": ObjectId(before)}
+    docs = await db[ARCHIVE].find(
+        query,
+        {"user_id": 0}
+    ).sort("_id", -1).limit(limit + 1).to_list(length=limit + 1)
+
+    messages = []
+    for doc in docs[:limit]:
+        doc["_id"] = str(doc["_id"])
+        messages.append(doc)
+    return {
+        "messages": messages,
+        "next_cursor": messages[-1]["_id"] if len(docs) > limit else None
+    }
+
+
+async def migrate():
+    """Archive the hot window of users that have no archived messages yet"""
+    db = get_database()
+    migrated = 0
+    async for conversation in db.ai_conversations.find({}, {"user_id": 1, "messages": 1, "context": 1}):
+        user_id = conversation["user_id"]
+        if not conversation.get("messages") or await db[ARCHIVE].find_one({"user_id": user_id}, {"_id": 1}):
+            continue
+        created_at = conversation.get("created_at") or conversation["_id"].generation_time.replace(tzinfo=None)
+        await db[ARCHIVE].insert_many([
+            {"user_id": user_id, "role": m["role"], "content": m["content"],
+             "context": conversation.get("context"), "created_at": created_at}
+            for m in conversation["messages"]
+        ])
+        migrated += 1
+    logger.info(f"Archived history of {migrated} conversations")
+
+
+async def _main(args):
+    await connect_to_mongo()
+    try:
+        await migrate()
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain AI chat history")
+    parser.add_argument("command", choices=["migrate"])
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,12 +9,80 @@ class Settings(BaseSettings):
     supabase_url: str
     supabase_key: str
     supabase_jwt_secret: str
+    # Verified JWT claims cache (see auth.py)
+    auth_cache_max_entries: int = 10000
+    auth_cache_max_ttl: int = 3600
     
     # GLM-4.6 AI
     glm_api_key: str
+    ai_max_concurrency: int = 8
+    ai_per_user_concurrency: int = 2
+    ai_max_queue: int = 32
+    ai_queue_timeout: float = 30.0
+    # Semantic chat cache (see chat_cache.py)
+    chat_cache_enabled: bool = True
+    # Vector similarity a stored question needs before it is compared word by word
+    chat_cache_threshold: float = 0.75
+    chat_cache_max_entries: int = 1000
+    chat_cache_max_history: int = 2
+    # Messages kept in ai_conversations for the model; older ones live only in the archive
+    chat_history_window: int = 20
+    # Contextual help: query-less help is precomputed for these languages at startup
+    help_precompute_languages: str = "en,ms"
+    help_query_cache_ttl: int = 600
+    help_query_cache_max_bytes: int = 4 * 1024 * 1024
     
     # Quran API
     quran_api_base_url: str = "https://api.alquran.cloud/v1"
+    # Local corpus (see quran_store.py); relative paths resolve against backend/
+    quran_data_dir: str = "data/quran"
+    quran_local_mode: bool = False
+    quran_editions: str = "quran-simple,quran-uthmani,en.sahih,en.asad,en.pickthall,ms.basmeih,ur.jalandhry,id.indonesian"
+
+    # Shared upstream HTTP client (see http_client.py)
+    http2_enabled: bool = True
+    http_max_connections: int = 50
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_connect_timeout: float = 5.0
+    http_read_timeout: float = 20.0
+    http_write_timeout: float = 10.0
+    http_pool_timeout: float = 5.0
+
+    # Quran response cache (see cache.py); times in seconds
+    quran_cache_enabled: bool = True
+    quran_cache_max_bytes: int = 64 * 1024 * 1024
+    quran_cache_ttl: int = 7 * 24 * 3600
+    quran_cache_stale_ttl: int = 30 * 24 * 3600
+    quran_cache_collection: str = "quran_cache"
+
+    # Encoded /api/quran responses and their HTTP caching (see http_cache.py)
+    quran_http_cache_max_bytes: int = 32 * 1024 * 1024
+    quran_http_compress_min_bytes: int = 1024
+    quran_http_max_age: int = 24 * 3600
+
+    # Offline bundles (see offline_bundle.py); relative paths resolve against backend/
+    quran_bundle_dir: str = "data/bundles"
+
+    # Fuzzy search (see fuzzy_search.py)
+    search_fuzzy_candidates: int = 100
+    search_fuzzy_expansions: int = 3
+    search_fuzzy_min_similarity: float = 0.6
+
+    # Semantic search (see semantic_search.py)
+    semantic_dimensions: int = 256
+    semantic_max_features: int = 20000
+    semantic_ivf_lists: int = 64
+    semantic_ivf_probe: int = 8
+    
+    # Days of verse-of-the-day precomputed ahead (see daily_verse.py)
+    daily_verse_schedule_days: int = 7
+
+    # Reading progress write-behind buffer (see write_buffer.py)
+    progress_buffer_batch_size: int = 500
+    progress_buffer_flush_interval: float = 2.0
+    progress_buffer_max_pending: int = 20000
+    progress_batch_max_events: int = 1000
     
     # App
     app_name: str = "Al-Quran AI"
@@ -0,0 +1,86 @@
+"""
+Verse of the day.
+
+The verse for a day is picked with a private random.Random seeded with the
+date (the same sequence the old global random.seed(today) produced), so it
+is stable across workers and restarts without touching the process-wide
+RNG. Days are precomputed ahead of time by a background task and then
+served from a dictionary.
+"""
+import asyncio
+import logging
+import random
+from datetime import date, datetime, timedelta
+
+from config import settings
+from quran_service import quran_service
+from quran_structure import AYAH_COUNTS, TOTAL_SURAHS
+
+logger = logging.getLogger(__name__)
+
+
+def pick_verse(day: date) -> tuple:
+    """(surah, ayah) of the verse for `day`"""
+    rng = random.Random(day.strftime('%Y%m%d'))
+    surah_number = rng.randint(1, TOTAL_SURAHS)
+    return surah_number, rng.randint(1, AYAH_COUNTS[surah_number - 1])
+
+
+class DailyVerse:
+    def __init__(self, schedule_days: int):
+        self.schedule_days = schedule_days
+        self.schedule = {}
+        self._task = None
+
+    async def _build(self, day: date) -> dict:
+        surah_number, ayah_number = pick_verse(day)
+        arabic, translation = await asyncio.gather(
+            quran_service.get_ayah(surah_number, ayah_number, "quran-uthmani"),
+            quran_service.get_ayah(surah_number, ayah_number, "en.sahih"),
+        )
+        return {
+            "surah_number": surah_number,
+            "ayah_number": ayah_number,
+            "surah_name": arabic.get("data", {}).get("surah", {}).get("englishName"),
+            "surah_name_arabic": arabic.get("data", {}).get("surah", {}).get("name"),
+            "arabic_text": arabic.get("data", {}).get("text", ""),
+            "translation": translation.get("data", {}).get("text", ""),
+        }
+
+    async def get(self, day: date = None) -> dict:
+        """The verse for `day` (default today, local time)"""
+        day = day or datetime.now().date()
+        verse = self.schedule.get(day)
+        if verse is None:
+            verse = self.schedule[day] = await self._build(day)
+        return verse
+
+    async def precompute(self):
+        """Fill the schedule for today and the following days, dropping past ones"""
+        today = datetime.now().date()
+        for day in [day for day in self.schedule if day < today]:
+            del self.schedule[day]
+        for offset in range(self.schedule_days):
+            try:
+                await self.get(today + timedelta(days=offset))
+            except Exception as e:
+                logger.warning(f"Could not precompute daily verse for {today + timedelta(days=offset)}: {e}")
+
+    async def _run(self):
+        while True:
+            await self.precompute()
+            now = datetime.now()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            await asyncio.sleep((midnight - now).total_seconds() + 1)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+daily_verse = DailyVerse(settings.daily_verse_schedule_days)
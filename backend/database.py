@@ -1,9 +1,66 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
 from config import settings
+import argparse
+import asyncio
 import logging
+import sys
 
 logger = logging.getLogger(__name__)
 
+# Indexes for every query the server issues; ensured on startup
+INDEXES = {
+    "user_profiles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id", unique=True),
+    ],
+    "bookmarks": [
+        IndexModel(
+            [("user_id", ASCENDING), ("surah_number", ASCENDING), ("ayat_number", ASCENDING)],
+            name="user_verse",
+            unique=True,
+        ),
+    ],
+    "reading_progress": [
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING)], name="user_date"),
+    ],
+    "reading_daily": [
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_day"),
+    ],
+    "ai_conversations": [
+        IndexModel([("user_id", ASCENDING)], name="user_id", unique=True),
+    ],
+    "ai_messages": [
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_id_desc"),
+    ],
+    settings.quran_cache_collection: [
+        # Entries are deleted once they can no longer be served stale
+        IndexModel([("stale_until", ASCENDING)], name="stale_until_ttl", expireAfterSeconds=0),
+    ],
+    "verse_explanations": [
+        IndexModel(
+            [("model", ASCENDING), ("prompt_version", ASCENDING), ("language", ASCENDING)],
+            name="model_prompt_language",
+        ),
+    ],
+    "contextual_help": [
+        IndexModel([("model", ASCENDING), ("prompt_version", ASCENDING)], name="model_prompt"),
+    ],
+}
+
+# Representative (collection, filter, sort) of each query shape, for `python database.py explain`
+QUERY_SHAPES = [
+    ("user_profiles", {"user_id": "explain"}, None),
+    ("bookmarks", {"user_id": "explain"}, None),
+    ("bookmarks", {"user_id": "explain", "surah_number": 1, "ayat_number": 1}, None),
+    ("reading_progress", {"user_id": "explain"}, [("date", DESCENDING)]),
+    ("reading_daily", {"user_id": "explain", "day": {"$gte": "2000-01-01", "$lte": "2000-12-31"}}, None),
+    ("ai_conversations", {"user_id": "explain"}, None),
+    ("ai_messages", {"user_id": "explain"}, [("_id", DESCENDING)]),
+    ("verse_explanations", {"language": "en", "model": "explain", "prompt_version": "explain"}, None),
+    ("contextual_help", {"model": "explain", "prompt_version": "explain"}, None),
+]
+
 class Database:
     client: AsyncIOMotorClient = None
     db = None
@@ -22,6 +79,71 @@ async def connect_to_mongo():
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {e}")
         raise
+    await ensure_indexes(db.db)
+
+INDEX_CONFLICTS = (85, 86)  # IndexOptionsConflict, IndexKeySpecsConflict
+
+async def _replace_index(collection, index: IndexModel):
+    """
+    Replace an older definition of `index` (same name or same keys). If the
+    new one cannot be built, the old definition is re-created, so the
+    collection is never left without the index.
+    """
+    name, key = index.document["name"], dict(index.document["key"])
+    old = None
+    async for spec in collection.list_indexes():
+        if spec["name"] == name or dict(spec["key"]) == key:
+            old = spec
+            break
+    if old is None:
+        raise OperationFailure(f"No existing index conflicts with {name}")
+
+    logger.info(f"Replacing index {old['name']} on {collection.name}")
+    await collection.drop_index(old["name"])
+    try:
+        await collection.create_indexes([index])
+    except OperationFailure:
+        options = {option: value for option, value in old.items() if option not in ("v", "key", "ns")}
+        await collection.create_indexes([IndexModel(list(old["key"].items()), **options)])
+        logger.warning(f"Restored the previous definition of index {old['name']} on {collection.name}")
+        raise
+
+async def ensure_indexes(database):
+    """Create any missing indexes from INDEXES (a no-op for existing ones)"""
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                try:
+                    await database[collection].create_indexes([index])
+                except OperationFailure as e:
+                    if e.code not in INDEX_CONFLICTS:
+                        raise
+                    # An older definition of the same index
+                    await _replace_index(database[collection], index)
+            except OperationFailure as e:
+                # e.g. duplicate data blocking a unique index; the server still works without it
+                logger.error(f"Could not create index {index.document['name']} on {collection}: {e}")
+
+def _plan_stages(plan: dict):
+    """All stage names in a query plan tree"""
+    yield plan.get("stage")
+    for child in plan.get("inputStages", []) + [plan[key] for key in ("inputStage", "queryPlan") if key in plan]:
+        yield from _plan_stages(child)
+
+async def explain_queries(database) -> list:
+    """Explain every query shape; returns (collection, filter, stages) for those that scan the collection"""
+    collscans = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = database[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        stages = [stage for stage in _plan_stages(plan) if stage]
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"{status:9} {collection:20} {query} -> {' > '.join(stages)}")
+        if status == "COLLSCAN":
+            collscans.append((collection, query, stages))
+    return collscans
 
 async def close_mongo_connection():
     """Close MongoDB connection"""
@@ -34,4 +156,23 @@ async def close_mongo_connection():
 
 def get_database():
     """Get database instance"""
-    return db.db
\ No newline at end of file
+    return db.db
+
+async def _main(args) -> int:
+    await connect_to_mongo()
+    try:
+        if args.command == "explain":
+            return 1 if await explain_queries(db.db) else 0
+        return 0
+    finally:
+        await close_mongo_connection()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MongoDB maintenance")
+    parser.add_argument("command", choices=["ensure-indexes", "explain"])
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    return asyncio.run(_main(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Persistent cache of AI verse explanations.
+
+Explanations are stored in the `verse_explanations` collection keyed by
+(surah, ayah, language, model, prompt version). The prompt version is a
+fingerprint of AIService.system_prompt and the explain-verse template, so
+changing either - or the model - makes every old entry miss; purge_stale()
+then removes them.
+
+Precompute every ayah ahead of time (resumable, rate-limited) with:
+
+    python explanation_cache.py precompute --language en --rate 0.5
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime
+
+from ai_service import ai_service
+from database import connect_to_mongo, close_mongo_connection, get_database
+from quran_service import quran_service, TRANSLATION_EDITIONS
+from quran_structure import AYAH_COUNTS, absolute_number
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "verse_explanations"
+
+
+def explanation_key(surah_number: int, ayat_number: int, language: str) -> str:
+    return f"{surah_number}:{ayat_number}:{language}:{ai_service.model}:{ai_service.prompt_version}"
+
+
+async def get_cached(surah_number: int, ayat_number: int, language: str = "en"):
+    db = get_database()
+    doc = await db[COLLECTION].find_one(
+        {"_id": explanation_key(surah_number, ayat_number, language)},
+        {"explanation": 1}
+    )
+    return doc["explanation"] if doc else None
+
+
+async def store(surah_number: int, ayat_number: int, language: str, explanation: str):
+    db = get_database()
+    await db[COLLECTION].replace_one(
+        {"_id": explanation_key(surah_number, ayat_number, language)},
+        {
+            "surah_number": surah_number,
+            "ayat_number": ayat_number,
+            "language": language,
+            "model": ai_service.model,
+            "prompt_version": ai_service.prompt_version,
+            "explanation": explanation,
+            "created_at": datetime.utcnow()
+        },
+        upsert=True
+    )
+
+
+async def explain(surah_number: int, ayat_number: int, language: str = "en", user_id: str = None) -> dict:
+    """Serve an explanation from the cache, generating and storing it on a miss"""
+    absolute_number(surah_number, ayat_number)  # validate before any lookup
+    if language not in TRANSLATION_EDITIONS:
+        language = "en"
+    explanation = await get_cached(surah_number, ayat_number, language)
+    if explanation is not None:
+        return {"success": True, "explanation": explanation, "cached": True}
+
+    translation_edition = TRANSLATION_EDITIONS.get(language, "en.sahih")
+    arabic_result, translation_result = await asyncio.gather(
+        quran_service.get_ayah(surah_number, ayat_number, "quran-uthmani"),
+        quran_service.get_ayah(surah_number, ayat_number, translation_edition),
+    )
+    arabic = arabic_result.get("data", {})
+
+    response = await ai_service.explain_verse(
+        surah_number,
+        ayat_number,
+        arabic.get("surah", {}).get("englishName", ""),
+        arabic.get("text", ""),
+        translation_result.get("data", {}).get("text", ""),
+        user_id=user_id,
+        language=language
+    )
+    if response.get("success"):
+        await store(surah_number, ayat_number, language, response["explanation"])
+        response["cached"] = False
+    return response
+
+
+async def purge_stale() -> int:
+    """Delete explanations produced by another model or prompt version"""
+    db = get_database()
+    try:
+        result = await db[COLLECTION].delete_many({
+            "$or": [
+                {"model": {"$ne": ai_service.model}},
+                {"prompt_version": {"$ne": ai_service.prompt_version}}
+            ]
+        })
+    except Exception as e:
+        logger.error(f"Error purging stale verse explanations: {e}")
+        return 0
+    if result.deleted_count:
+        logger.info(f"Purged {result.deleted_count} stale verse explanations")
+    return result.deleted_count
+
+
+async def precompute(language: str, rate: float, concurrency: int):
+    """Generate explanations for every ayah that is not cached yet; returns the number of failures"""
+    db = get_database()
+    done = set()
+    async for doc in db[COLLECTION].find(
+        {"language": language, "model": ai_service.model, "prompt_version": ai_service.prompt_version},
+        {"surah_number": 1, "ayat_number": 1}
+    ):
+        done.add((doc["surah_number"], doc["ayat_number"]))
+
+    pending = [
+        (surah_number, ayah)
+        for surah_number, count in enumerate(AYAH_COUNTS, start=1)
+        for ayah in range(1, count + 1)
+        if (surah_number, ayah) not in done
+    ]
+    logger.info(f"{len(done)} explanations cached, {len(pending)} to generate")
+
+    interval = 1.0 / rate if rate > 0 else 0.0
+    next_start = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def run(surah_number: int, ayat_number: int):
+        nonlocal failures
+        async with semaphore:
+            try:
+                response = await explain(surah_number, ayat_number, language)
+            except Exception as e:
+                # One ayah failing must not abort the run (or go unnoticed in a pruned task)
+                response = {"success": False, "error": repr(e)}
+            if not response.get("success"):
+                failures += 1
+                logger.warning(f"Failed {surah_number}:{ayat_number}: {response.get('error')}")
+
+    tasks = []
+    for surah_number, ayat_number in pending:
+        # Pace request starts to `rate` per second
+        delay = next_start - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        next_start = max(next_start, time.monotonic()) + interval
+        tasks.append(asyncio.create_task(run(surah_number, ayat_number)))
+        tasks = [task for task in tasks if not task.done()]
+    await asyncio.gather(*tasks)
+    logger.info(f"Precompute finished with {failures} failures")
+    return failures
+
+
+async def _main(args):
+    await connect_to_mongo()
+    try:
+        if args.command == "purge":
+            await purge_stale()
+            return 0
+        return 1 if await precompute(args.language, args.rate, args.concurrency) else 0
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage cached verse explanations")
+    parser.add_argument("command", choices=["precompute", "purge"])
+    parser.add_argument("--language", default="en", choices=sorted(TRANSLATION_EDITIONS))
+    parser.add_argument("--rate", type=float, default=0.5, help="Generations started per second")
+    parser.add_argument("--concurrency", type=int, default=2)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
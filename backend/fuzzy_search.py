@@ -0,0 +1,236 @@
+"""
+Typo- and transliteration-tolerant search on top of the BM25 index.
+
+Query words are matched against a character-trigram index over the
+*vocabulary* (not the documents): translation terms from every edition, the
+normalized words of each Arabic edition, the words of a Latin
+transliteration of the Arabic text, and surah names. The
+best trigram candidates are re-ranked by edit distance and then scored
+against the regular BM25 postings. Because the trigram index only grows
+with distinct words, memory and latency stay roughly flat as editions are
+added.
+"""
+import array
+import heapq
+import logging
+import re
+import time
+
+from config import settings
+from quran_store import TOTAL_AYAHS
+from search_index import EditionIndex, SearchIndex, tokenize
+
+logger = logging.getLogger(__name__)
+
+_LETTERS = {
+    "ا": "a", "ٱ": "a", "أ": "a", "إ": "i", "آ": "a",
+    "ب": "b", "ت": "t", "ث": "th", "ج": "j", "ح": "h",
+    "خ": "kh", "د": "d", "ذ": "dh", "ر": "r", "ز": "z",
+    "س": "s", "ش": "sh", "ص": "s", "ض": "d", "ط": "t",
+    "ظ": "z", "ع": "", "غ": "gh", "ف": "f", "ق": "q",
+    "ك": "k", "ل": "l", "م": "m", "ن": "n", "ه": "h",
+    "و": "w", "ي": "y", "ى": "a", "ة": "t", "ء": "",
+    "ؤ": "", "ئ": "",
+}
+_VOWELS = {
+    "َ": "a", "ِ": "i", "ُ": "u", "ً": "an", "ٍ": "in",
+    "ٌ": "un", "ٰ": "a", "ْ": "",
+}
+_SHADDA = "ّ"
+
+
+def transliterate(text: str) -> str:
+    """Rough Latin transliteration of vocalised Arabic, e.g. for matching 'kursi'"""
+    words = []
+    for word in text.split():
+        out, last_consonant = [], None
+        for char in word:
+            if char in _LETTERS:
+                last_consonant = len(out)
+                out.append(_LETTERS[char])
+            elif char in _VOWELS:
+                out.append(_VOWELS[char])
+            elif char == _SHADDA and last_consonant is not None:
+                out.insert(last_consonant + 1, out[last_consonant])
+        latin = "".join(out)
+        latin = re.sub(r"uw(?![aiu])", "u", latin)
+        latin = re.sub(r"iy(?![aiu])", "i", latin)
+        latin = re.sub(r"([aiu])\1+", r"\1", latin)
+        latin = re.sub(r"([^aiu])\1\1+", r"\1\1", latin)
+        if latin:
+            words.append(latin)
+            if latin.startswith("al") and len(latin) > 4:
+                words.append(latin[2:])
+    return " ".join(words)
+
+
+def _trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def similarity(query: str, term: str) -> float:
+    """Edit-distance similarity in [0, 1], with credit for prefix matches"""
+    score = 1 - edit_distance(query, term) / max(len(query), len(term))
+    if len(query) >= 4 and term.startswith(query):
+        score = max(score, 0.85)
+    return score
+
+
+class TrigramIndex:
+    """Trigram -> term ids over a fixed vocabulary"""
+
+    def __init__(self, terms):
+        self.terms = sorted({term for term in terms if len(term) >= 2 and not term.isdigit()})
+        self.sizes = array.array("H")
+        grams = {}
+        for term_id, term in enumerate(self.terms):
+            term_grams = _trigrams(term)
+            self.sizes.append(len(term_grams))
+            for gram in term_grams:
+                grams.setdefault(gram, array.array("I")).append(term_id)
+        self.grams = grams
+
+    def lookup(self, token: str, candidates: int, expansions: int, min_similarity: float) -> list:
+        """Return up to `expansions` (term, similarity) pairs for a query token"""
+        query_grams = _trigrams(token)
+        overlap = {}
+        for gram in query_grams:
+            for term_id in self.grams.get(gram, ()):
+                overlap[term_id] = overlap.get(term_id, 0) + 1
+        if not overlap:
+            return []
+
+        size = len(query_grams)
+        dice = heapq.nlargest(
+            candidates,
+            overlap.items(),
+            key=lambda item: 2 * item[1] / (size + self.sizes[item[0]]),
+        )
+        scored = []
+        for term_id, _ in dice:
+            term = self.terms[term_id]
+            score = similarity(token, term)
+            if score >= min_similarity:
+                scored.append((term, score))
+        scored.sort(key=lambda item: -item[1])
+        return scored[:expansions]
+
+
+class FuzzySearch:
+    def __init__(self, search_index: SearchIndex):
+        self.search_index = search_index
+        self.store = search_index.store
+        self.vocabulary = None
+        self.arabic_vocabularies = {}
+        self.transliteration = None
+        self.translit_vocabulary = None
+        self.surah_names = None
+        self.surah_variants = {}
+
+    def _arabic_edition(self):
+        arabic = [
+            identifier for identifier, edition in self.store.meta["editions"].items()
+            if edition.get("language") == "ar"
+        ]
+        # quran-simple carries plain harakat, which transliterate best
+        return "quran-simple" if "quran-simple" in arabic else (arabic[0] if arabic else None)
+
+    def build(self):
+        started = time.perf_counter()
+        terms = set()
+        self.arabic_vocabularies = {}
+        for edition, index in self.search_index.editions.items():
+            if self.store.meta["editions"][edition].get("language") != "ar":
+                terms.update(index.postings)
+            else:
+                # Arabic postings are keyed by normalized words, so a misspelt or
+                # differently vocalised query word is matched against those
+                self.arabic_vocabularies[edition] = TrigramIndex(index.postings)
+        self.vocabulary = TrigramIndex(terms)
+
+        arabic = self._arabic_edition()
+        if arabic:
+            blob = self.store.blob(arabic)
+            self.transliteration = EditionIndex.build(
+                transliterate(blob.text(number)) for number in range(1, TOTAL_AYAHS + 1)
+            )
+            self.translit_vocabulary = TrigramIndex(self.transliteration.postings)
+
+        # "Al-Baqara" is indexed as "al-baqara", "albaqara" and "baqara"
+        self.surah_variants = {}
+        for surah in self.store.meta["surahs"]:
+            name = surah["englishName"].lower()
+            variants = {name, name.replace("-", "").replace("'", ""), surah["englishNameTranslation"].lower()}
+            if "-" in name:
+                variants.add(name.split("-", 1)[1])
+            for variant in variants:
+                self.surah_variants.setdefault(variant, surah["number"])
+        self.surah_names = TrigramIndex(self.surah_variants)
+        logger.info(
+            f"Built fuzzy index over {len(self.vocabulary.terms)} translation and "
+            f"{sum(len(v.terms) for v in self.arabic_vocabularies.values())} Arabic terms "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _expand(self, trigrams: TrigramIndex, postings: EditionIndex, tokens: list, scores: dict,
+                doc_range: tuple, expanded: dict):
+        """Add BM25 scores of each token's closest vocabulary terms, weighted by similarity"""
+        for token in tokens:
+            for term, term_similarity in trigrams.lookup(
+                token,
+                settings.search_fuzzy_candidates,
+                settings.search_fuzzy_expansions,
+                settings.search_fuzzy_min_similarity,
+            ):
+                entry = postings.postings.get(term)
+                if entry is None:
+                    continue
+                expanded.setdefault(token, []).append(term)
+                for doc, bm25 in zip(entry[0], entry[1]):
+                    if doc_range and not doc_range[0] <= doc <= doc_range[1]:
+                        continue
+                    scores[doc] = scores.get(doc, 0.0) + term_similarity * bm25
+
+    def match_surahs(self, query: str) -> list:
+        """Surahs whose names resemble the query, e.g. 'baqara' -> Al-Baqara"""
+        query = query.casefold().strip()
+        best = {}
+        for part in {query, *query.split()}:
+            for variant, score in self.surah_names.lookup(part, 20, 10, 0.75):
+                number = self.surah_variants[variant]
+                best[number] = max(score, best.get(number, 0.0))
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:3]
+        return [{**self.store.surah_meta(number), "score": round(score, 4)} for number, score in ranked]
+
+    def search(self, query: str, edition: str, surah: int = None, offset: int = 0, limit: int = 50) -> dict:
+        doc_range = self.store.surah_range(surah) if surah is not None else None
+        tokens = [token for token in tokenize(query) if len(token) >= 2]
+        scores, expanded = {}, {}
+
+        index = self.search_index.editions[edition]
+        if self.store.meta["editions"][edition].get("language") != "ar":
+            self._expand(self.vocabulary, index, tokens, scores, doc_range, expanded)
+        else:
+            arabic = [token for token in tokens if not token.isascii()]
+            self._expand(self.arabic_vocabularies[edition], index, arabic, scores, doc_range, expanded)
+        if self.transliteration is not None:
+            latin = [token for token in tokens if token.isascii()]
+            self._expand(self.translit_vocabulary, self.transliteration, latin, scores, doc_range, expanded)
+
+        result = self.search_index.response(scores, edition, offset, limit)
+        result["data"]["surahs"] = self.match_surahs(query)
+        result["data"]["expanded_terms"] = expanded
+        return result
@@ -0,0 +1,64 @@
+"""
+Persistent cache of query-less contextual help.
+
+Help for each (screen, language) is stored in the `contextual_help` collection
+with the model and AIService.help_prompt_version it was generated with. On
+startup warm() loads the current entries, generates only the missing ones
+and removes entries from another model or prompt version, so a worker start
+costs no AI calls once the help has been generated.
+"""
+import logging
+from datetime import datetime
+
+from ai_service import ai_service
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "contextual_help"
+
+
+def help_key(screen: str, language: str) -> str:
+    return f"{screen or 'default'}:{language}:{ai_service.model}:{ai_service.help_prompt_version}"
+
+
+async def load() -> dict:
+    """Stored help for the current model and prompt version: {(screen, language): text}"""
+    db = get_database()
+    current = {"model": ai_service.model, "prompt_version": ai_service.help_prompt_version}
+    await db[COLLECTION].delete_many({
+        "$or": [{"model": {"$ne": current["model"]}}, {"prompt_version": {"$ne": current["prompt_version"]}}]
+    })
+    return {
+        (doc["screen"], doc["language"]): doc["help"]
+        async for doc in db[COLLECTION].find(current, {"screen": 1, "language": 1, "help": 1})
+    }
+
+
+async def warm(languages: list = None) -> int:
+    """Fill the in-memory help cache, generating and storing only what is not stored yet"""
+    try:
+        stored = await load()
+    except Exception as e:
+        logger.error(f"Error loading stored contextual help: {e}")
+        stored = {}
+    generated = await ai_service.warm_contextual_help(languages, stored)
+
+    db = get_database()
+    for (screen, language), text in generated.items():
+        try:
+            await db[COLLECTION].replace_one(
+                {"_id": help_key(screen, language)},
+                {
+                    "screen": screen,
+                    "language": language,
+                    "model": ai_service.model,
+                    "prompt_version": ai_service.help_prompt_version,
+                    "help": text,
+                    "created_at": datetime.utcnow()
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error storing contextual help for {screen}/{language}: {e}")
+    return len(generated)
@@ -0,0 +1,226 @@
+"""
+HTTP caching and compression for the immutable Quran endpoints.
+
+Responses are serialized once with orjson, compressed with brotli or gzip
+(whichever the client prefers, above a size threshold) and kept in an LRU
+keyed by ETag and encoding. When the content comes from a known corpus
+version the ETag is derived from the request, that version and
+RESPONSE_SCHEMA alone, so a matching If-None-Match is answered with 304
+before anything is fetched or serialized; otherwise it is a hash of the
+body. Each content coding is a different representation and gets its own
+strong tag ("<digest>-br", "<digest>-gzip", "<digest>" for identity).
+"""
+import gzip
+import hashlib
+import os
+
+import brotli
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from cache import CacheEntry, LRUCache
+from config import settings
+
+JSON = "application/json"
+ENCODINGS = ("br", "gzip")
+CHUNK_SIZE = 64 * 1024
+# Bump whenever the shape of a Quran response changes, so clients holding the
+# old shape revalidate to a 200 instead of getting a 304
+RESPONSE_SCHEMA = 1
+
+
+def accepted_encoding(accept_encoding: str):
+    """The preferred supported content coding of an Accept-Encoding header, or None"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    candidates = [e for e in ENCODINGS if accepted.get(e, accepted.get("*", 0.0)) > 0]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda e: accepted.get(e, accepted.get("*", 0.0)))
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _coded_etag(etag: str, encoding: str = None) -> str:
+    """The strong tag of one content coding of a representation"""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def _matches(if_none_match: str, etag: str):
+    """The tag in If-None-Match that matches `etag` in any content coding, or None"""
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    variants = {etag} | {_coded_etag(etag, encoding) for encoding in ENCODINGS}
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if tag in variants:
+            return tag
+    return None
+
+
+def byte_range(range_header: str, size: int):
+    """
+    (start, end) of a single `bytes=` range, inclusive, or None to send the
+    whole file (no header, or several ranges). Raises ValueError when the
+    range cannot be satisfied.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if not first:
+            # bytes=-N is the last N bytes
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise ValueError(f"Range {range_header} not satisfiable for {size} bytes")
+    return start, end
+
+
+def _read_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request: Request, path: str, media_type: str, etag: str, max_age: int) -> Response:
+    """
+    Stream an immutable file from disk, honouring If-None-Match, Range and
+    If-Range so clients can resume interrupted downloads.
+    """
+    size = os.path.getsize(path)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={max_age}",
+        "Content-Disposition": f'attachment; filename="{os.path.basename(path)}"',
+    }
+    if _matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    span = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            span = byte_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if span is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_read_file(path, 0, size), media_type=media_type, headers=headers)
+    start, end = span
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_read_file(path, start, end - start + 1), status_code=206, media_type=media_type,
+                             headers=headers)
+
+
+class ImmutableResponses:
+    def __init__(self, max_bytes: int, minimum_size: int, max_age: int):
+        self.cache = LRUCache(max_bytes)
+        self.minimum_size = minimum_size
+        self.max_age = max_age
+        self.counters = {"not_modified": 0, "hits": 0, "misses": 0}
+
+    @staticmethod
+    def request_key(request: Request) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def _headers(self, etag: str, encoding: str = None) -> dict:
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return headers
+
+    async def respond(self, request: Request, version: str, build) -> Response:
+        """
+        Serve the result of `await build()` with caching headers.
+
+        `version` identifies the content behind the request (the local corpus
+        version); pass "" when it is not known and the ETag will be a hash of
+        the body instead.
+        """
+        encoding = accepted_encoding(request.headers.get("accept-encoding", ""))
+        if_none_match = request.headers.get("if-none-match", "")
+
+        etag = None
+        cache_key = None
+        if version:
+            key = f"{RESPONSE_SCHEMA}:{self.request_key(request)}:{version}"
+            etag = f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+            matched = _matches(if_none_match, etag)
+            if matched:
+                self.counters["not_modified"] += 1
+                return Response(status_code=304, headers=self._headers(matched))
+            cache_key = f"{etag}:{encoding}"
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                self.counters["hits"] += 1
+                body, body_encoding = entry.value
+                return Response(body, media_type=JSON,
+                                headers=self._headers(_coded_etag(etag, body_encoding), body_encoding))
+
+        self.counters["misses"] += 1
+        body = orjson.dumps(await build())
+        if etag is None:
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            matched = _matches(if_none_match, etag)
+            if matched:
+                self.counters["not_modified"] += 1
+                return Response(status_code=304, headers=self._headers(matched))
+
+        if encoding is not None and len(body) >= self.minimum_size:
+            body = _compress(body, encoding)
+        else:
+            encoding = None
+        if version:
+            self.cache.set(cache_key, CacheEntry((body, encoding), len(body), 0.0, 0.0))
+        return Response(body, media_type=JSON, headers=self._headers(_coded_etag(etag, encoding), encoding))
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "entries": len(self.cache),
+            "bytes": self.cache.current_bytes,
+            "max_bytes": self.cache.max_bytes,
+        }
+
+
+immutable_responses = ImmutableResponses(
+    max_bytes=settings.quran_http_cache_max_bytes,
+    minimum_size=settings.quran_http_compress_min_bytes,
+    max_age=settings.quran_http_max_age,
+)
@@ -0,0 +1,79 @@
+import httpx
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HTTPClient:
+    client: httpx.AsyncClient = None
+    requests_total: int = 0
+    errors_total: int = 0
+
+http = HTTPClient()
+
+async def _on_request(request: httpx.Request):
+    http.requests_total += 1
+
+async def _on_response(response: httpx.Response):
+    if response.status_code >= 500:
+        http.errors_total += 1
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.http2_enabled,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.http_connect_timeout,
+            read=settings.http_read_timeout,
+            write=settings.http_write_timeout,
+            pool=settings.http_pool_timeout,
+        ),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+
+async def open_http_client():
+    """Open the shared upstream HTTP client"""
+    if http.client is None or http.client.is_closed:
+        http.client = _build_client()
+        logger.info(f"Shared HTTP client opened (http2={settings.http2_enabled})")
+
+async def close_http_client():
+    """Close the shared upstream HTTP client"""
+    try:
+        if http.client is not None and not http.client.is_closed:
+            await http.client.aclose()
+            logger.info("Shared HTTP client closed")
+    except Exception as e:
+        logger.error(f"Error closing HTTP client: {e}")
+    finally:
+        http.client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared client, creating it on first use outside the app lifespan"""
+    if http.client is None or http.client.is_closed:
+        http.client = _build_client()
+    return http.client
+
+def get_pool_stats() -> dict:
+    """Connection pool usage for the shared client"""
+    stats = {
+        "open": http.client is not None and not http.client.is_closed,
+        "http2": settings.http2_enabled,
+        "max_connections": settings.http_max_connections,
+        "max_keepalive_connections": settings.http_max_keepalive_connections,
+        "requests_total": http.requests_total,
+        "upstream_errors_total": http.errors_total,
+    }
+    # httpcore exposes the live connections on the transport's pool
+    pool = getattr(getattr(http.client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is not None:
+        idle = sum(1 for connection in connections if connection.is_idle())
+        stats["connections"] = len(connections)
+        stats["idle_connections"] = idle
+        stats["active_connections"] = len(connections) - idle
+    return stats
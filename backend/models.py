@@ -81,8 +81,19 @@ class PrayerTimes(BaseModel):
 class ChatMessage(BaseModel):
     message: str
     context: Optional[dict] = None
+    language: Optional[str] = None
 
 class VerseQuery(BaseModel):
     surah_number: int
     ayat_number: int
-    language: Optional[str] = "en"
\ No newline at end of file
+    language: Optional[str] = "en"
+
+class ProgressEvent(BaseModel):
+    surah_number: int
+    ayat_number: int
+    time_spent: int = 0  # in seconds
+    date: Optional[datetime] = None  # when it was read on the device
+    event_id: Optional[str] = None  # client-generated; makes retried batches idempotent
+
+class ProgressBatch(BaseModel):
+    events: List[ProgressEvent]
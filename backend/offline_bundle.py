@@ -0,0 +1,276 @@
+"""
+Offline corpus bundles for the mobile app.
+
+A bundle is a gzip-compressed SQLite database holding the surah and ayah
+structure (surahs, per-ayah juz/page/... columns, division boundaries) and
+the texts of the selected editions. Bundles are built once per corpus
+version and edition set, kept on disk and served from there with HTTP range
+support (see http_cache.file_response), so interrupted downloads resume.
+
+Each corpus version the server sees leaves a small manifest of per-edition
+digests, which lets a delta bundle carry only the editions that changed
+since the version a client already has. Build ahead of time with:
+
+    python offline_bundle.py build --editions quran-uthmani,en.sahih
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+from datetime import datetime
+
+from config import settings
+from quran_store import AYAH_COLUMNS, BASE_DIR, QuranStore, CorpusNotAvailable
+from quran_structure import TOTAL_AYAHS, structure as quran_structure, locate
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+MEDIA_TYPE = "application/vnd.sqlite3+gzip"
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE editions (identifier TEXT PRIMARY KEY, info TEXT NOT NULL);
+CREATE TABLE surahs (
+    number INTEGER PRIMARY KEY, name TEXT, englishName TEXT, englishNameTranslation TEXT,
+    numberOfAyahs INTEGER, revelationType TEXT
+);
+CREATE TABLE ayahs (
+    number INTEGER PRIMARY KEY, surah INTEGER NOT NULL, numberInSurah INTEGER NOT NULL,
+    juz INTEGER, manzil INTEGER, page INTEGER, ruku INTEGER, hizbQuarter INTEGER, sajda TEXT
+);
+CREATE TABLE divisions (
+    division TEXT NOT NULL, number INTEGER NOT NULL, first INTEGER NOT NULL, last INTEGER NOT NULL,
+    PRIMARY KEY (division, number)
+) WITHOUT ROWID;
+CREATE TABLE texts (
+    edition TEXT NOT NULL, number INTEGER NOT NULL, text TEXT NOT NULL,
+    PRIMARY KEY (edition, number)
+) WITHOUT ROWID;
+"""
+
+
+class UnknownVersion(LookupError):
+    """Raised for a delta from a corpus version this server has no manifest for"""
+
+
+def _digest(payload: bytes) -> str:
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+class OfflineBundles:
+    def __init__(self, store: QuranStore, bundle_dir: str, structure=quran_structure):
+        self.store = store
+        self.bundle_dir = bundle_dir if os.path.isabs(bundle_dir) else os.path.join(BASE_DIR, bundle_dir)
+        self.structure = structure
+        self.flight = SingleFlight()
+
+    # ----- manifests -----
+
+    def _manifest_path(self, version: str) -> str:
+        return os.path.join(self.bundle_dir, "manifests", f"{version}.json")
+
+    def manifest(self) -> dict:
+        """Per-edition digests of the loaded corpus; recorded on disk the first time a version is seen"""
+        if not self.store.available:
+            raise CorpusNotAvailable("Local Quran corpus is not loaded")
+        path = self._manifest_path(self.store.version)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+
+        meta = self.store.meta
+        digests = meta.get("digests") or {}
+        editions = {}
+        for edition in self.store.editions():
+            if edition not in digests:
+                with open(os.path.join(self.store.data_dir, f"{edition}.txt"), "rb") as f:
+                    digests[edition] = _digest(f.read())
+            editions[edition] = digests[edition]
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "version": self.store.version,
+            "structure": _digest(json.dumps(
+                [meta["surahs"], meta["ayahs"], meta["sajdas"]], sort_keys=True
+            ).encode("utf-8")),
+            "editions": editions,
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+        return manifest
+
+    def _old_manifest(self, version: str) -> dict:
+        path = self._manifest_path(version)
+        if not version.isalnum() or not os.path.exists(path):
+            raise UnknownVersion(f"Unknown corpus version '{version}', download the full bundle")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _editions(self, editions: list = None) -> list:
+        editions = sorted(set(editions)) if editions else sorted(self.store.editions())
+        for edition in editions:
+            if not self.store.has_edition(edition):
+                raise CorpusNotAvailable(f"Edition '{edition}' is not available offline")
+        return editions
+
+    # ----- building -----
+
+    def _write(self, path: str, editions: list, with_structure: bool, meta: dict):
+        """Write a bundle database to `path` (gzip-compressed, atomically)"""
+        db_path = path + ".sqlite.tmp"
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                (key, value if isinstance(value, str) else json.dumps(value)) for key, value in meta.items()
+            ])
+            conn.executemany("INSERT INTO editions VALUES (?, ?)", [
+                (edition, json.dumps(self.store.meta["editions"][edition], ensure_ascii=False))
+                for edition in editions
+            ])
+            if with_structure:
+                self._write_structure(conn)
+            for edition in editions:
+                blob = self.store.blob(edition)
+                conn.executemany("INSERT INTO texts VALUES (?, ?, ?)", (
+                    (edition, number, blob.text(number)) for number in range(1, TOTAL_AYAHS + 1)
+                ))
+            conn.commit()
+        finally:
+            conn.close()
+
+        gz_path = path + ".tmp"
+        with open(db_path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=9) as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(db_path)
+        os.replace(gz_path, path)
+
+    def _write_structure(self, conn):
+        meta = self.store.meta
+        conn.executemany("INSERT INTO surahs VALUES (?, ?, ?, ?, ?, ?)", [
+            (s["number"], s["name"], s["englishName"], s["englishNameTranslation"], s["numberOfAyahs"],
+             s["revelationType"])
+            for s in meta["surahs"]
+        ])
+        columns = meta["ayahs"]
+        rows = []
+        for i in range(TOTAL_AYAHS):
+            sajda = meta["sajdas"].get(str(i + 1))
+            rows.append((i + 1, *locate(i + 1), *(columns[column][i] for column in AYAH_COLUMNS),
+                         json.dumps(sajda) if sajda else None))
+        conn.executemany("INSERT INTO ayahs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany("INSERT INTO divisions VALUES (?, ?, ?, ?)", [
+            (division, number, starts[number - 1], starts[number] - 1)
+            for division, starts in self.structure.boundaries.items()
+            for number in range(1, len(starts))
+        ])
+
+    def _key(self, editions: list) -> str:
+        return _digest(",".join(editions).encode("utf-8"))[:8]
+
+    def build(self, editions: list = None) -> str:
+        """Path of the full bundle for the current version, building it if needed"""
+        editions = self._editions(editions)
+        manifest = self.manifest()
+        path = os.path.join(self.bundle_dir, f"quran-{manifest['version']}-{self._key(editions)}.sqlite.gz")
+        if not os.path.exists(path):
+            self._write(path, editions, True, {
+                "format": str(BUNDLE_FORMAT),
+                "version": manifest["version"],
+                "editions": editions,
+                "created_at": datetime.utcnow().isoformat(),
+            })
+            logger.info(f"Built offline bundle {os.path.basename(path)} ({os.path.getsize(path)} bytes)")
+            self.prune()
+        return path
+
+    def build_delta(self, since: str, editions: list = None) -> str:
+        """Path of a bundle with only the editions that changed between `since` and the current version"""
+        editions = self._editions(editions)
+        manifest = self.manifest()
+        old = self._old_manifest(since)
+        changed = [e for e in editions if old["editions"].get(e) != manifest["editions"][e]]
+        removed = sorted(e for e in old["editions"] if e not in manifest["editions"])
+        with_structure = old.get("structure") != manifest["structure"]
+
+        path = os.path.join(
+            self.bundle_dir, f"delta-{since}-{manifest['version']}-{self._key(editions)}.sqlite.gz"
+        )
+        if not os.path.exists(path):
+            self._write(path, changed, with_structure, {
+                "format": str(BUNDLE_FORMAT),
+                "version": manifest["version"],
+                "base_version": since,
+                "editions": changed,
+                "removed_editions": removed,
+                "structure": "included" if with_structure else "unchanged",
+                "created_at": datetime.utcnow().isoformat(),
+            })
+            logger.info(f"Built delta bundle {os.path.basename(path)}: {len(changed)} changed editions")
+        return path
+
+    def prune(self):
+        """Remove bundles built for other corpus versions (manifests are kept for deltas)"""
+        version = self.store.version
+        for name in os.listdir(self.bundle_dir):
+            if name.endswith(".sqlite.gz") and f"-{version}-" not in name:
+                os.remove(os.path.join(self.bundle_dir, name))
+
+    # ----- async entry points -----
+
+    async def bundle(self, editions: list = None) -> str:
+        os.makedirs(self.bundle_dir, exist_ok=True)
+        key = ("full", tuple(self._editions(editions)))
+        return await self.flight.do(key, lambda: asyncio.to_thread(self.build, editions))
+
+    async def delta(self, since: str, editions: list = None) -> str:
+        os.makedirs(self.bundle_dir, exist_ok=True)
+        key = ("delta", since, tuple(self._editions(editions)))
+        return await self.flight.do(key, lambda: asyncio.to_thread(self.build_delta, since, editions))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build offline Quran bundles")
+    parser.add_argument("command", choices=["build", "manifest"])
+    parser.add_argument("--editions", default="", help="Comma-separated edition identifiers (default: all)")
+    parser.add_argument("--since", help="Build a delta from this corpus version instead")
+    parser.add_argument("--data-dir", default=settings.quran_data_dir)
+    parser.add_argument("--bundle-dir", default=settings.quran_bundle_dir)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    store = QuranStore(args.data_dir)
+    if not store.load():
+        return 1
+    bundles = OfflineBundles(store, args.bundle_dir)
+    os.makedirs(bundles.bundle_dir, exist_ok=True)
+
+    if args.command == "manifest":
+        print(json.dumps(bundles.manifest(), indent=2))
+        return 0
+    editions = [e.strip() for e in args.editions.split(",") if e.strip()] or None
+    try:
+        path = bundles.build_delta(args.since, editions) if args.since else bundles.build(editions)
+    except (CorpusNotAvailable, UnknownVersion) as e:
+        logger.error(str(e))
+        return 1
+    print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
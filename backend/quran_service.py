@@ -1,93 +1,245 @@
-import httpx
 from config import settings
+from http_client import get_http_client
+from cache import TieredCache
+from singleflight import SingleFlight
+from quran_store import QuranStore, CorpusNotAvailable
+from quran_structure import SURAHS, structure, absolute_number
+from search_index import SearchIndex
+from fuzzy_search import FuzzySearch
+from semantic_search import SemanticIndex
+from offline_bundle import OfflineBundles
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Default translation edition for each supported language code
+TRANSLATION_EDITIONS = {
+    "en": "en.sahih",
+    "ms": "ms.basmeih",
+    "ur": "ur.jalandhry",
+    "id": "id.indonesian"
+}
+
+def align_editions(surahs: list) -> dict:
+    """
+    Merge one surah in several editions into one object per ayah.
+
+    Surah metadata and the structural fields (juz, page, ...) are kept once;
+    each ayah carries the text of every edition under `texts`, keyed by the
+    edition identifier, in the order listed in `editions`.
+    """
+    first = surahs[0]
+    numbers = [ayah["number"] for ayah in first["ayahs"]]
+    for surah in surahs[1:]:
+        if [ayah["number"] for ayah in surah["ayahs"]] != numbers:
+            raise ValueError(f"Editions of surah {first['number']} disagree on its ayahs")
+    identifiers = [surah["edition"]["identifier"] for surah in surahs]
+
+    aligned = {key: value for key, value in first.items() if key not in ("ayahs", "edition")}
+    aligned["editions"] = [surah["edition"] for surah in surahs]
+    aligned["ayahs"] = []
+    for i, ayah in enumerate(first["ayahs"]):
+        merged = {key: value for key, value in ayah.items() if key != "text"}
+        merged["texts"] = {identifier: surah["ayahs"][i]["text"] for identifier, surah in zip(identifiers, surahs)}
+        aligned["ayahs"].append(merged)
+    return aligned
+
+def select_ayahs(data: dict, start: int = 1, stop: int = None, fields=None) -> dict:
+    """Ayahs start..stop of a surah/juz `data`, projected to `fields` (`number` is always kept)"""
+    selected = dict(data)
+    ayahs = data["ayahs"][start - 1:stop]
+    if fields is not None:
+        ayahs = [{key: value for key, value in ayah.items() if key == "number" or key in fields} for ayah in ayahs]
+    selected["ayahs"] = ayahs
+    return selected
+
+def _selected(result: dict, start: int, stop: int, fields) -> dict:
+    """An upstream response narrowed to the requested ayahs; the (cached) original is not modified"""
+    if start == 1 and stop is None and fields is None:
+        return result
+    return {**result, "data": select_ayahs(result["data"], start, stop, fields)}
+
 class QuranService:
     def __init__(self):
         self.base_url = settings.quran_api_base_url
-        self.timeout = 30.0
+        self.store = QuranStore(settings.quran_data_dir)
+        self.local_mode = settings.quran_local_mode
+        self.store.load()
+        self.search_index = SearchIndex(self.store)
+        self.fuzzy_search = FuzzySearch(self.search_index)
+        self.semantic_index = SemanticIndex(self.search_index)
+        self.bundles = OfflineBundles(self.store, settings.quran_bundle_dir)
+        self.flight = SingleFlight()
+        self.cache = None
+        if settings.quran_cache_enabled:
+            self.cache = TieredCache(
+                settings.quran_cache_collection,
+                max_bytes=settings.quran_cache_max_bytes,
+                ttl=settings.quran_cache_ttl,
+                stale_ttl=settings.quran_cache_stale_ttl,
+            )
+
+    def _serve_locally(self, *editions) -> bool:
+        """In local mode every read is answered from the store, never from upstream"""
+        if not self.local_mode:
+            return False
+        if not self.store.available:
+            raise CorpusNotAvailable("Local mode is enabled but no corpus has been ingested")
+        for edition in editions:
+            if not self.store.has_edition(edition):
+                raise CorpusNotAvailable(f"Edition '{edition}' is not available offline")
+        return True
+
+    def content_version(self) -> str:
+        """Corpus version when every Quran read is answered from the local corpus, else an empty string"""
+        if self.local_mode and self.store.available:
+            return self.store.version
+        return ""
+
+    def load_search_index(self):
+        """Load the persisted search indexes, building them if the corpus changed"""
+        if self.store.available and not self.search_index.editions:
+            self.search_index.load_or_build()
+            self.fuzzy_search.build()
+            self.semantic_index.load_or_build()
+
+    async def _get(self, path: str) -> dict:
+        """GET a path on the upstream API through the shared client"""
+        response = await get_http_client().get(f"{self.base_url}{path}")
+        response.raise_for_status()
+        return response.json()
+
+    async def _fetch(self, key: str, path: str) -> dict:
+        """GET an upstream path through the response cache, coalescing concurrent misses"""
+        def fetch():
+            return self.flight.do(key, lambda: self._get(path))
 
-    async def get_surah(self, surah_number: int, edition: str = "quran-simple"):
-        """Get a complete surah"""
+        if self.cache is None:
+            return await fetch()
+        return await self.cache.get_or_fetch(key, fetch)
+
+    async def get_surah(self, surah_number: int, edition: str = "quran-simple", start: int = 1, stop: int = None,
+                        fields=None):
+        """Get a complete surah, or ayahs start..stop of it projected to `fields`"""
+        if self._serve_locally(edition):
+            return self.store.surah(surah_number, edition, start, stop, fields)
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/surah/{surah_number}/{edition}")
-                response.raise_for_status()
-                return response.json()
+            result = await self._fetch(f"surah:{surah_number}:{edition}", f"/surah/{surah_number}/{edition}")
+            return _selected(result, start, stop, fields)
         except Exception as e:
             logger.error(f"Error fetching surah {surah_number}: {e}")
             raise
 
     async def get_ayah(self, surah_number: int, ayat_number: int, edition: str = "quran-simple"):
         """Get a specific ayah"""
+        # Out-of-range references fail here instead of at the upstream API
+        absolute_number(surah_number, ayat_number)
+        if self._serve_locally(edition):
+            return self.store.ayah(surah_number, ayat_number, edition)
         try:
             # Calculate absolute ayah number
             reference = f"{surah_number}:{ayat_number}"
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/ayah/{reference}/{edition}")
-                response.raise_for_status()
-                return response.json()
+            return await self._fetch(f"ayah:{reference}:{edition}", f"/ayah/{reference}/{edition}")
         except Exception as e:
             logger.error(f"Error fetching ayah {surah_number}:{ayat_number}: {e}")
             raise
 
-    async def get_translations(self, surah_number: int, editions: list):
-        """Get multiple translations for a surah"""
+    async def get_translations(self, surah_number: int, editions: list, layout: str = "editions", start: int = 1,
+                               stop: int = None, fields=None):
+        """Get a surah in several editions, fetched per edition so each is cached and reused on its own"""
         try:
-            editions_str = ",".join(editions)
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/surah/{surah_number}/editions/{editions_str}")
-                response.raise_for_status()
-                return response.json()
+            surahs = await asyncio.gather(*(
+                self.get_surah(surah_number, edition, start, stop) for edition in editions
+            ))
         except Exception as e:
             logger.error(f"Error fetching translations for surah {surah_number}: {e}")
             raise
+        if layout == "aligned":
+            data = align_editions([surah["data"] for surah in surahs])
+            if fields is not None:
+                data = select_ayahs(data, fields=fields)
+        else:
+            data = [surah["data"] if fields is None else select_ayahs(surah["data"], fields=fields) for surah in surahs]
+        return {"code": 200, "status": "OK", "data": data}
 
-    async def search_quran(self, query: str, edition: str = "quran-simple"):
+    async def search_quran(self, query: str, edition: str = "quran-simple", surah: int = None,
+                           offset: int = 0, limit: int = 50, fuzzy: bool = False):
         """Search in Quran text"""
+        # The indexes are built at startup (load_search_index), never while serving a request
+        if self.search_index.has_edition(edition):
+            if fuzzy:
+                return self.fuzzy_search.search(query, edition, surah, offset, limit)
+            return self.search_index.search(query, edition, surah, offset, limit)
+        if fuzzy:
+            raise CorpusNotAvailable(f"Fuzzy search needs edition '{edition}' in the local search index")
+        if self.local_mode and self.store.has_edition(edition):
+            raise CorpusNotAvailable("The local search index has not been built")
+        self._serve_locally(edition)
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # The correct endpoint format is /search/{query}/{surah_number}/{edition}
-                # For all surahs, we can use 'all' or just query the first result
-                response = await client.get(
-                    f"{self.base_url}/search/{query}/all/{edition}"
-                )
-                # If 404, try alternative format
-                if response.status_code == 404:
-                    logger.info("Search endpoint format might have changed, trying alternative")
-                    # Alternative: search without 'all'
-                    response = await client.get(
-                        f"{self.base_url}/search/{query}/{edition}"
-                    )
-                response.raise_for_status()
-                return response.json()
+            result = await self.flight.do(
+                f"search:{query}:{surah or 'all'}:{edition}",
+                lambda: self._search_upstream(query, edition, surah),
+            )
         except Exception as e:
             logger.error(f"Error searching Quran: {e}")
-            # Return empty results instead of raising
-            return {"code": 200, "status": "OK", "data": {"count": 0, "matches": []}}
+            raise
+        matches = result.get("data", {}).get("matches", [])
+        return {
+            "code": 200,
+            "status": "OK",
+            "data": {"count": len(matches), "offset": offset, "limit": limit, "matches": matches[offset:offset + limit]},
+        }
+
+    def semantic_search(self, query: str, edition: str = "en.sahih", k: int = 10, mode: str = "exact",
+                        surah: int = None):
+        """Find ayahs related in meaning to the query, entirely offline"""
+        if not self.semantic_index.has_edition(edition):
+            raise CorpusNotAvailable(f"No semantic index for edition '{edition}'")
+        return self.semantic_index.search(query, edition, k, mode, surah)
+
+    async def _search_upstream(self, query: str, edition: str, surah: int = None):
+        """Query the upstream search endpoint"""
+        client = get_http_client()
+        # The correct endpoint format is /search/{query}/{surah_number}/{edition}
+        # For all surahs, we can use 'all' or just query the first result
+        response = await client.get(
+            f"{self.base_url}/search/{query}/{surah or 'all'}/{edition}"
+        )
+        # If 404, try alternative format
+        if response.status_code == 404:
+            logger.info("Search endpoint format might have changed, trying alternative")
+            # Alternative: search without 'all'
+            response = await client.get(
+                f"{self.base_url}/search/{query}/{edition}"
+            )
+        response.raise_for_status()
+        return response.json()
 
     async def get_surah_list(self):
-        """Get list of all surahs"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/surah")
-                response.raise_for_status()
-                return response.json()
-        except Exception as e:
-            logger.error(f"Error fetching surah list: {e}")
-            raise
+        """Get list of all surahs (from the corpus if one is loaded, else the compiled-in metadata)"""
+        if self.store.available:
+            return self.store.surah_list()
+        return {"code": 200, "status": "OK", "data": list(SURAHS)}
 
-    async def get_juz(self, juz_number: int, edition: str = "quran-simple"):
+    async def get_juz(self, juz_number: int, edition: str = "quran-simple", start: int = 1, stop: int = None,
+                      fields=None):
         """Get a complete juz"""
+        return await self.get_division("juz", juz_number, edition, start, stop, fields)
+
+    async def get_division(self, division: str, number: int, edition: str = "quran-simple", start: int = 1,
+                           stop: int = None, fields=None):
+        """Get a juz, hizb, hizb quarter, manzil, page or ruku (or ayahs start..stop of it)"""
+        if self.store.has_edition(edition):
+            return self.store.division(division, number, edition, structure, start, stop, fields)
+        self._serve_locally(edition)
+        if division == "hizb":
+            raise CorpusNotAvailable("Hizb views need the local corpus")
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/juz/{juz_number}/{edition}")
-                response.raise_for_status()
-                return response.json()
+            result = await self._fetch(f"{division}:{number}:{edition}", f"/{division}/{number}/{edition}")
+            return _selected(result, start, stop, fields)
         except Exception as e:
-            logger.error(f"Error fetching juz {juz_number}: {e}")
+            logger.error(f"Error fetching {division} {number}: {e}")
             raise
 
     def get_available_editions(self):
@@ -0,0 +1,377 @@
+"""
+Local, memory-mapped Quran corpus store.
+
+Each edition is kept as two files inside the data directory:
+
+    <edition>.txt  - every ayah's UTF-8 text concatenated in mushaf order
+    <edition>.idx  - fixed-width uint32 offset table with TOTAL_AYAHS + 1
+                     entries; ayah N (absolute, 1-based) is the byte range
+                     offsets[N - 1]:offsets[N] of the text blob
+
+Surah metadata, edition metadata and the per-ayah structural columns (juz,
+page, ruku, ...) are shared by all editions and live in meta.json.
+
+Populate the store once with:
+
+    python quran_store.py ingest --editions quran-uthmani,en.sahih
+"""
+import argparse
+import array
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sys
+from datetime import datetime
+
+import httpx
+
+from config import settings
+from quran_structure import AYAH_COUNTS, SURAH_OF, SURAH_STARTS, TOTAL_AYAHS, absolute_number, structure, surah_range
+
+logger = logging.getLogger(__name__)
+
+CORPUS_FORMAT = 1
+AYAH_COLUMNS = ("juz", "manzil", "page", "ruku", "hizbQuarter")
+# Per-ayah fields a response can be projected to (`number` is always included)
+AYAH_FIELDS = ("number", "text", "surah", "numberInSurah") + AYAH_COLUMNS + ("sajda",)
+SURAH_FIELDS = ("number", "name", "englishName", "englishNameTranslation", "numberOfAyahs", "revelationType")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class CorpusNotAvailable(LookupError):
+    """Raised when the local store cannot serve a request"""
+
+
+class EditionBlob:
+    """Memory-mapped text blob and offset table for one edition"""
+
+    def __init__(self, text_path: str, index_path: str):
+        self._text_file = open(text_path, "rb")
+        self._index_file = open(index_path, "rb")
+        self._text_map = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.text_view = memoryview(self._text_map)
+        self.offsets = memoryview(self._index_map).cast("I")
+        if len(self.offsets) != TOTAL_AYAHS + 1:
+            self.close()
+            raise CorpusNotAvailable(f"Corrupt offset table in {index_path}")
+
+    def text(self, number: int) -> str:
+        """Decode the text of an absolute ayah number"""
+        return str(self.text_view[self.offsets[number - 1]:self.offsets[number]], "utf-8")
+
+    def close(self):
+        self.offsets.release()
+        self.text_view.release()
+        self._index_map.close()
+        self._text_map.close()
+        self._index_file.close()
+        self._text_file.close()
+
+
+class QuranStore:
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir if os.path.isabs(data_dir) else os.path.join(BASE_DIR, data_dir)
+        self.meta = None
+        self._editions = {}
+        # (edition, with_surah) -> every ayah as a response dict, built on first use
+        self._ayahs = {}
+
+    @property
+    def available(self) -> bool:
+        return self.meta is not None
+
+    @property
+    def version(self) -> str:
+        return self.meta.get("version", "") if self.meta else ""
+
+    def load(self) -> bool:
+        """Open meta.json and map every ingested edition. Returns False if no corpus exists."""
+        meta_path = os.path.join(self.data_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            logger.info(f"No local Quran corpus found in {self.data_dir}")
+            return False
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != CORPUS_FORMAT:
+            raise CorpusNotAvailable(f"Unsupported corpus format {meta.get('format')}")
+
+        if tuple(surah["numberOfAyahs"] for surah in meta["surahs"]) != AYAH_COUNTS:
+            raise CorpusNotAvailable(f"Corpus in {self.data_dir} does not use the Tanzil ayah numbering")
+        differing = structure.differing_columns(meta["ayahs"])
+        if differing:
+            # Division lookups use the compiled boundaries; only the per-ayah fields come from the corpus
+            logger.warning(f"Corpus {', '.join(differing)} numbers differ from the compiled division boundaries")
+
+        self.close()
+        for identifier in meta["editions"]:
+            self._editions[identifier] = EditionBlob(
+                os.path.join(self.data_dir, f"{identifier}.txt"),
+                os.path.join(self.data_dir, f"{identifier}.idx"),
+            )
+
+        self.meta = meta
+        logger.info(f"Loaded local Quran corpus {self.version} with editions: {', '.join(self._editions)}")
+        return True
+
+    def close(self):
+        self._ayahs = {}
+        for blob in self._editions.values():
+            blob.close()
+        self._editions = {}
+
+    def has_edition(self, edition: str) -> bool:
+        return edition in self._editions
+
+    def editions(self) -> list:
+        return list(self._editions)
+
+    # ----- lookups -----
+
+    def blob(self, edition: str) -> EditionBlob:
+        blob = self._editions.get(edition)
+        if blob is None:
+            raise CorpusNotAvailable(f"Edition '{edition}' is not available offline")
+        return blob
+
+    def surah_meta(self, surah_number: int) -> dict:
+        if not self.meta or not 1 <= surah_number <= len(self.meta["surahs"]):
+            raise CorpusNotAvailable(f"Surah {surah_number} is not available offline")
+        return self.meta["surahs"][surah_number - 1]
+
+    # The ayah numbering is the compiled-in one (load() checks the corpus agrees)
+
+    def absolute_number(self, surah_number: int, ayat_number: int) -> int:
+        return absolute_number(surah_number, ayat_number)
+
+    def surah_range(self, surah_number: int) -> tuple:
+        """First and last absolute ayah numbers of a surah"""
+        return surah_range(surah_number)
+
+    def _columns(self, number: int, fields=None) -> dict:
+        """Structural fields (juz, page, ...) of an absolute ayah number"""
+        columns = self.meta["ayahs"]
+        values = {
+            column: columns[column][number - 1]
+            for column in AYAH_COLUMNS if fields is None or column in fields
+        }
+        if fields is None or "sajda" in fields:
+            values["sajda"] = self.meta["sajdas"].get(str(number), False)
+        return values
+
+    def _ayah(self, blob: EditionBlob, number: int, surah_number: int, with_surah: bool = False,
+              fields=None) -> dict:
+        """One ayah, optionally limited to `fields` (a set of AYAH_FIELDS names)"""
+        ayah = {"number": number}
+        if fields is None or "text" in fields:
+            ayah["text"] = blob.text(number)
+        if with_surah and (fields is None or "surah" in fields):
+            ayah["surah"] = self.surah_meta(surah_number)
+        if fields is None or "numberInSurah" in fields:
+            ayah["numberInSurah"] = number - SURAH_STARTS[surah_number - 1] + 1
+        ayah.update(self._columns(number, fields))
+        return ayah
+
+    def ayahs(self, edition: str, with_surah: bool = False) -> list:
+        """
+        Every ayah of an edition as response dicts, decoded once and shared by
+        all later responses, so a surah or juz is a slice of this list. The
+        dicts are immutable by convention: copy before changing one.
+        """
+        key = (edition, with_surah)
+        ayahs = self._ayahs.get(key)
+        if ayahs is None:
+            blob = self.blob(edition)
+            ayahs = self._ayahs[key] = [
+                self._ayah(blob, number, SURAH_OF[number], with_surah) for number in range(1, TOTAL_AYAHS + 1)
+            ]
+        return ayahs
+
+    @staticmethod
+    def _clip(first: int, last: int, start: int = 1, stop: int = None) -> tuple:
+        """Narrow [first, last] to positions start..stop (1-based, inclusive) within it"""
+        return first + start - 1, last if stop is None else min(last, first + stop - 1)
+
+    # ----- response builders (same shapes as api.alquran.cloud) -----
+
+    @staticmethod
+    def _ok(data) -> dict:
+        return {"code": 200, "status": "OK", "data": data}
+
+    def surah_list(self) -> dict:
+        if not self.meta:
+            raise CorpusNotAvailable("Local Quran corpus is not loaded")
+        return self._ok(self.meta["surahs"])
+
+    def surah_data(self, surah_number: int, edition: str, start: int = 1, stop: int = None, fields=None) -> dict:
+        """A surah, or ayahs start..stop of it, optionally projected to `fields`"""
+        blob = self.blob(edition)
+        surah = self.surah_meta(surah_number)
+        first, last = self._clip(*self.surah_range(surah_number), start, stop)
+        data = dict(surah)
+        if fields is None:
+            data["ayahs"] = self.ayahs(edition)[first - 1:last]
+        else:
+            data["ayahs"] = [
+                self._ayah(blob, number, surah_number, fields=fields)
+                for number in range(first, last + 1)
+            ]
+        data["edition"] = self.meta["editions"][edition]
+        return data
+
+    def surah(self, surah_number: int, edition: str, start: int = 1, stop: int = None, fields=None) -> dict:
+        return self._ok(self.surah_data(surah_number, edition, start, stop, fields))
+
+    def ayah(self, surah_number: int, ayat_number: int, edition: str) -> dict:
+        blob = self.blob(edition)
+        number = self.absolute_number(surah_number, ayat_number)
+        data = {
+            "number": number,
+            "text": blob.text(number),
+            "edition": self.meta["editions"][edition],
+            "surah": self.surah_meta(surah_number),
+            "numberInSurah": ayat_number,
+        }
+        data.update(self._columns(number))
+        return self._ok(data)
+
+    def division(self, division: str, number: int, edition: str, structure, start: int = 1, stop: int = None,
+                 fields=None) -> dict:
+        """A juz, hizb, page, ruku, ... (or its ayahs start..stop) assembled from one contiguous ayah range"""
+        blob = self.blob(edition)
+        first, last = self._clip(*structure.division_range(division, number), start, stop)
+        if fields is None:
+            ayahs = self.ayahs(edition, with_surah=True)[first - 1:last]
+        else:
+            ayahs = [
+                self._ayah(blob, ayah_number, SURAH_OF[ayah_number], with_surah=True, fields=fields)
+                for ayah_number in range(first, last + 1)
+            ]
+        surahs = {
+            str(surah_number): self.surah_meta(surah_number)
+            for surah_number in (range(SURAH_OF[first], SURAH_OF[last] + 1) if first <= last else ())
+        }
+        return self._ok({
+            "number": number,
+            "ayahs": ayahs,
+            "surahs": surahs,
+            "edition": self.meta["editions"][edition],
+        })
+
+
+# ============= INGESTION =============
+
+def _write_atomic(path: str, payload: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _encode_edition(surahs: list) -> tuple:
+    """Return (text blob, offset table bytes) for one edition"""
+    offsets = array.array("I", [0])
+    chunks = []
+    for surah in surahs:
+        for ayah in surah["ayahs"]:
+            encoded = ayah["text"].encode("utf-8")
+            chunks.append(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+    if len(offsets) != TOTAL_AYAHS + 1:
+        raise ValueError(f"Expected {TOTAL_AYAHS} ayahs, got {len(offsets) - 1}")
+    return b"".join(chunks), offsets.tobytes()
+
+
+def _structure_from(surahs: list) -> dict:
+    """Extract surah metadata and per-ayah columns from a full-Quran response"""
+    columns = {column: [] for column in AYAH_COLUMNS}
+    sajdas = {}
+    for surah in surahs:
+        for ayah in surah["ayahs"]:
+            for column in AYAH_COLUMNS:
+                columns[column].append(ayah[column])
+            if ayah.get("sajda"):
+                sajdas[str(ayah["number"])] = ayah["sajda"]
+    return {
+        "surahs": [{field: surah[field] for field in SURAH_FIELDS} for surah in surahs],
+        "ayahs": columns,
+        "sajdas": sajdas,
+    }
+
+
+async def ingest(editions: list, data_dir: str = None):
+    """Download the given editions from the upstream API and write them to the store"""
+    store = QuranStore(data_dir or settings.quran_data_dir)
+    os.makedirs(store.data_dir, exist_ok=True)
+
+    meta_path = os.path.join(store.data_dir, "meta.json")
+    meta = {"format": CORPUS_FORMAT, "editions": {}}
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            existing = json.load(f)
+        if existing.get("format") == CORPUS_FORMAT:
+            meta = existing
+
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        for edition in editions:
+            logger.info(f"Downloading edition {edition}...")
+            response = await client.get(f"{settings.quran_api_base_url}/quran/{edition}")
+            response.raise_for_status()
+            data = response.json()["data"]
+
+            text_blob, index_blob = _encode_edition(data["surahs"])
+            _write_atomic(os.path.join(store.data_dir, f"{edition}.txt"), text_blob)
+            _write_atomic(os.path.join(store.data_dir, f"{edition}.idx"), index_blob)
+
+            if "surahs" not in meta:
+                meta.update(_structure_from(data["surahs"]))
+            meta["editions"][edition] = data["edition"]
+            meta.setdefault("digests", {})[edition] = hashlib.sha256(text_blob).hexdigest()[:16]
+            logger.info(f"Stored {edition}: {len(text_blob)} bytes")
+
+    digest = hashlib.sha256()
+    for edition in sorted(meta["editions"]):
+        with open(os.path.join(store.data_dir, f"{edition}.txt"), "rb") as f:
+            digest.update(edition.encode("utf-8"))
+            digest.update(f.read())
+    meta["version"] = digest.hexdigest()[:16]
+    meta["ingested_at"] = datetime.utcnow().isoformat()
+    _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+    logger.info(f"Corpus version {meta['version']} written to {store.data_dir}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local Quran corpus")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Download editions into the local store")
+    ingest_parser.add_argument("--editions", default=settings.quran_editions,
+                               help="Comma-separated edition identifiers")
+    ingest_parser.add_argument("--data-dir", default=settings.quran_data_dir)
+
+    info_parser = subparsers.add_parser("info", help="Show what the local store contains")
+    info_parser.add_argument("--data-dir", default=settings.quran_data_dir)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "ingest":
+        editions = [e.strip() for e in args.editions.split(",") if e.strip()]
+        asyncio.run(ingest(editions, args.data_dir))
+    else:
+        store = QuranStore(args.data_dir)
+        if not store.load():
+            return 1
+        print(f"Corpus version: {store.version}")
+        print(f"Editions: {', '.join(store.editions())}")
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
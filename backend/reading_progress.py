@@ -0,0 +1,281 @@
+"""
+Reading progress and streak bookkeeping.
+
+The streak lives in user_profiles.streak_data and is updated with a single
+pipeline update, so the read-compare-write happens inside MongoDB and two
+devices syncing at once cannot both extend (or both reset) the streak.
+
+History rows go through a write-behind buffer (see write_buffer.py) rather
+than one insert per request. Each flushed batch is also folded into
+per-user daily rollups (`reading_daily`, one document per user and day) with
+$inc, so statistics never scan the raw history. Rebuild the rollups from
+existing history with:
+
+    python reading_progress.py backfill
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+from database import connect_to_mongo, close_mongo_connection, get_database
+from write_buffer import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 24 * 3600 * 1000
+
+progress_buffer = WriteBehindBuffer(
+    "reading_progress",
+    batch_size=settings.progress_buffer_batch_size,
+    flush_interval=settings.progress_buffer_flush_interval,
+    max_pending=settings.progress_buffer_max_pending,
+)
+
+
+def progress_entry(user_id: str, surah_number, ayat_number, time_spent: int = 0, read_at: datetime = None,
+                   event_id: str = None) -> dict:
+    """A reading_progress history row"""
+    now = datetime.now()
+    if read_at is not None and read_at.tzinfo is not None:
+        # History dates are naive server-local times, like datetime.now()
+        read_at = read_at.astimezone().replace(tzinfo=None)
+    entry = {
+        "user_id": user_id,
+        "surah_number": surah_number,
+        "ayat_number": ayat_number,
+        "time_spent": time_spent,
+        "date": min(read_at, now) if read_at else now
+    }
+    if event_id:
+        entry["_id"] = f"{user_id}:{event_id}"
+    return entry
+
+
+def _seconds(value) -> int:
+    try:
+        return max(int(value or 0), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+async def record_daily(entries: list):
+    """Fold written history rows into the reading_daily rollups"""
+    rollups = {}
+    for entry in entries:
+        day = entry["date"].date().isoformat()
+        rollup = rollups.setdefault((entry["user_id"], day), {"time_spent": 0, "ayahs": 0, "surahs": {}})
+        rollup["time_spent"] += _seconds(entry.get("time_spent"))
+        rollup["ayahs"] += 1
+        if isinstance(entry.get("surah_number"), int):
+            surah = str(entry["surah_number"])
+            rollup["surahs"][surah] = rollup["surahs"].get(surah, 0) + 1
+
+    if not rollups:
+        return
+    await get_database().reading_daily.bulk_write([
+        UpdateOne(
+            {"_id": f"{user_id}:{day}"},
+            {
+                "$setOnInsert": {"user_id": user_id, "day": day},
+                "$inc": {
+                    "time_spent": rollup["time_spent"],
+                    "ayahs": rollup["ayahs"],
+                    **{f"surahs.{surah}": count for surah, count in rollup["surahs"].items()},
+                },
+            },
+            upsert=True,
+        )
+        for (user_id, day), rollup in rollups.items()
+    ], ordered=False)
+
+
+progress_buffer.on_flush.append(record_daily)
+
+
+async def daily_stats(db, user_id: str, days: int) -> dict:
+    """Per-day totals and ayahs per surah over the last `days` days, from the rollups"""
+    today = datetime.now().date()
+    first = today - timedelta(days=days - 1)
+    rollups = {
+        doc["day"]: doc
+        async for doc in db.reading_daily.find(
+            {"user_id": user_id, "day": {"$gte": first.isoformat(), "$lte": today.isoformat()}},
+            {"_id": 0, "day": 1, "time_spent": 1, "ayahs": 1, "surahs": 1}
+        )
+    }
+
+    daily, surahs = [], {}
+    for offset in range(days):
+        day = (first + timedelta(days=offset)).isoformat()
+        rollup = rollups.get(day, {})
+        daily.append({
+            "date": day,
+            "time_spent": rollup.get("time_spent", 0),
+            "minutes": round(rollup.get("time_spent", 0) / 60, 1),
+            "ayahs": rollup.get("ayahs", 0)
+        })
+        for surah, count in rollup.get("surahs", {}).items():
+            surahs[int(surah)] = surahs.get(int(surah), 0) + count
+
+    time_spent = sum(item["time_spent"] for item in daily)
+    return {
+        "from": first.isoformat(),
+        "to": today.isoformat(),
+        "days": days,
+        "totals": {
+            "time_spent": time_spent,
+            "minutes": round(time_spent / 60, 1),
+            "ayahs": sum(item["ayahs"] for item in daily),
+            "active_days": sum(1 for item in daily if item["ayahs"])
+        },
+        "daily": daily,
+        "surahs": [
+            {"surah_number": surah, "ayahs": count}
+            for surah, count in sorted(surahs.items(), key=lambda item: (-item[1], item[0]))
+        ]
+    }
+
+
+def _last_read_day():
+    """streak_data.last_read_date as a 'YYYY-MM-DD' string; stored as an ISO string or a date"""
+    field = "$streak_data.last_read_date"
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": [{"$type": field}, "string"]}, "then": {"$substrCP": [field, 0, 10]}},
+            {"case": {"$eq": [{"$type": field}, "date"]},
+             "then": {"$dateToString": {"date": field, "format": "%Y-%m-%d"}}},
+        ],
+        "default": None,
+    }}
+
+
+def streak_pipeline(days: list, email: str, surah_number, ayat_number, timestamp) -> list:
+    """
+    Update pipeline that records reads on `days` (ascending dates) and advances,
+    keeps or resets the streak once per day, in order. Days on or before the
+    stored last_read_date have already been counted and are skipped.
+    """
+    midnights = [datetime(day.year, day.month, day.day) for day in days]
+    return [
+        {"$set": {"_last": {"$dateFromString": {"dateString": _last_read_day(), "format": "%Y-%m-%d",
+                                                "onError": None, "onNull": None}}}},
+        {"$set": {"_streak": {"$reduce": {
+            "input": {"$literal": midnights},
+            "initialValue": {
+                "last": "$_last",
+                "current": {"$ifNull": ["$streak_data.current_streak", 0]},
+                "longest": {"$ifNull": ["$streak_data.longest_streak", 0]},
+            },
+            "in": {"$cond": [
+                {"$and": [{"$ne": ["$$value.last", None]}, {"$lte": ["$$this", "$$value.last"]}]},
+                "$$value",
+                # The day after the last read extends the streak, anything later restarts it
+                {"$let": {
+                    "vars": {"current": {"$cond": [
+                        {"$eq": [{"$subtract": ["$$this", "$$value.last"]}, DAY_MS]},
+                        {"$add": ["$$value.current", 1]},
+                        1,
+                    ]}},
+                    "in": {"last": "$$this", "current": "$$current",
+                           "longest": {"$max": ["$$value.longest", "$$current"]}},
+                }},
+            ]},
+        }}}},
+        {"$set": {
+            "email": {"$ifNull": ["$email", email]},
+            "reading_progress.last_surah": {"$literal": surah_number},
+            "reading_progress.last_ayat": {"$literal": ayat_number},
+            "reading_progress.last_updated": {"$literal": timestamp},
+            "streak_data.current_streak": "$_streak.current",
+            "streak_data.longest_streak": "$_streak.longest",
+            "streak_data.last_read_date": {"$dateToString": {"date": "$_streak.last", "format": "%Y-%m-%d"}},
+        }},
+        {"$unset": ["_last", "_streak"]},
+    ]
+
+
+async def update_streak(db, user_id: str, email: str, surah_number, ayat_number, timestamp,
+                        days: list = None) -> dict:
+    """Record reads on `days` (default: today) in one round trip and return the new streak_data"""
+    days = sorted(set(days)) if days else [datetime.now().date()]
+    pipeline = streak_pipeline(days, email, surah_number, ayat_number, timestamp)
+    for attempt in range(2):
+        try:
+            profile = await db.user_profiles.find_one_and_update(
+                {"user_id": user_id},
+                pipeline,
+                projection={"_id": 0, "streak_data": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return profile["streak_data"]
+        except DuplicateKeyError:
+            # Two first-ever updates raced to create the profile; the loser retries as an update
+            if attempt:
+                raise
+
+
+BACKFILL_PIPELINE = [
+    {"$group": {
+        "_id": {
+            "user_id": "$user_id",
+            "day": {"$dateToString": {"date": "$date", "format": "%Y-%m-%d"}},
+            "surah": "$surah_number",
+        },
+        "time_spent": {"$sum": {"$cond": [{"$isNumber": "$time_spent"}, {"$max": ["$time_spent", 0]}, 0]}},
+        "ayahs": {"$sum": 1},
+    }},
+    {"$group": {
+        "_id": {"user_id": "$_id.user_id", "day": "$_id.day"},
+        "time_spent": {"$sum": "$time_spent"},
+        "ayahs": {"$sum": "$ayahs"},
+        "surahs": {"$push": {"$cond": [
+            {"$isNumber": "$_id.surah"},
+            {"k": {"$toString": "$_id.surah"}, "v": "$ayahs"},
+            "$$REMOVE",
+        ]}},
+    }},
+    {"$project": {
+        "_id": {"$concat": ["$_id.user_id", ":", "$_id.day"]},
+        "user_id": "$_id.user_id",
+        "day": "$_id.day",
+        "time_spent": 1,
+        "ayahs": 1,
+        "surahs": {"$arrayToObject": "$surahs"},
+    }},
+    {"$merge": {"into": "reading_daily", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+]
+
+
+async def backfill():
+    """Recompute every reading_daily rollup from the raw reading_progress history"""
+    db = get_database()
+    await db.reading_progress.aggregate(BACKFILL_PIPELINE, allowDiskUse=True).to_list(length=None)
+    logger.info(f"Backfilled {await db.reading_daily.estimated_document_count()} daily rollups")
+
+
+async def _main(args):
+    await connect_to_mongo()
+    try:
+        await backfill()
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain reading progress rollups")
+    parser.add_argument("command", choices=["backfill"])
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+In-process inverted index over the local Quran corpus.
+
+Every edition in the QuranStore gets its own postings; document ids are
+absolute ayah numbers so results map straight back onto the store. Each
+posting keeps a precomputed BM25 weight and the term positions needed for
+phrase queries.
+
+Build or refresh the persisted index with:
+
+    python search_index.py build
+"""
+import argparse
+import array
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import sys
+import time
+
+from config import settings
+from quran_store import QuranStore, TOTAL_AYAHS
+from quran_structure import locate
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+INDEX_FILENAME = "search-index.pickle"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Harakat, Quranic annotation marks and the superscript alef
+_HARAKAT = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]")
+_ARABIC_FOLDS = str.maketrans({
+    "\u0640": None,      # tatweel
+    "\u0623": "\u0627",  # alef with hamza above
+    "\u0625": "\u0627",  # alef with hamza below
+    "\u0622": "\u0627",  # alef with madda
+    "\u0671": "\u0627",  # alef wasla
+    "\u0649": "\u064a",  # alef maksura -> ya
+    "\u0626": "\u064a",  # ya with hamza
+    "\u0629": "\u0647",  # ta marbuta -> ha
+})
+_TOKEN = re.compile(r"\w+")
+_PHRASE = re.compile(r'"([^"]+)"')
+
+
+def normalize_arabic(text: str) -> str:
+    """Strip harakat and tatweel and unify alef/ya/ta-marbuta forms"""
+    return _HARAKAT.sub("", text).translate(_ARABIC_FOLDS)
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN.findall(normalize_arabic(text.casefold()))
+
+
+class EditionIndex:
+    """Postings for one edition: term -> (doc ids, BM25 weights, positions per doc)"""
+
+    def __init__(self, postings: dict):
+        self.postings = postings
+
+    @classmethod
+    def build(cls, texts) -> "EditionIndex":
+        raw = {}
+        lengths = array.array("I", [0])
+        for number, text in enumerate(texts, start=1):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for position, token in enumerate(tokens):
+                raw.setdefault(token, {}).setdefault(number, []).append(position)
+
+        avgdl = (sum(lengths) / (len(lengths) - 1)) or 1.0
+        total_docs = len(lengths) - 1
+        postings = {}
+        for term, docs in raw.items():
+            idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            doc_ids = array.array("I", docs)
+            weights = array.array("f")
+            for number, positions in docs.items():
+                tf = len(positions)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[number] / avgdl)
+                weights.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+            postings[term] = (doc_ids, weights, tuple(tuple(p) for p in docs.values()))
+        return cls(postings)
+
+    def _phrase_docs(self, terms: list) -> set:
+        """Docs containing the terms consecutively"""
+        entries = [self.postings.get(term) for term in terms]
+        if not all(entries):
+            return set()
+        positions = [dict(zip(entry[0], entry[2])) for entry in entries]
+        candidates = set(positions[0])
+        for doc_positions in positions[1:]:
+            candidates &= doc_positions.keys()
+
+        matched = set()
+        for doc in candidates:
+            starts = set(positions[0][doc])
+            for offset, doc_positions in enumerate(positions[1:], start=1):
+                starts &= {p - offset for p in doc_positions[doc]}
+                if not starts:
+                    break
+            if starts:
+                matched.add(doc)
+        return matched
+
+    def search(self, query: str, doc_range: tuple = None) -> dict:
+        """Return {doc: score} for every matching doc"""
+        phrases = [tokenize(p) for p in _PHRASE.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = tokenize(_PHRASE.sub(" ", query))
+        for phrase in phrases:
+            terms.extend(phrase)
+
+        scores = {}
+        for term in set(terms):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            for doc, weight in zip(entry[0], entry[1]):
+                scores[doc] = scores.get(doc, 0.0) + weight
+
+        if phrases:
+            allowed = None
+            for phrase in phrases:
+                if len(phrase) > 1:
+                    docs = self._phrase_docs(phrase)
+                else:
+                    # A quoted single word is required, like a phrase
+                    entry = self.postings.get(phrase[0])
+                    docs = set(entry[0]) if entry is not None else set()
+                allowed = docs if allowed is None else allowed & docs
+            scores = {doc: score for doc, score in scores.items() if doc in allowed}
+
+        if doc_range is not None:
+            first, last = doc_range
+            scores = {doc: score for doc, score in scores.items() if first <= doc <= last}
+        return scores
+
+
+class SearchIndex:
+    def __init__(self, store: QuranStore):
+        self.store = store
+        self.version = None
+        self.editions = {}
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.store.data_dir, INDEX_FILENAME)
+
+    def has_edition(self, edition: str) -> bool:
+        return edition in self.editions
+
+    def build(self):
+        started = time.perf_counter()
+        self.editions = {}
+        for edition in self.store.editions():
+            blob = self.store.blob(edition)
+            texts = (blob.text(number) for number in range(1, TOTAL_AYAHS + 1))
+            self.editions[edition] = EditionIndex.build(texts)
+        self.version = self.store.version
+        logger.info(f"Built search index for {len(self.editions)} editions in {time.perf_counter() - started:.2f}s")
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"format": INDEX_FORMAT, "version": self.version,
+                 "editions": {name: index.postings for name, index in self.editions.items()}},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.path)
+        logger.info(f"Search index saved to {self.path}")
+
+    def load(self) -> bool:
+        """Load the persisted index if it matches the current corpus version"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("format") != INDEX_FORMAT or payload.get("version") != self.store.version:
+            logger.info("Persisted search index is out of date")
+            return False
+        self.editions = {name: EditionIndex(postings) for name, postings in payload["editions"].items()}
+        self.version = payload["version"]
+        return True
+
+    def load_or_build(self):
+        if not self.load():
+            self.build()
+            self.save()
+
+    def search(self, query: str, edition: str, surah: int = None, offset: int = 0, limit: int = 50) -> dict:
+        """Ranked search in the same response shape as the upstream /search endpoint"""
+        doc_range = self.store.surah_range(surah) if surah is not None else None
+        scores = self.editions[edition].search(query, doc_range)
+        return self.response(scores, edition, offset, limit)
+
+    def response(self, scores: dict, edition: str, offset: int, limit: int) -> dict:
+        """Page through {doc: score} best-first and render the matches"""
+        ranked = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (-item[1], item[0]))
+
+        blob = self.store.blob(edition)
+        matches = []
+        for number, score in ranked[offset:]:
+            surah_number, ayat_number = locate(number)
+            matches.append({
+                "number": number,
+                "text": blob.text(number),
+                "edition": self.store.meta["editions"][edition],
+                "surah": self.store.surah_meta(surah_number),
+                "numberInSurah": ayat_number,
+                "score": round(score, 4),
+            })
+        return {
+            "code": 200,
+            "status": "OK",
+            "data": {"count": len(scores), "offset": offset, "limit": limit, "matches": matches},
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the local Quran search index")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--data-dir", default=settings.quran_data_dir)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    store = QuranStore(args.data_dir)
+    if not store.load():
+        return 1
+    index = SearchIndex(store)
+    index.build()
+    index.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+Offline semantic (vector) search over the local Quran corpus.
+
+For every translation edition we fit a TF-IDF model over its 6,236 ayahs and
+reduce it with a randomized truncated SVD (latent semantic analysis). Ayah
+vectors live in one contiguous, L2-normalised float32 matrix, so a query is
+a projection plus a single matrix-vector product. Two cheaper modes are kept
+alongside the exact one:
+
+    int8  - per-row scaled int8 copy of the matrix (4x smaller)
+    ivf   - k-means inverted file; only the closest lists are scored
+
+Build (no network needed) with:
+
+    python semantic_search.py build
+"""
+import argparse
+import logging
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from config import settings
+from quran_store import QuranStore, TOTAL_AYAHS
+from search_index import SearchIndex, tokenize
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT = 1
+MODES = ("exact", "int8", "ivf")
+
+
+def _csr_matmul(indptr, indices, data, dense, rows_per_chunk: int = 1024):
+    """(sparse CSR matrix) @ dense, in row chunks to bound temporary memory"""
+    out = np.zeros((len(indptr) - 1, dense.shape[1]), dtype=np.float32)
+    for start in range(0, len(indptr) - 1, rows_per_chunk):
+        stop = min(start + rows_per_chunk, len(indptr) - 1)
+        lo, hi = indptr[start], indptr[stop]
+        if lo == hi:
+            continue
+        products = data[lo:hi, None] * dense[indices[lo:hi]]
+        row_ids = np.repeat(np.arange(start, stop), np.diff(indptr[start:stop + 1]))
+        np.add.at(out, row_ids, products)
+    return out
+
+
+def _csr_t_matmul(indptr, indices, data, dense, columns: int):
+    """(sparse CSR matrix).T @ dense"""
+    row_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    out = np.zeros((columns, dense.shape[1]), dtype=np.float32)
+    np.add.at(out, indices, data[:, None] * dense[row_ids])
+    return out
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class SemanticModel:
+    """TF-IDF + truncated SVD model and vector index for one edition"""
+
+    def __init__(self, vocabulary: list, idf, components, embeddings, quantized, scales,
+                 centroids, list_offsets, list_members):
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.terms = vocabulary
+        self.idf = idf
+        self.components = components
+        self.embeddings = embeddings
+        self.quantized = quantized
+        self.scales = scales
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_members = list_members
+
+    @classmethod
+    def fit(cls, texts: list, dimensions: int, max_features: int, ivf_lists: int, seed: int = 0) -> "SemanticModel":
+        documents = [tokenize(text) for text in texts]
+
+        df = {}
+        for tokens in documents:
+            for term in set(tokens):
+                df[term] = df.get(term, 0) + 1
+        # Drop hapaxes and near-stopwords, keep the most informative terms
+        limit = 0.5 * len(documents)
+        vocabulary = sorted(
+            (term for term, count in df.items() if 2 <= count <= limit),
+            key=lambda term: (-df[term], term),
+        )[:max_features]
+        vocabulary.sort()
+        k = min(dimensions, len(vocabulary) - 1, len(documents) - 1)
+        if k < 1:
+            raise ValueError(f"{len(vocabulary)} usable terms in {len(documents)} texts are too few to fit a model")
+        term_ids = {term: i for i, term in enumerate(vocabulary)}
+        idf = np.array(
+            [math.log((1 + len(documents)) / (1 + df[term])) + 1 for term in vocabulary],
+            dtype=np.float32,
+        )
+
+        indptr, indices, data = [0], [], []
+        for tokens in documents:
+            counts = {}
+            for token in tokens:
+                if token in term_ids:
+                    counts[term_ids[token]] = counts.get(term_ids[token], 0) + 1
+            weights = {i: (1 + math.log(c)) * idf[i] for i, c in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for i, w in sorted(weights.items()):
+                indices.append(i)
+                data.append(w / norm)
+            indptr.append(len(indices))
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int64)
+        data = np.array(data, dtype=np.float32)
+
+        # Randomized SVD (Halko et al.) with two power iterations
+        rng = np.random.default_rng(seed)
+        sketch = rng.standard_normal((len(vocabulary), k + 10)).astype(np.float32)
+        q, _ = np.linalg.qr(_csr_matmul(indptr, indices, data, sketch))
+        for _ in range(2):
+            z, _ = np.linalg.qr(_csr_t_matmul(indptr, indices, data, q, len(vocabulary)))
+            q, _ = np.linalg.qr(_csr_matmul(indptr, indices, data, z))
+        b = _csr_t_matmul(indptr, indices, data, q, len(vocabulary)).T
+        _, _, vt = np.linalg.svd(b, full_matrices=False)
+        components = np.ascontiguousarray(vt[:k].T, dtype=np.float32)
+
+        embeddings = _normalize_rows(_csr_matmul(indptr, indices, data, components))
+        quantized, scales = cls._quantize(embeddings)
+        centroids, list_offsets, list_members = cls._build_ivf(embeddings, ivf_lists, rng)
+        return cls(vocabulary, idf, components, embeddings, quantized, scales,
+                   centroids, list_offsets, list_members)
+
+    @staticmethod
+    def _quantize(embeddings):
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    @staticmethod
+    def _build_ivf(embeddings, lists: int, rng, iterations: int = 15):
+        """Spherical k-means; members are stored grouped by list"""
+        lists = max(1, min(lists, len(embeddings)))
+        centroids = embeddings[rng.choice(len(embeddings), lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(embeddings @ centroids.T, axis=1)
+            for c in range(lists):
+                members = embeddings[assignment == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = _normalize_rows(centroids)
+        assignment = np.argmax(embeddings @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable").astype(np.int32)
+        list_offsets = np.searchsorted(assignment[order], np.arange(lists + 1)).astype(np.int32)
+        return centroids, list_offsets, order
+
+    def embed(self, queries: list):
+        """Project queries into the latent space: (len(queries), dimensions)"""
+        tfidf = np.zeros((len(queries), len(self.terms)), dtype=np.float32)
+        for row, query in enumerate(queries):
+            for token in tokenize(query):
+                i = self.vocabulary.get(token)
+                if i is not None:
+                    tfidf[row, i] += 1
+        nonzero = tfidf > 0
+        tfidf[nonzero] = 1 + np.log(tfidf[nonzero])
+        tfidf *= self.idf
+        return _normalize_rows(tfidf @ self.components)
+
+    def scores(self, vectors, mode: str, probe: int):
+        """Cosine similarity of each query vector against every ayah: (queries, ayahs)"""
+        if mode == "int8":
+            # Dequantize in blocks so the full float32 matrix is never materialised
+            out = np.empty((len(vectors), len(self.quantized)), dtype=np.float32)
+            for start in range(0, len(self.quantized), 1024):
+                block = self.quantized[start:start + 1024].astype(np.float32)
+                out[:, start:start + 1024] = (vectors @ block.T) * self.scales[start:start + 1024]
+            return out
+        if mode == "ivf":
+            out = np.full((len(vectors), len(self.embeddings)), -np.inf, dtype=np.float32)
+            nearest = np.argsort(-(vectors @ self.centroids.T), axis=1)[:, :probe]
+            for row, lists in enumerate(nearest):
+                members = np.concatenate([
+                    self.list_members[self.list_offsets[c]:self.list_offsets[c + 1]] for c in lists
+                ])
+                out[row, members] = self.embeddings[members] @ vectors[row]
+            return out
+        return vectors @ self.embeddings.T
+
+    def save(self, path: str, version: str):
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            format=np.array(MODEL_FORMAT),
+            version=np.array(version),
+            vocabulary=np.array("\n".join(self.terms)),
+            idf=self.idf,
+            components=self.components,
+            embeddings=self.embeddings,
+            quantized=self.quantized,
+            scales=self.scales,
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            list_members=self.list_members,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, version: str):
+        with np.load(path) as payload:
+            if int(payload["format"]) != MODEL_FORMAT or str(payload["version"]) != version:
+                return None
+            vocabulary = str(payload["vocabulary"]).split("\n")
+            return cls(vocabulary, *(payload[name] for name in (
+                "idf", "components", "embeddings", "quantized", "scales",
+                "centroids", "list_offsets", "list_members",
+            )))
+
+
+class SemanticIndex:
+    def __init__(self, search_index: SearchIndex):
+        self.search_index = search_index
+        self.store = search_index.store
+        self.models = {}
+
+    def _path(self, edition: str) -> str:
+        return os.path.join(self.store.data_dir, f"semantic-{edition}.npz")
+
+    def translation_editions(self) -> list:
+        return [
+            identifier for identifier, edition in self.store.meta["editions"].items()
+            if edition.get("language") != "ar"
+        ]
+
+    def has_edition(self, edition: str) -> bool:
+        return edition in self.models
+
+    def build_edition(self, edition: str):
+        started = time.perf_counter()
+        blob = self.store.blob(edition)
+        model = SemanticModel.fit(
+            [blob.text(number) for number in range(1, TOTAL_AYAHS + 1)],
+            dimensions=settings.semantic_dimensions,
+            max_features=settings.semantic_max_features,
+            ivf_lists=settings.semantic_ivf_lists,
+        )
+        model.save(self._path(edition), self.store.version)
+        self.models[edition] = model
+        logger.info(f"Built semantic index for {edition} in {time.perf_counter() - started:.2f}s")
+
+    def load_or_build(self):
+        for edition in self.translation_editions():
+            path = self._path(edition)
+            model = SemanticModel.load(path, self.store.version) if os.path.exists(path) else None
+            if model is not None:
+                self.models[edition] = model
+                continue
+            try:
+                self.build_edition(edition)
+            except Exception as e:
+                # One unusable edition must not take down semantic search for the others
+                logger.warning(f"Skipping semantic index for {edition}: {e}")
+
+    def search_batch(self, queries: list, edition: str, k: int = 10, mode: str = "exact",
+                     surah: int = None) -> list:
+        """Top-k {ayah number: score} for each query"""
+        model = self.models[edition]
+        scores = model.scores(model.embed(queries), mode, settings.semantic_ivf_probe)
+        if surah is not None:
+            first, last = self.store.surah_range(surah)
+            mask = np.full(scores.shape[1], -np.inf, dtype=np.float32)
+            mask[first - 1:last] = 0.0
+            scores = scores + mask
+
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            results.append({
+                int(i) + 1: float(scores[row, i])
+                for i in candidates if np.isfinite(scores[row, i]) and scores[row, i] > 0
+            })
+        return results
+
+    def search(self, query: str, edition: str, k: int = 10, mode: str = "exact", surah: int = None) -> dict:
+        """Nearest ayahs to the query, in the same response shape as /api/quran/search"""
+        hits = self.search_batch([query], edition, k, mode, surah)[0]
+        result = self.search_index.response(hits, edition, 0, k)
+        result["data"]["mode"] = mode
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the local semantic verse index")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--data-dir", default=settings.quran_data_dir)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    store = QuranStore(args.data_dir)
+    if not store.load():
+        return 1
+    index = SemanticIndex(SearchIndex(store))
+    failures = 0
+    for edition in index.translation_editions():
+        try:
+            index.build_edition(edition)
+        except ValueError as e:
+            logger.error(f"Could not build semantic index for {edition}: {e}")
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
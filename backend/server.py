@@ -1,20 +1,41 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import json
 import logging
+import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+from config import settings
 from database import connect_to_mongo, close_mongo_connection, get_database
-from auth import JWTBearer, get_user_from_token
+from http_client import open_http_client, close_http_client, get_pool_stats
+from auth import JWTBearer, token_cache
 from models import (
     UserProfile, Bookmark, ReadingProgress, AIConversation,
-    ChatMessage, VerseQuery
+    ChatMessage, VerseQuery, ProgressBatch
 )
 from ai_service import ai_service
-from quran_service import quran_service
+from ai_limiter import AIOverloaded
+import explanation_cache
+import help_cache
+from daily_verse import daily_verse
+from chat_history import recent_messages, append_turn, history_page
+from reading_progress import update_streak, progress_entry, progress_buffer, daily_stats
+from write_buffer import BufferFull
+from quran_service import quran_service, TRANSLATION_EDITIONS
+from http_cache import immutable_responses, file_response
+from offline_bundle import UnknownVersion, MEDIA_TYPE as BUNDLE_MEDIA_TYPE
+from quran_store import CorpusNotAvailable, AYAH_FIELDS
+from quran_structure import InvalidReference
+from semantic_search import MODES as SEMANTIC_MODES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,15 +47,35 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Al-Quran API...")
     await connect_to_mongo()
+    await open_http_client()
+    # Built off the event loop; search requests only use indexes that are already loaded
+    await asyncio.to_thread(quran_service.load_search_index)
+    if quran_service.store.available:
+        # Remember this corpus version's edition digests so later versions can serve deltas from it
+        try:
+            await asyncio.to_thread(quran_service.bundles.manifest)
+        except OSError as e:
+            logger.warning(f"Could not record the offline bundle manifest: {e}")
+    progress_buffer.start()
+    daily_verse.start()
+    purge_task = asyncio.create_task(explanation_cache.purge_stale())
+    help_task = asyncio.create_task(help_cache.warm())
     yield
     # Shutdown
     logger.info("Shutting down Al-Quran API...")
+    purge_task.cancel()
+    help_task.cancel()
+    daily_verse.stop()
+    await close_http_client()
+    ai_service.shutdown()
+    await progress_buffer.close()
     await close_mongo_connection()
 
 app = FastAPI(
     title="Al-Quran AI API",
     description="Advanced Al-Quran Mobile App API with AI Ustaz/Ustazah Assistant",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -60,23 +101,37 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Runtime statistics for the shared clients and caches"""
+    return {
+        "http_pool": get_pool_stats(),
+        "quran_cache": quran_service.cache.stats() if quran_service.cache else None,
+        "auth": token_cache.stats(),
+        "progress_buffer": progress_buffer.stats(),
+        "ai": ai_service.limiter.stats(),
+        "chat_cache": ai_service.chat_cache.stats() if ai_service.chat_cache else None,
+        "quran_http": immutable_responses.stats(),
+        "singleflight": {
+            "quran": quran_service.flight.stats(),
+            "explain_verse": ai_service.flight.stats()
+        }
+    }
+
 # ============= USER PROFILE ENDPOINTS =============
 @app.get("/api/profile")
-async def get_profile(token: str = Depends(JWTBearer())):
+async def get_profile(claims: dict = Depends(JWTBearer())):
     """Get user profile"""
     try:
-        user_data = get_user_from_token(token)
-        user_id = user_data.get("sub")
+        user_id = claims.get("sub")
         
         db = get_database()
-        profile = await db.user_profiles.find_one({"user_id": user_id})
-        
-        if not profile:
-            # Create default profile
-            new_profile = {
-                "user_id": user_id,
-                "email": user_data.get("email", ""),
-                "name": user_data.get("user_metadata", {}).get("name", ""),
+        # One atomic upsert: concurrent first requests cannot both insert under the unique user_id index
+        profile = await db.user_profiles.find_one_and_update(
+            {"user_id": user_id},
+            {"$setOnInsert": {
+                "email": claims.get("email", ""),
+                "name": claims.get("user_metadata", {}).get("name", ""),
                 "preferred_language": "en",
                 "preferred_reciter": "ar.alafasy",
                 "theme": "light",
@@ -86,11 +141,10 @@ async def get_profile(token: str = Depends(JWTBearer())):
                     "longest_streak": 0,
                     "last_read_date": None
                 }
-            }
-            result = await db.user_profiles.insert_one(new_profile)
-            new_profile["_id"] = str(result.inserted_id)
-            return new_profile
-        
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
         profile["_id"] = str(profile["_id"])
         return profile
         
@@ -99,11 +153,10 @@ async def get_profile(token: str = Depends(JWTBearer())):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/profile")
-async def update_profile(profile_data: dict, token: str = Depends(JWTBearer())):
+async def update_profile(profile_data: dict, claims: dict = Depends(JWTBearer())):
     """Update user profile"""
     try:
-        user_data = get_user_from_token(token)
-        user_id = user_data.get("sub")
+        user_id = claims.get("sub")
         
         db = get_database()
         result = await db.user_profiles.update_one(
@@ -118,97 +171,210 @@ async def update_profile(profile_data: dict, token: str = Depends(JWTBearer())):
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============= QURAN ENDPOINTS =============
+def immutable(request: Request, build):
+    """Serve Quran content with an ETag, long-lived Cache-Control and compression"""
+    return immutable_responses.respond(request, quran_service.content_version(), build)
+
+def ayah_selection(start: int, stop: int, fields: str, allowed=AYAH_FIELDS) -> tuple:
+    """Validate the from/to/fields query parameters of the surah, juz and translations endpoints"""
+    start = 1 if start is None else start
+    if start < 1 or (stop is not None and stop < start):
+        raise HTTPException(status_code=400, detail="Invalid ayah range")
+    if fields is None:
+        return start, stop, None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected.difference(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return start, stop, selected
+
 @app.get("/api/quran/surahs")
-async def get_surahs():
+async def get_surahs(request: Request):
     """Get list of all surahs"""
     try:
-        result = await quran_service.get_surah_list()
-        return result
+        return await immutable(request, quran_service.get_surah_list)
+    except CorpusNotAvailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching surahs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/quran/surah/{surah_number}")
-async def get_surah(surah_number: int, edition: str = "quran-uthmani"):
-    """Get a complete surah"""
+async def get_surah(request: Request, surah_number: int, edition: str = "quran-uthmani",
+                    from_: int = Query(None, alias="from"), to: int = None, fields: str = None):
+    """
+    Get a complete surah.
+
+    from/to limit the response to those ayahs (numbers within the surah) and
+    fields=text,numberInSurah,... to those per-ayah fields.
+    """
     try:
         if surah_number < 1 or surah_number > 114:
             raise HTTPException(status_code=400, detail="Invalid surah number")
+        start, stop, selected = ayah_selection(from_, to, fields)
         
-        result = await quran_service.get_surah(surah_number, edition)
-        return result
+        return await immutable(
+            request, lambda: quran_service.get_surah(surah_number, edition, start, stop, selected)
+        )
     except HTTPException:
         raise
+    except CorpusNotAvailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching surah: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/quran/surah/{surah_number}/translations")
-async def get_surah_with_translations(surah_number: int, languages: str = "en,ms"):
-    """Get surah with multiple translations"""
+async def get_surah_with_translations(request: Request, surah_number: int, languages: str = "en,ms",
+                                      layout: str = "editions", from_: int = Query(None, alias="from"),
+                                      to: int = None, fields: str = None):
+    """
+    Get surah with multiple translations.
+
+    layout=editions (default) returns one full surah per edition; layout=aligned
+    returns one object per ayah with the text of every edition. from/to and
+    fields work as for a single surah (`texts` holds the aligned texts).
+    """
     try:
         if surah_number < 1 or surah_number > 114:
             raise HTTPException(status_code=400, detail="Invalid surah number")
-        
-        # Map language codes to edition identifiers
-        edition_map = {
-            "en": "en.sahih",
-            "ms": "ms.basmeih",
-            "ur": "ur.jalandhry",
-            "id": "id.indonesian"
-        }
+        if layout not in ("aligned", "editions"):
+            raise HTTPException(status_code=400, detail="layout must be 'aligned' or 'editions'")
+        start, stop, selected = ayah_selection(from_, to, fields, AYAH_FIELDS + ("texts",))
         
         lang_list = languages.split(",")
-        editions = ["quran-uthmani"] + [edition_map.get(lang, "en.sahih") for lang in lang_list]
+        editions = ["quran-uthmani"] + [TRANSLATION_EDITIONS.get(lang, "en.sahih") for lang in lang_list]
+        # Duplicate languages would otherwise fetch (and align) the same edition twice
+        editions = list(dict.fromkeys(editions))
         
-        result = await quran_service.get_translations(surah_number, editions)
-        return result
+        return await immutable(
+            request,
+            lambda: quran_service.get_translations(surah_number, editions, layout, start, stop, selected)
+        )
     except HTTPException:
         raise
+    except CorpusNotAvailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching translations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/quran/ayah/{surah_number}/{ayat_number}")
-async def get_ayah(surah_number: int, ayat_number: int, edition: str = "quran-uthmani"):
+async def get_ayah(request: Request, surah_number: int, ayat_number: int, edition: str = "quran-uthmani"):
     """Get a specific ayah"""
     try:
-        result = await quran_service.get_ayah(surah_number, ayat_number, edition)
-        return result
+        return await immutable(request, lambda: quran_service.get_ayah(surah_number, ayat_number, edition))
+    except (CorpusNotAvailable, InvalidReference) as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching ayah: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/quran/juz/{juz_number}")
-async def get_juz(juz_number: int, edition: str = "quran-uthmani"):
-    """Get a complete juz"""
+async def get_juz(request: Request, juz_number: int, edition: str = "quran-uthmani",
+                  from_: int = Query(None, alias="from"), to: int = None, fields: str = None):
+    """
+    Get a complete juz.
+
+    from/to are positions within the juz (1 is its first ayah); fields works as
+    for a surah.
+    """
     try:
         if juz_number < 1 or juz_number > 30:
             raise HTTPException(status_code=400, detail="Invalid juz number")
+        start, stop, selected = ayah_selection(from_, to, fields)
         
-        result = await quran_service.get_juz(juz_number, edition)
-        return result
+        return await immutable(
+            request, lambda: quran_service.get_juz(juz_number, edition, start, stop, selected)
+        )
     except HTTPException:
         raise
+    except (CorpusNotAvailable, InvalidReference) as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching juz: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def get_division(request: Request, division: str, number: int, edition: str):
+    """Shared handler for the juz/hizb/page/... views"""
+    try:
+        return await immutable(request, lambda: quran_service.get_division(division, number, edition))
+    except (CorpusNotAvailable, InvalidReference) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching {division} {number}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/quran/page/{page_number}")
+async def get_page(request: Request, page_number: int, edition: str = "quran-uthmani"):
+    """Get a mushaf page"""
+    return await get_division(request, "page", page_number, edition)
+
+@app.get("/api/quran/hizb/{hizb_number}")
+async def get_hizb(request: Request, hizb_number: int, edition: str = "quran-uthmani"):
+    """Get a hizb (half a juz)"""
+    return await get_division(request, "hizb", hizb_number, edition)
+
+@app.get("/api/quran/hizb-quarter/{quarter_number}")
+async def get_hizb_quarter(request: Request, quarter_number: int, edition: str = "quran-uthmani"):
+    """Get a hizb quarter (rub' al-hizb)"""
+    return await get_division(request, "hizbQuarter", quarter_number, edition)
+
+@app.get("/api/quran/ruku/{ruku_number}")
+async def get_ruku(request: Request, ruku_number: int, edition: str = "quran-uthmani"):
+    """Get a ruku"""
+    return await get_division(request, "ruku", ruku_number, edition)
+
+@app.get("/api/quran/manzil/{manzil_number}")
+async def get_manzil(request: Request, manzil_number: int, edition: str = "quran-uthmani"):
+    """Get a manzil"""
+    return await get_division(request, "manzil", manzil_number, edition)
+
 @app.get("/api/quran/search")
-async def search_quran(q: str, edition: str = "quran-simple"):
+async def search_quran(request: Request, q: str, edition: str = "quran-simple", surah: int = None, offset: int = 0,
+                       limit: int = 50, fuzzy: bool = False):
     """Search in Quran"""
     try:
         if not q or len(q) < 2:
             raise HTTPException(status_code=400, detail="Query too short")
+        if surah is not None and (surah < 1 or surah > 114):
+            raise HTTPException(status_code=400, detail="Invalid surah number")
+        if offset < 0 or limit < 1 or limit > 200:
+            raise HTTPException(status_code=400, detail="Invalid pagination parameters")
         
-        result = await quran_service.search_quran(q, edition)
-        return result
+        return await immutable(
+            request, lambda: quran_service.search_quran(q, edition, surah, offset, limit, fuzzy)
+        )
     except HTTPException:
         raise
+    except CorpusNotAvailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error searching Quran: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/quran/semantic-search")
+async def semantic_search(q: str, edition: str = "en.sahih", k: int = 10, mode: str = "exact", surah: int = None):
+    """Search verses by meaning using the local vector index"""
+    try:
+        if not q or len(q) < 2:
+            raise HTTPException(status_code=400, detail="Query too short")
+        if k < 1 or k > 100:
+            raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+        if mode not in SEMANTIC_MODES:
+            raise HTTPException(status_code=400, detail="Invalid mode")
+        if surah is not None and (surah < 1 or surah > 114):
+            raise HTTPException(status_code=400, detail="Invalid surah number")
+        
+        return quran_service.semantic_search(q, edition, k, mode, surah)
+    except HTTPException:
+        raise
+    except CorpusNotAvailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in semantic search: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/quran/editions")
 async def get_editions():
     """Get available Quran editions"""
@@ -218,144 +384,214 @@ async def get_editions():
 async def get_daily_verse():
     """Get daily verse - changes each day"""
     try:
-        import random
-        from datetime import datetime
-        
-        # Use date as seed for consistent daily verse
-        today = datetime.now().strftime('%Y%m%d')
-        random.seed(today)
-        
-        # Select a random surah and ayah
-        surah_number = random.randint(1, 114)
-        
-        # Get surah info to know number of ayahs
-        surah_response = await quran_service.get_surah_list()
-        surahs = surah_response.get("data", [])
-        
-        if surahs:
-            selected_surah = next((s for s in surahs if s.get("number") == surah_number), None)
-            if selected_surah:
-                num_ayahs = selected_surah.get("numberOfAyahs", 1)
-                ayah_number = random.randint(1, num_ayahs)
-                
-                # Fetch the verse
-                arabic = await quran_service.get_ayah(surah_number, ayah_number, "quran-uthmani")
-                translation = await quran_service.get_ayah(surah_number, ayah_number, "en.sahih")
-                
-                return {
-                    "success": True,
-                    "data": {
-                        "surah_number": surah_number,
-                        "ayah_number": ayah_number,
-                        "surah_name": selected_surah.get("englishName"),
-                        "surah_name_arabic": selected_surah.get("name"),
-                        "arabic_text": arabic.get("data", {}).get("text", ""),
-                        "translation": translation.get("data", {}).get("text", ""),
-                    }
-                }
+        return {"success": True, "data": await daily_verse.get()}
         
+    except LookupError as e:
+        logger.error(f"Error fetching daily verse: {e}")
         raise HTTPException(status_code=500, detail="Could not fetch daily verse")
     except Exception as e:
         logger.error(f"Error fetching daily verse: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============= OFFLINE BUNDLES =============
+def bundle_response(request: Request, path: str):
+    etag = f'"{os.path.basename(path).split(".")[0]}"'
+    return file_response(request, path, BUNDLE_MEDIA_TYPE, etag, settings.quran_http_max_age)
+
+@app.get("/api/quran/bundle/manifest")
+async def get_bundle_manifest():
+    """Current corpus version and per-edition digests, to decide whether an offline update is needed"""
+    try:
+        return await asyncio.to_thread(quran_service.bundles.manifest)
+    except CorpusNotAvailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reading bundle manifest: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/quran/bundle")
+async def get_bundle(request: Request, editions: str = None):
+    """
+    Download the offline bundle (gzip-compressed SQLite) for the current corpus
+    version; editions defaults to every edition in the corpus. Supports Range.
+    """
+    try:
+        edition_list = [e.strip() for e in editions.split(",") if e.strip()] if editions else None
+        path = await quran_service.bundles.bundle(edition_list)
+        return bundle_response(request, path)
+    except CorpusNotAvailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error building offline bundle: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/quran/bundle/delta")
+async def get_bundle_delta(request: Request, since: str, editions: str = None):
+    """
+    Download only the editions that changed since corpus version `since`
+    (plus structure tables if they changed). 404 means the client should
+    download the full bundle instead.
+    """
+    try:
+        edition_list = [e.strip() for e in editions.split(",") if e.strip()] if editions else None
+        path = await quran_service.bundles.delta(since, edition_list)
+        return bundle_response(request, path)
+    except (CorpusNotAvailable, UnknownVersion) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error building delta bundle: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============= AI ASSISTANT ENDPOINTS =============
+def sse_event(data: dict, event: str = None) -> str:
+    """Format one Server-Sent Events message"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @app.post("/api/ai/chat")
-async def chat_with_ai(message: ChatMessage, token: str = Depends(JWTBearer())):
+async def chat_with_ai(message: ChatMessage, claims: dict = Depends(JWTBearer())):
     """Chat with AI Ustaz/Ustazah"""
     try:
-        user_data = get_user_from_token(token)
-        user_id = user_data.get("sub")
+        user_id = claims.get("sub")
         
         db = get_database()
         
         # Get conversation history
-        conversation = await db.ai_conversations.find_one({"user_id": user_id})
-        
-        conversation_history = []
-        if conversation:
-            conversation_history = conversation.get("messages", [])[-10:]  # Last 10 messages
+        conversation_history = await recent_messages(db, user_id, 10)  # Last 10 messages
         
         # Get AI response
         response = await ai_service.chat(
             message.message,
             conversation_history=conversation_history,
-            context=message.context
+            context=message.context,
+            user_id=user_id,
+            language=message.language
         )
         
         if response["success"]:
-            # Save conversation
-            new_messages = conversation_history + [
-                {"role": "user", "content": message.message},
-                {"role": "assistant", "content": response["message"]}
-            ]
-            
-            if conversation:
-                await db.ai_conversations.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"messages": new_messages[-20:]}}  # Keep last 20 messages
-                )
-            else:
-                await db.ai_conversations.insert_one({
-                    "user_id": user_id,
-                    "messages": new_messages,
-                    "context": message.context
-                })
+            await append_turn(db, user_id, message.message, response["message"], message.context)
         
         return response
         
+    except AIOverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"Error in AI chat: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/ai/chat/stream")
+async def chat_with_ai_stream(message: ChatMessage, claims: dict = Depends(JWTBearer())):
+    """Chat with AI Ustaz/Ustazah, streaming the reply as Server-Sent Events"""
+    try:
+        user_id = claims.get("sub")
+        
+        db = get_database()
+        conversation_history = await recent_messages(db, user_id, 10)
+    except Exception as e:
+        logger.error(f"Error in AI chat stream: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream():
+        parts = []
+        try:
+            async for delta in ai_service.chat_stream(
+                message.message,
+                conversation_history=conversation_history,
+                context=message.context,
+                user_id=user_id,
+                language=message.language
+            ):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+        except AIOverloaded as e:
+            yield sse_event({"message": str(e), "status": 429}, event="error")
+            return
+        except Exception as e:
+            logger.error(f"AI chat stream error: {e}")
+            yield sse_event({"message": "SubhanAllah, I'm having trouble responding right now. Please try again."}, event="error")
+            return
+        
+        # Only completed replies are saved; a disconnect cancels this generator before here
+        reply = "".join(parts)
+        try:
+            await append_turn(db, user_id, message.message, reply, message.context)
+        except Exception as e:
+            logger.error(f"Error saving streamed conversation: {e}")
+        yield sse_event({"message": reply, "role": "assistant"}, event="done")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/ai/history")
+async def get_chat_history(before: str = None, limit: int = 50, claims: dict = Depends(JWTBearer())):
+    """Archived chat messages, newest first; pass next_cursor as `before` for the next page"""
+    try:
+        if not 1 <= limit <= 200:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+        if before is not None and not ObjectId.is_valid(before):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        user_id = claims.get("sub")
+        db = get_database()
+        return await history_page(db, user_id, before, limit)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching chat history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/ai/explain-verse")
-async def explain_verse(verse: VerseQuery, token: str = Depends(JWTBearer())):
+async def explain_verse(verse: VerseQuery, claims: dict = Depends(JWTBearer())):
     """Get AI explanation of a verse"""
     try:
-        # Fetch the verse
-        arabic_result = await quran_service.get_ayah(verse.surah_number, verse.ayat_number, "quran-uthmani")
-        translation_result = await quran_service.get_ayah(verse.surah_number, verse.ayat_number, "en.sahih")
+        user_id = claims.get("sub")
         
-        arabic_text = arabic_result.get("data", {}).get("text", "")
-        translation = translation_result.get("data", {}).get("text", "")
-        surah_name = arabic_result.get("data", {}).get("surah", {}).get("englishName", "")
-        
-        # Get AI explanation
-        response = await ai_service.explain_verse(
+        # Served from the explanation cache, generated on a miss
+        response = await explanation_cache.explain(
             verse.surah_number,
             verse.ayat_number,
-            surah_name,
-            arabic_text,
-            translation
+            verse.language or "en",
+            user_id=user_id
         )
         
         return response
         
+    except InvalidReference as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except AIOverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"Error explaining verse: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/ai/context-help")
-async def get_context_help(data: dict, token: str = Depends(JWTBearer())):
+async def get_context_help(data: dict, claims: dict = Depends(JWTBearer())):
     """Get contextual help"""
     try:
+        user_id = claims.get("sub")
         screen = data.get("screen", "home")
         query = data.get("query")
+        language = data.get("language", "en")
         
-        response = await ai_service.contextual_help(screen, query)
+        response = await ai_service.contextual_help(screen, query, user_id=user_id, language=language)
         return response
         
+    except AIOverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting context help: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============= BOOKMARKS ENDPOINTS =============
 @app.get("/api/bookmarks")
-async def get_bookmarks(token: str = Depends(JWTBearer())):
+async def get_bookmarks(claims: dict = Depends(JWTBearer())):
     """Get user's bookmarks"""
     try:
-        user_data = get_user_from_token(token)
-        user_id = user_data.get("sub")
+        user_id = claims.get("sub")
         
         db = get_database()
         bookmarks = await db.bookmarks.find({"user_id": user_id}).to_list(length=None)
@@ -370,24 +606,13 @@ async def get_bookmarks(token: str = Depends(JWTBearer())):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/bookmarks")
-async def create_bookmark(bookmark_data: dict, token: str = Depends(JWTBearer())):
+async def create_bookmark(bookmark_data: dict, claims: dict = Depends(JWTBearer())):
     """Create a bookmark"""
     try:
-        user_data = get_user_from_token(token)
-        user_id = user_data.get("sub")
+        user_id = claims.get("sub")
         
         db = get_database()
         
-        # Check if bookmark already exists
-        existing = await db.bookmarks.find_one({
-            "user_id": user_id,
-            "surah_number": bookmark_data["surah_number"],
-            "ayat_number": bookmark_data["ayat_number"]
-        })
-        
-        if existing:
-            return {"success": False, "message": "Bookmark already exists"}
-        
         bookmark = {
             "user_id": user_id,
             "surah_number": bookmark_data["surah_number"],
@@ -395,7 +620,11 @@ async def create_bookmark(bookmark_data: dict, token: str = Depends(JWTBearer())
             "note": bookmark_data.get("note", "")
         }
         
-        result = await db.bookmarks.insert_one(bookmark)
+        # The unique (user_id, surah_number, ayat_number) index rejects duplicates
+        try:
+            result = await db.bookmarks.insert_one(bookmark)
+        except DuplicateKeyError:
+            return {"success": False, "message": "Bookmark already exists"}
         bookmark["_id"] = str(result.inserted_id)
         
         return {"success": True, "bookmark": bookmark}
@@ -405,13 +634,10 @@ async def create_bookmark(bookmark_data: dict, token: str = Depends(JWTBearer())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/bookmarks/{bookmark_id}")
-async def delete_bookmark(bookmark_id: str, token: str = Depends(JWTBearer())):
+async def delete_bookmark(bookmark_id: str, claims: dict = Depends(JWTBearer())):
     """Delete a bookmark"""
     try:
-        from bson import ObjectId
-        
-        user_data = get_user_from_token(token)
-        user_id = user_data.get("sub")
+        user_id = claims.get("sub")
         
         db = get_database()
         result = await db.bookmarks.delete_one({
@@ -424,104 +650,36 @@ async def delete_bookmark(bookmark_id: str, token: str = Depends(JWTBearer())):
         
         return {"success": True, "message": "Bookmark deleted"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting bookmark: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============= READING PROGRESS ENDPOINTS =============
 @app.post("/api/progress/update")
-async def update_progress(progress_data: dict, token: str = Depends(JWTBearer())):
+async def update_progress(progress_data: dict, claims: dict = Depends(JWTBearer())):
     """Update reading progress"""
     try:
-        from datetime import datetime, timedelta
-        
-        user_data = get_user_from_token(token)
-        user_id = user_data.get("sub")
+        user_id = claims.get("sub")
         
         db = get_database()
         
-        # Get current profile to check streak
-        profile = await db.user_profiles.find_one({"user_id": user_id})
-        
-        if not profile:
-            # Create default profile if doesn't exist
-            profile = {
-                "user_id": user_id,
-                "email": user_data.get("email", ""),
-                "streak_data": {
-                    "current_streak": 0,
-                    "longest_streak": 0,
-                    "last_read_date": None
-                }
-            }
-            await db.user_profiles.insert_one(profile)
-        
-        # Update streak
-        streak_data = profile.get("streak_data", {
-            "current_streak": 0,
-            "longest_streak": 0,
-            "last_read_date": None
-        })
-        
-        today = datetime.now().date()
-        last_read_date = streak_data.get("last_read_date")
-        
-        if last_read_date:
-            if isinstance(last_read_date, str):
-                last_read_date = datetime.fromisoformat(last_read_date).date()
-            elif isinstance(last_read_date, datetime):
-                last_read_date = last_read_date.date()
-        
-        current_streak = streak_data.get("current_streak", 0)
-        longest_streak = streak_data.get("longest_streak", 0)
-        
-        if last_read_date:
-            days_diff = (today - last_read_date).days
-            
-            if days_diff == 0:
-                # Same day, keep streak
-                pass
-            elif days_diff == 1:
-                # Consecutive day, increment streak
-                current_streak += 1
-            else:
-                # Streak broken, reset
-                current_streak = 1
-        else:
-            # First time reading
-            current_streak = 1
-        
-        # Update longest streak if current is higher
-        if current_streak > longest_streak:
-            longest_streak = current_streak
-        
-        # Update user's last read position and streak
-        await db.user_profiles.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "reading_progress.last_surah": progress_data.get("surah_number"),
-                    "reading_progress.last_ayat": progress_data.get("ayat_number"),
-                    "reading_progress.last_updated": progress_data.get("timestamp"),
-                    "streak_data": {
-                        "current_streak": current_streak,
-                        "longest_streak": longest_streak,
-                        "last_read_date": today.isoformat()
-                    }
-                }
-            }
+        # The history row is written behind; only the streak update is awaited
+        progress_buffer.add([progress_entry(
+            user_id,
+            progress_data.get("surah_number"),
+            progress_data.get("ayat_number"),
+            progress_data.get("time_spent", 0)
+        )])
+        streak_data = await update_streak(
+            db, user_id, claims.get("email", ""),
+            progress_data.get("surah_number"),
+            progress_data.get("ayat_number"),
+            progress_data.get("timestamp")
         )
-        
-        # Save detailed progress entry
-        progress_entry = {
-            "user_id": user_id,
-            "surah_number": progress_data.get("surah_number"),
-            "ayat_number": progress_data.get("ayat_number"),
-            "time_spent": progress_data.get("time_spent", 0),
-            "date": datetime.now()
-        }
-        
-        await db.reading_progress.insert_one(progress_entry)
+        current_streak = streak_data["current_streak"]
+        longest_streak = streak_data["longest_streak"]
         
         return {
             "success": True, 
@@ -532,16 +690,79 @@ async def update_progress(progress_data: dict, token: str = Depends(JWTBearer())
             }
         }
         
+    except BufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         logger.error(f"Error updating progress: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/progress/batch")
+async def update_progress_batch(batch: ProgressBatch, claims: dict = Depends(JWTBearer())):
+    """Record reading progress events collected offline"""
+    try:
+        user_id = claims.get("sub")
+        
+        if not batch.events:
+            raise HTTPException(status_code=400, detail="No events")
+        if len(batch.events) > settings.progress_batch_max_events:
+            raise HTTPException(status_code=413, detail=f"At most {settings.progress_batch_max_events} events per batch")
+        
+        entries = [
+            progress_entry(user_id, event.surah_number, event.ayat_number, event.time_spent, event.date, event.event_id)
+            for event in batch.events
+        ]
+        progress_buffer.add(entries)
+        
+        # Last position follows the most recent event; the streak counts every day read in the batch
+        latest = max(entries, key=lambda entry: entry["date"])
+        db = get_database()
+        streak_data = await update_streak(
+            db, user_id, claims.get("email", ""),
+            latest["surah_number"],
+            latest["ayat_number"],
+            latest["date"].isoformat(),
+            days=[entry["date"].date() for entry in entries]
+        )
+        
+        return {
+            "success": True,
+            "accepted": len(batch.events),
+            "streak": {
+                "current_streak": streak_data["current_streak"],
+                "longest_streak": streak_data["longest_streak"]
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except BufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        logger.error(f"Error recording progress batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/progress/stats")
+async def get_progress_stats(days: int = 30, claims: dict = Depends(JWTBearer())):
+    """Reading statistics for the last `days` days"""
+    try:
+        if not 1 <= days <= 366:
+            raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+        
+        user_id = claims.get("sub")
+        db = get_database()
+        return await daily_stats(db, user_id, days)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching progress stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/progress")
-async def get_progress(token: str = Depends(JWTBearer())):
+async def get_progress(claims: dict = Depends(JWTBearer())):
     """Get user's reading progress"""
     try:
-        user_data = get_user_from_token(token)
-        user_id = user_data.get("sub")
+        user_id = claims.get("sub")
         
         db = get_database()
         
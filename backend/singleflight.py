@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers that arrive
+    while it is still running await the same task and receive the same result
+    or exception. A cancelled waiter only cancels itself - the shared task is
+    cancelled once every waiter has gone away.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.counters = {"executions": 0, "shared": 0, "abandoned": 0}
+
+    def _forget(self, key, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key, fn):
+        """Return `await fn()`, sharing the call with concurrent callers of the same key"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            self.counters["executions"] += 1
+
+            def done(task, key=key, call=call):
+                self._forget(key, call)
+                # Mark the exception as retrieved even if every waiter left
+                if not task.cancelled():
+                    task.exception()
+
+            call.task.add_done_callback(done)
+        else:
+            self.counters["shared"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+                self.counters["abandoned"] += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> dict:
+        return {**self.counters, "in_flight": len(self._calls)}
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+
+from pymongo.errors import BulkWriteError
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class BufferFull(Exception):
+    """Raised when the buffer cannot take more documents until it has flushed"""
+
+
+class WriteBehindBuffer:
+    """
+    In-process write-behind buffer for append-only collections.
+
+    Documents are accepted immediately and written with
+    insert_many(ordered=False) once `batch_size` are pending or every
+    `flush_interval` seconds, whichever comes first. When `max_pending`
+    documents are waiting (e.g. MongoDB is down) add() raises BufferFull so
+    callers can push back on clients. Duplicate _ids are skipped, which makes
+    retried batches with client-supplied ids idempotent.
+
+    Callables in `on_flush` receive each successfully written batch.
+    """
+
+    def __init__(self, collection: str, batch_size: int, flush_interval: float, max_pending: int):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_flush = []
+        self._pending = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self.counters = {"accepted": 0, "written": 0, "duplicates": 0, "rejected": 0, "flushes": 0, "errors": 0}
+        self._flush_seconds = 0.0
+
+    def add(self, docs: list):
+        if len(self._pending) + len(docs) > self.max_pending:
+            self.counters["rejected"] += len(docs)
+            raise BufferFull("Too many pending writes, please retry shortly")
+        self._pending.extend(docs)
+        self.counters["accepted"] += len(docs)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the background flusher and write everything still pending"""
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        while self._pending:
+            if not await self.flush():
+                logger.error(f"Dropping {len(self._pending)} unwritten {self.collection} documents")
+                break
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._closing:
+                await self.flush()
+
+    async def flush(self) -> bool:
+        """Write up to one batch; returns False if the write failed and was re-queued"""
+        async with self._lock:
+            if not self._pending:
+                return True
+            batch = self._pending[:self.batch_size]
+            del self._pending[:len(batch)]
+
+            started = time.perf_counter()
+            written = batch
+            try:
+                await get_database()[self.collection].insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                failed = {error["index"] for error in errors}
+                duplicates = sum(1 for error in errors if error.get("code") == DUPLICATE_KEY)
+                self.counters["duplicates"] += duplicates
+                if len(errors) > duplicates:
+                    self.counters["errors"] += 1
+                    logger.error(f"Dropped {len(errors) - duplicates} invalid {self.collection} documents")
+                written = [doc for i, doc in enumerate(batch) if i not in failed]
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.error(f"Flushing {len(batch)} {self.collection} documents failed: {e}")
+                self._pending[:0] = batch
+                return False
+
+            self.counters["flushes"] += 1
+            self.counters["written"] += len(written)
+            self._flush_seconds += time.perf_counter() - started
+
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        for hook in self.on_flush:
+            try:
+                await hook(written)
+            except Exception as e:
+                logger.error(f"{self.collection} flush hook failed: {e}")
+        return True
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "avg_flush_ms": round(1000 * self._flush_seconds / self.counters["flushes"], 2)
+            if self.counters["flushes"] else 0.0,
+        }
@@ -42,7 +42,7 @@ export default function ReadScreen() {
   const loadSurah = async (number: number) => {
     try {
       setLoading(true);
-      const response = await quranAPI.getSurahWithTranslations(number, 'en,ms');
+      const response = await quranAPI.getSurahWithTranslations(number, 'en,ms', 'aligned');
       setSurahData(response.data.data);
       setCurrentSurah(number);
     } catch (error) {
@@ -120,18 +120,18 @@ export default function ReadScreen() {
     );
   }
 
-  const arabicSurah = surahData?.[0];
-  const translationSurah = surahData?.[1];
+  // Verse-aligned response: one entry per ayah with the text of every edition
+  const [arabicEdition, translationEdition] = surahData?.editions || [];
 
   return (
     <SafeAreaView style={styles.container} edges={['top']}>
       {/* Header */}
       <View style={styles.header}>
         <Text style={styles.surahTitle}>
-          {arabicSurah?.englishName || 'Al-Quran'}
+          {surahData?.englishName || 'Al-Quran'}
         </Text>
         <Text style={styles.surahSubtitle}>
-          {arabicSurah?.englishNameTranslation} • {arabicSurah?.numberOfAyahs} verses
+          {surahData?.englishNameTranslation} • {surahData?.numberOfAyahs} verses
         </Text>
       </View>
 
@@ -145,8 +145,8 @@ export default function ReadScreen() {
       )}
 
       <ScrollView style={styles.content} showsVerticalScrollIndicator={false}>
-        {arabicSurah?.ayahs?.map((ayah: any, index: number) => {
-          const translation = translationSurah?.ayahs[index];
+        {surahData?.ayahs?.map((ayah: any) => {
+          const translation = translationEdition && ayah.texts[translationEdition.identifier];
           return (
             <View key={ayah.number} style={styles.verseContainer}>
               {/* Verse Number */}
@@ -178,13 +178,13 @@ export default function ReadScreen() {
 
               {/* Arabic Text */}
               <Text style={[styles.arabicText, { fontSize: fontSize + 6 }]}>
-                {ayah.text}
+                {ayah.texts[arabicEdition?.identifier]}
               </Text>
 
               {/* Translation */}
               {translation && (
                 <Text style={[styles.translationText, { fontSize }]}>
-                  {translation.text}
+                  {translation}
                 </Text>
               )}
             </View>
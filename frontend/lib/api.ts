@@ -28,8 +28,8 @@ export const quranAPI = {
   getSurahs: () => api.get('/quran/surahs'),
   getSurah: (surahNumber: number, edition: string = 'quran-uthmani') => 
     api.get(`/quran/surah/${surahNumber}`, { params: { edition } }),
-  getSurahWithTranslations: (surahNumber: number, languages: string = 'en,ms') =>
-    api.get(`/quran/surah/${surahNumber}/translations`, { params: { languages } }),
+  getSurahWithTranslations: (surahNumber: number, languages: string = 'en,ms', layout: string = 'editions') =>
+    api.get(`/quran/surah/${surahNumber}/translations`, { params: { languages, layout } }),
   getAyah: (surahNumber: number, ayatNumber: number, edition: string = 'quran-uthmani') =>
     api.get(`/quran/ayah/${surahNumber}/${ayatNumber}`, { params: { edition } }),
   getJuz: (juzNumber: number, edition: string = 'quran-uthmani') =>
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level modules (e.g. `from config import settings`)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+# Required settings without defaults; unit tests never talk to these services
+for name in ("SUPABASE_URL", "SUPABASE_KEY", "SUPABASE_JWT_SECRET", "GLM_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+
+# Ayah texts of the test corpus that are not the "ayah <surah>:<ayah>" filler
+ARABIC_TEXTS = {
+    1: "بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ",
+    3: "الرَّحْمَٰنِ الرَّحِيمِ",
+    262: "اللَّهُ لَا إِلَٰهَ إِلَّا هُوَ الْحَيُّ الْقَيُّومُ",
+}
+ENGLISH_TEXTS = {
+    1: "In the name of Allah, the Entirely Merciful, the Especially Merciful.",
+    3: "The Entirely Merciful, the Especially Merciful,",
+    262: "Allah - there is no deity except Him, the Ever-Living, the Sustainer of existence.",
+    293: "Merciful is the name of your Lord.",
+}
+EDITIONS = {
+    "quran-simple": ({"identifier": "quran-simple", "language": "ar", "name": "Simple"}, ARABIC_TEXTS),
+    "en.sahih": ({"identifier": "en.sahih", "language": "en", "name": "Sahih International"}, ENGLISH_TEXTS),
+}
+
+
+@pytest.fixture(scope="session")
+def corpus_dir(tmp_path_factory):
+    """A full-size local corpus (synthetic texts, real numbering) in the QuranStore format"""
+    from quran_store import CORPUS_FORMAT, AYAH_COLUMNS, _encode_edition, _structure_from
+    from quran_structure import SURAHS, TOTAL_AYAHS, locate, structure
+
+    data_dir = tmp_path_factory.mktemp("corpus")
+    meta = {"format": CORPUS_FORMAT, "version": "test", "editions": {}}
+    for identifier, (edition, texts) in EDITIONS.items():
+        surahs = [{**surah, "ayahs": []} for surah in SURAHS]
+        for number in range(1, TOTAL_AYAHS + 1):
+            surah_number, ayat_number = locate(number)
+            ayah = {
+                "number": number,
+                "text": texts.get(number, f"ayah {surah_number}:{ayat_number}"),
+                "sajda": False,
+            }
+            ayah.update({column: structure.division_of(column, number) for column in AYAH_COLUMNS})
+            surahs[surah_number - 1]["ayahs"].append(ayah)
+        text_blob, index_blob = _encode_edition(surahs)
+        (data_dir / f"{identifier}.txt").write_bytes(text_blob)
+        (data_dir / f"{identifier}.idx").write_bytes(index_blob)
+        meta.update(_structure_from(surahs))
+        meta["editions"][identifier] = edition
+    assert set(meta["ayahs"]) == set(AYAH_COLUMNS)
+    (data_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return str(data_dir)
+
+
+@pytest.fixture
+def store(corpus_dir):
+    from quran_store import QuranStore
+
+    store = QuranStore(corpus_dir)
+    assert store.load()
+    yield store
+    store.close()
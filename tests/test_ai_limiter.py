@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from ai_limiter import AIOverloaded, ConcurrencyLimiter
+from ai_service import AIService
+
+
+def make_limiter(global_limit=1, per_user_limit=1, max_queue=10, queue_timeout=0.05):
+    return ConcurrencyLimiter(global_limit, per_user_limit, max_queue, queue_timeout)
+
+
+def test_per_user_limit_queues_and_times_out():
+    async def main():
+        limiter = make_limiter(global_limit=2)
+        async with limiter.slot("reader"):
+            async with limiter.slot("other"):
+                assert limiter.stats()["in_flight"] == 2
+            with pytest.raises(AIOverloaded):
+                async with limiter.slot("reader"):
+                    pass
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert limiter.stats()["timed_out"] == 1
+    assert (limiter.stats()["in_flight"], limiter.stats()["active_users"]) == (0, 0)
+
+
+def test_slot_is_held_until_released_work_is_done():
+    async def main():
+        limiter, done = make_limiter(), asyncio.get_running_loop().create_future()
+        async with limiter.slot("reader") as slot:
+            slot.release_after(done)
+        assert limiter.stats()["in_flight"] == 1
+        with pytest.raises(AIOverloaded):
+            async with limiter.slot():
+                pass
+        done.set_result(None)
+        await asyncio.sleep(0)
+        assert limiter.stats()["in_flight"] == 0
+        async with limiter.slot("reader"):
+            pass
+        return limiter
+
+    assert asyncio.run(main()).stats()["completed"] == 2
+
+
+def test_cancelled_completion_keeps_its_slot_until_the_call_returns():
+    service = AIService()
+    release = threading.Event()
+
+    def create(**kwargs):
+        release.wait(5)
+        return "reply"
+
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def main():
+        task = asyncio.create_task(service._complete("reader", messages=[]))
+        while not service.limiter.stats()["in_flight"]:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The call is still running on its thread
+        assert service.limiter.stats()["in_flight"] == 1
+        release.set()
+        while service.limiter.stats()["in_flight"]:
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(asyncio.wait_for(main(), 5))
+    finally:
+        release.set()
+        service.shutdown()
+
+
+class BlockingStream:
+    """An SDK stream whose second chunk only arrives once `release` is set"""
+
+    def __init__(self, release: threading.Event, exited: threading.Event):
+        self.release, self.exited = release, exited
+        self.response = SimpleNamespace(close=exited.set)
+
+    def __iter__(self):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Bismillah"))])
+        self.release.wait(5)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=" ..."))])
+
+
+def test_disconnected_stream_keeps_its_slot_until_the_worker_exits():
+    service = AIService()
+    service.chat_cache = None
+    release, exited = threading.Event(), threading.Event()
+    stream = BlockingStream(release, exited)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **_: stream)))
+
+    async def main():
+        chunks = service.chat_stream("Explain Al-Fatihah", user_id="reader")
+        assert await chunks.__anext__() == "Bismillah"
+        # The client goes away while the worker is blocked waiting for the next chunk
+        await chunks.aclose()
+        assert service.limiter.stats()["in_flight"] == 1
+        release.set()
+        while service.limiter.stats()["in_flight"]:
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(asyncio.wait_for(main(), 5))
+    finally:
+        release.set()
+        service.shutdown()
+    assert exited.is_set()
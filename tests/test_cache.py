@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import CacheEntry, LRUCache, TieredCache
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = doc
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(cache, "get_database", lambda: {"api_cache": collection})
+    return collection
+
+
+def make_cache():
+    return TieredCache("api_cache", max_bytes=1 << 20, ttl=60, stale_ttl=600)
+
+
+class Upstream:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"version": self.calls}
+
+
+def test_lru_evicts_by_size():
+    lru = LRUCache(max_bytes=10)
+    for key in "abc":
+        lru.set(key, CacheEntry(key, 4, 0, 0))
+    assert lru.get("a") is None and lru.get("c").value == "c"
+    assert (lru.current_bytes, lru.evictions) == (8, 1)
+    lru.set("huge", CacheEntry("huge", 11, 0, 0))
+    assert lru.get("huge") is None
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock, collection):
+    async def main():
+        tiered, upstream = make_cache(), Upstream()
+        assert await tiered.get_or_fetch("surah:1", upstream) == {"version": 1}
+        assert await tiered.get_or_fetch("surah:1", upstream) == {"version": 1}
+
+        clock.now += 120
+        stale = await asyncio.gather(*(tiered.get_or_fetch("surah:1", upstream) for _ in range(3)))
+        assert stale == [{"version": 1}] * 3
+        await asyncio.gather(*tiered._refreshing.values())
+        assert await tiered.get_or_fetch("surah:1", upstream) == {"version": 2}
+        return tiered, upstream
+
+    tiered, upstream = asyncio.run(main())
+    assert upstream.calls == 2
+    stats = tiered.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"], stats["refreshes"]) == (2, 3, 1, 1)
+
+
+def test_failed_refresh_keeps_serving_the_stale_value(clock, collection):
+    async def main():
+        tiered, upstream = make_cache(), Upstream()
+        await tiered.get_or_fetch("surah:1", upstream)
+        clock.now += 120
+        upstream.fail = True
+        assert await tiered.get_or_fetch("surah:1", upstream) == {"version": 1}
+        await asyncio.gather(*tiered._refreshing.values())
+        assert await tiered.get_or_fetch("surah:1", upstream) == {"version": 1}
+        return tiered
+
+    assert asyncio.run(main()).stats()["refresh_errors"] == 1
+
+
+def test_expired_entry_is_fetched_again(clock, collection):
+    async def main():
+        tiered, upstream = make_cache(), Upstream()
+        await tiered.get_or_fetch("surah:1", upstream)
+        clock.now += 60 + 600
+        return await tiered.get_or_fetch("surah:1", upstream), tiered
+
+    value, tiered = asyncio.run(main())
+    assert value == {"version": 2}
+    assert tiered.stats()["misses"] == 2
+
+
+def test_workers_share_entries_through_mongo(clock, collection):
+    async def main():
+        upstream = Upstream()
+        await make_cache().get_or_fetch("surah:1", upstream)
+        other_worker = make_cache()
+        return await other_worker.get_or_fetch("surah:1", upstream), other_worker, upstream
+
+    value, other_worker, upstream = asyncio.run(main())
+    assert value == {"version": 1} and upstream.calls == 1
+    assert other_worker.stats()["mongo_hits"] == 1
@@ -0,0 +1,44 @@
+import pytest
+
+from chat_cache import SemanticChatCache, normalize_message, same_question
+
+DIFFERENT_QUESTIONS = [
+    ("Is music haram in Islam according to the Quran?", "Is smoking haram in Islam according to the Quran?"),
+    ("Can a woman pray during her period", "Can a woman fast during her period"),
+    ("Is wudu broken by sleeping", "Is wudu broken by bleeding"),
+    ("Explain Surah 2 ayah 255", "Explain Surah 2 ayah 256"),
+]
+
+
+@pytest.mark.parametrize("cached, asked", DIFFERENT_QUESTIONS)
+def test_different_questions_miss(cached, asked):
+    cache = SemanticChatCache(max_entries=10, threshold=0.75)
+    cache.set(cached, "en", "cached answer")
+    assert cache.get(asked, "en") is None
+    assert not same_question(normalize_message(cached), normalize_message(asked))
+
+
+def test_spelling_variants_hit():
+    cache = SemanticChatCache(max_entries=10, threshold=0.75)
+    cache.set("What is the meaning of Al-Fatihah?", "en", "fatihah answer")
+    assert cache.get("what's the meaning of al fatiha", "en") == "fatihah answer"
+
+
+def test_same_words_in_another_order_hit():
+    cache = SemanticChatCache(max_entries=10, threshold=0.75)
+    cache.set("Is music haram?", "en", "answer")
+    assert cache.get("haram music?", "en") == "answer"
+
+
+def test_different_question_is_stored_separately():
+    cache = SemanticChatCache(max_entries=10, threshold=0.75)
+    cache.set("Explain Surah 2 ayah 255", "en", "ayat al-kursi")
+    cache.set("Explain Surah 2 ayah 256", "en", "no compulsion")
+    assert cache.get("explain surah 2 ayah 255", "en") == "ayat al-kursi"
+    assert cache.get("explain surah 2 ayah 256", "en") == "no compulsion"
+
+
+def test_partitions_are_separate():
+    cache = SemanticChatCache(max_entries=10, threshold=0.75)
+    cache.set("What is zakat?", "en", "english answer")
+    assert cache.get("What is zakat?", "ms") is None
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+import server
+from ai_limiter import AIOverloaded
+from models import ChatMessage
+
+CLAIMS = {"sub": "reader", "email": "reader@example.com"}
+
+
+def events(body: str) -> list:
+    """(event, data) of each Server-Sent Event in a response body"""
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        parsed.append((fields.get("event"), json.loads(fields["data"])))
+    return parsed
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    chat = {"saved": [], "closed": False, "fail": None}
+
+    async def chat_stream(message, conversation_history=None, context=None, user_id=None, language=None):
+        try:
+            if chat["fail"]:
+                raise chat["fail"]
+            for delta in ("Bismillah", ", ", "alhamdulillah"):
+                yield delta
+        finally:
+            chat["closed"] = True
+
+    async def recent_messages(db, user_id, limit=10):
+        return []
+
+    async def append_turn(db, user_id, user_message, assistant_message, context=None):
+        chat["saved"].append((user_id, user_message, assistant_message))
+
+    monkeypatch.setattr(auth, "verify_token", lambda token: CLAIMS)
+    monkeypatch.setattr(server, "get_database", lambda: None)
+    monkeypatch.setattr(server, "recent_messages", recent_messages)
+    monkeypatch.setattr(server, "append_turn", append_turn)
+    monkeypatch.setattr(server.ai_service, "chat_stream", chat_stream)
+    return chat
+
+
+def post(message: str = "Salam"):
+    client = TestClient(server.app)
+    return client.post("/api/ai/chat/stream", json={"message": message}, headers={"Authorization": "Bearer token"})
+
+
+def test_stream_sends_deltas_then_done_and_saves_the_reply(chat):
+    response = post()
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert events(response.text) == [
+        (None, {"delta": "Bismillah"}),
+        (None, {"delta": ", "}),
+        (None, {"delta": "alhamdulillah"}),
+        ("done", {"message": "Bismillah, alhamdulillah", "role": "assistant"}),
+    ]
+    assert chat["saved"] == [("reader", "Salam", "Bismillah, alhamdulillah")]
+
+
+@pytest.mark.parametrize("error, status", [(AIOverloaded("busy"), 429), (RuntimeError("model down"), None)])
+def test_errors_end_the_stream_with_an_error_event(chat, error, status):
+    chat["fail"] = error
+    [(event, data)] = events(post().text)
+    assert event == "error"
+    assert data.get("status") == status
+    assert chat["saved"] == []
+
+
+def test_disconnect_closes_the_model_stream_and_saves_nothing(chat):
+    async def main():
+        response = await server.chat_with_ai_stream(ChatMessage(message="Salam"), claims=CLAIMS)
+        body = response.body_iterator
+        first = await body.__anext__()
+        # What the server does with the body when the client goes away mid-reply
+        await body.aclose()
+        return first
+
+    assert events(asyncio.run(main())) == [(None, {"delta": "Bismillah"})]
+    assert chat["closed"]
+    assert chat["saved"] == []
@@ -0,0 +1,56 @@
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+from database import ensure_indexes
+
+
+class FakeCollection:
+    """Just enough of a motor collection for ensure_indexes"""
+
+    def __init__(self, name, indexes=(), duplicates=False):
+        self.name = name
+        self.indexes = {spec["name"]: spec for spec in indexes}
+        # Duplicate data makes every unique index build fail
+        self.duplicates = duplicates
+
+    async def create_indexes(self, models):
+        for model in models:
+            spec = {"v": 2, **model.document, "key": dict(model.document["key"])}
+            for existing in self.indexes.values():
+                if existing["name"] == spec["name"] or existing["key"] == spec["key"]:
+                    if existing != spec:
+                        raise OperationFailure("conflict", 86 if existing["key"] != spec["key"] else 85)
+            if self.duplicates and spec.get("unique"):
+                raise OperationFailure("E11000 duplicate key error", 11000)
+            self.indexes[spec["name"]] = spec
+
+    async def list_indexes(self):
+        for spec in list(self.indexes.values()):
+            yield spec
+
+    async def drop_index(self, name):
+        del self.indexes[name]
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection(name)
+        return collection
+
+
+OLD_USER_ID = {"v": 2, "name": "user_id", "key": {"user_id": 1}}
+
+
+def test_conflicting_index_is_replaced():
+    database = FakeDatabase(user_profiles=FakeCollection("user_profiles", [OLD_USER_ID]))
+    asyncio.run(ensure_indexes(database))
+    assert database["user_profiles"].indexes["user_id"]["unique"] is True
+
+
+def test_failed_replacement_restores_the_old_index():
+    database = FakeDatabase(user_profiles=FakeCollection("user_profiles", [OLD_USER_ID], duplicates=True))
+    asyncio.run(ensure_indexes(database))
+    assert database["user_profiles"].indexes == {"user_id": OLD_USER_ID}
+    # The other collections are still indexed
+    assert "user_date" in database["reading_progress"].indexes
@@ -0,0 +1,33 @@
+import asyncio
+
+import explanation_cache
+
+
+class FakeCollection:
+    def find(self, query, projection):
+        async def nothing_cached():
+            return
+            yield
+
+        return nothing_cached()
+
+
+def test_precompute_counts_exceptions_as_failures(monkeypatch, caplog):
+    monkeypatch.setattr(explanation_cache, "AYAH_COUNTS", (3, 2))
+    monkeypatch.setattr(explanation_cache, "get_database", lambda: {explanation_cache.COLLECTION: FakeCollection()})
+    generated = []
+
+    async def explain(surah_number, ayat_number, language):
+        if (surah_number, ayat_number) == (1, 2):
+            raise RuntimeError("model timed out")
+        if (surah_number, ayat_number) == (2, 1):
+            return {"success": False, "error": "rate limited"}
+        generated.append((surah_number, ayat_number))
+        return {"success": True}
+
+    monkeypatch.setattr(explanation_cache, "explain", explain)
+    failures = asyncio.run(explanation_cache.precompute("en", rate=0, concurrency=2))
+
+    assert failures == 2
+    assert sorted(generated) == [(1, 1), (1, 3), (2, 2)]
+    assert "Failed 1:2: RuntimeError('model timed out')" in caplog.text
@@ -0,0 +1,33 @@
+import pytest
+
+from fuzzy_search import FuzzySearch
+from search_index import SearchIndex
+
+
+@pytest.fixture
+def fuzzy(store):
+    search_index = SearchIndex(store)
+    search_index.build()
+    fuzzy = FuzzySearch(search_index)
+    fuzzy.build()
+    return fuzzy
+
+
+def numbers(result):
+    return [match["number"] for match in result["data"]["matches"]]
+
+
+@pytest.mark.parametrize("query", ["الرحمن", "الرَّحْمَٰنِ", "الرحمان"])
+def test_arabic_words_are_expanded(fuzzy, query):
+    assert sorted(numbers(fuzzy.search(query, "quran-simple"))) == [1, 3]
+
+
+def test_arabic_expansion_respects_the_surah_filter(fuzzy):
+    assert numbers(fuzzy.search("القيوم", "quran-simple", surah=2)) == [262]
+    assert numbers(fuzzy.search("القيوم", "quran-simple", surah=1)) == []
+
+
+def test_translation_typos_are_expanded(fuzzy):
+    result = fuzzy.search("mercifull", "en.sahih")
+    assert sorted(numbers(result)) == [1, 3, 293]
+    assert result["data"]["expanded_terms"] == {"mercifull": ["merciful"]}
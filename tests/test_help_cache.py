@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import help_cache
+from ai_service import HELP_PROMPTS, ai_service
+
+
+class FakeCollection:
+    """find / delete_many / replace_one over a dict, matching on plain equality"""
+
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    @staticmethod
+    def _matches(doc, query):
+        if "$or" in query:
+            return any(doc[field] != condition["$ne"] for part in query["$or"] for field, condition in part.items())
+        return all(doc.get(field) == value for field, value in query.items())
+
+    def find(self, query, projection):
+        async def matching():
+            for doc in list(self.docs.values()):
+                if self._matches(doc, query):
+                    yield doc
+
+        return matching()
+
+    async def delete_many(self, query):
+        for key in [key for key, doc in self.docs.items() if self._matches(doc, query)]:
+            del self.docs[key]
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = {"_id": query["_id"], **doc}
+
+
+def stored(screen, language, prompt_version=None):
+    prompt_version = prompt_version or ai_service.help_prompt_version
+    return {"_id": f"{screen}:{language}:{prompt_version}", "screen": screen, "language": language,
+            "model": ai_service.model, "prompt_version": prompt_version, "help": f"stored {screen}"}
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    generated = []
+
+    async def contextual_help(screen, user_query=None, user_id=None, language="en"):
+        generated.append((screen, language))
+        return {"success": True, "help": f"new {screen}"}
+
+    monkeypatch.setattr(ai_service, "help_cache", {})
+    monkeypatch.setattr(ai_service, "_contextual_help", contextual_help)
+    return generated
+
+
+def test_warm_generates_only_what_is_not_stored(monkeypatch, generated):
+    collection = FakeCollection([stored("home", "en"), stored("search", "en", prompt_version="old")])
+    monkeypatch.setattr(help_cache, "get_database", lambda: {help_cache.COLLECTION: collection})
+
+    assert asyncio.run(help_cache.warm(["en"])) == len(HELP_PROMPTS) - 1
+    assert sorted(generated) == sorted((screen, "en") for screen in HELP_PROMPTS if screen != "home")
+    # The entry from another prompt version is gone; everything current is now stored
+    assert {doc["prompt_version"] for doc in collection.docs.values()} == {ai_service.help_prompt_version}
+    assert len(collection.docs) == len(HELP_PROMPTS)
+
+    response = asyncio.run(ai_service.contextual_help("home"))
+    assert response == {"success": True, "help": "stored home", "cached": True}
+
+    # A second worker start generates nothing
+    generated.clear()
+    ai_service.help_cache.clear()
+    assert asyncio.run(help_cache.warm(["en"])) == 0
+    assert generated == []
+
+
+def test_help_cache_is_keyed_by_prompt_version(monkeypatch, generated):
+    asyncio.run(ai_service.contextual_help("home"))
+    monkeypatch.setattr(ai_service, "system_prompt", ai_service.system_prompt + " Be concise.")
+    response = asyncio.run(ai_service.contextual_help("home"))
+    assert "cached" not in response
+    assert generated == [("home", "en"), ("home", "en")]
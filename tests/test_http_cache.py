@@ -0,0 +1,127 @@
+import gzip
+
+import brotli
+import orjson
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from http_cache import ImmutableResponses, accepted_encoding, byte_range, file_response
+
+PAYLOAD = {"code": 200, "status": "OK", "data": ["ayah"] * 200}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("*;q=0.1, gzip;q=0", "br"),
+    ("br;q=x", None),
+])
+def test_accepted_encoding(header, expected):
+    assert accepted_encoding(header) == expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+])
+def test_byte_range(header, expected):
+    assert byte_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-2"])
+def test_unsatisfiable_byte_range(header):
+    with pytest.raises(ValueError):
+        byte_range(header, 1000)
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+    responses = ImmutableResponses(max_bytes=1 << 20, minimum_size=100, max_age=60)
+    path = tmp_path / "bundle.bin"
+    path.write_bytes(bytes(range(256)) * 4)
+
+    async def build():
+        return PAYLOAD
+
+    @app.get("/versioned")
+    async def versioned(request: Request):
+        return await responses.respond(request, "v1", build)
+
+    @app.get("/hashed")
+    async def hashed(request: Request):
+        return await responses.respond(request, "", build)
+
+    @app.get("/file")
+    async def download(request: Request):
+        return file_response(request, str(path), "application/octet-stream", '"file-v1"', 60)
+
+    client = TestClient(app)
+    client.responses = responses
+    return client
+
+
+@pytest.mark.parametrize("path", ["/versioned", "/hashed"])
+def test_each_coding_has_its_own_etag_and_revalidates(client, path):
+    identity = client.get(path, headers={"Accept-Encoding": "identity"})
+    br = client.get(path, headers={"Accept-Encoding": "br"})
+    gz = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert orjson.loads(identity.content) == PAYLOAD
+    assert br.headers["content-encoding"] == "br"
+    assert orjson.loads(brotli.decompress(_raw(client, path, "br"))) == PAYLOAD
+    assert orjson.loads(gzip.decompress(_raw(client, path, "gzip"))) == PAYLOAD
+    etags = {identity.headers["etag"], br.headers["etag"], gz.headers["etag"]}
+    assert len(etags) == 3
+
+    for etag in etags:
+        response = client.get(path, headers={"If-None-Match": etag, "Accept-Encoding": "br"})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+    assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def _raw(client, path, encoding) -> bytes:
+    """The body as sent, before the test client undoes the content coding"""
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        return b"".join(response.iter_raw())
+
+
+def test_versioned_304_needs_no_build(client):
+    etag = client.get("/versioned").headers["etag"]
+    misses = client.responses.counters["misses"]
+    assert client.get("/versioned", headers={"If-None-Match": f'W/{etag}'}).status_code == 304
+    assert client.responses.counters["misses"] == misses
+
+
+def test_small_bodies_are_not_compressed(client):
+    client.responses.minimum_size = 1 << 20
+    response = client.get("/hashed", headers={"Accept-Encoding": "br"})
+    assert "content-encoding" not in response.headers
+
+
+def test_file_range_requests(client):
+    whole = client.get("/file")
+    assert whole.status_code == 200 and len(whole.content) == 1024
+
+    part = client.get("/file", headers={"Range": "bytes=1000-"})
+    assert part.status_code == 206
+    assert part.headers["content-range"] == "bytes 1000-1023/1024"
+    assert part.content == whole.content[1000:]
+
+    assert client.get("/file", headers={"Range": "bytes=2000-"}).status_code == 416
+    assert client.get("/file", headers={"If-None-Match": '"file-v1"'}).status_code == 304
+    # A stale If-Range gets the whole (new) file instead of a mismatched piece
+    stale = client.get("/file", headers={"Range": "bytes=1000-", "If-Range": '"file-v0"'})
+    assert stale.status_code == 200 and len(stale.content) == 1024
@@ -0,0 +1,89 @@
+import gzip
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from offline_bundle import OfflineBundles
+
+
+@pytest.fixture
+def bundles(store, tmp_path, monkeypatch):
+    bundles = OfflineBundles(store, str(tmp_path / "bundles"))
+    monkeypatch.setattr(server.quran_service, "bundles", bundles)
+    return bundles
+
+
+@pytest.fixture
+def client(bundles):
+    return TestClient(server.app)
+
+
+def record_old_version(bundles, version: str, **changes) -> dict:
+    """Leave a manifest for an earlier corpus version, as a server that served it would have"""
+    old = json.loads(json.dumps(bundles.manifest()))
+    old["version"] = version
+    for key, value in changes.items():
+        old[key] = value
+    path = bundles._manifest_path(version)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(old, f)
+    return old
+
+
+def read_bundle(content: bytes, tmp_path) -> sqlite3.Connection:
+    path = tmp_path / "bundle.sqlite"
+    path.write_bytes(gzip.decompress(content))
+    return sqlite3.connect(path)
+
+
+@pytest.mark.parametrize("since", ["v0", "..", "../manifests/test", "test.json", "te st"])
+def test_unknown_or_malformed_since_is_404(client, bundles, since):
+    response = client.get("/api/quran/bundle/delta", params={"since": since})
+    assert response.status_code == 404
+    assert "download the full bundle" in response.json()["detail"]
+
+
+def test_since_is_required(client):
+    assert client.get("/api/quran/bundle/delta").status_code == 422
+
+
+def test_delta_carries_only_changed_editions(client, bundles, tmp_path):
+    manifest = bundles.manifest()
+    record_old_version(bundles, "v1", editions={**manifest["editions"], "en.sahih": "0" * 16, "ms.basmeih": "1" * 16})
+
+    response = client.get("/api/quran/bundle/delta", params={"since": "v1"})
+    assert response.status_code == 200
+    conn = read_bundle(response.content, tmp_path)
+    meta = dict(conn.execute("SELECT key, value FROM meta"))
+    assert (meta["base_version"], meta["version"]) == ("v1", manifest["version"])
+    assert json.loads(meta["editions"]) == ["en.sahih"]
+    assert json.loads(meta["removed_editions"]) == ["ms.basmeih"]
+    assert meta["structure"] == "unchanged"
+    assert conn.execute("SELECT DISTINCT edition FROM texts").fetchall() == [("en.sahih",)]
+    assert conn.execute("SELECT COUNT(*) FROM ayahs").fetchone() == (0,)
+
+
+def test_delta_includes_structure_when_it_changed(client, bundles, tmp_path):
+    record_old_version(bundles, "v2", structure="old")
+    response = client.get("/api/quran/bundle/delta", params={"since": "v2", "editions": "quran-simple"})
+    conn = read_bundle(response.content, tmp_path)
+    assert dict(conn.execute("SELECT key, value FROM meta"))["structure"] == "included"
+    assert conn.execute("SELECT COUNT(*) FROM ayahs").fetchone() == (6236,)
+    assert conn.execute("SELECT COUNT(*) FROM texts").fetchone() == (0,)
+
+
+def test_delta_resumes_with_range_requests(client, bundles):
+    record_old_version(bundles, "v3", structure="old")
+    whole = client.get("/api/quran/bundle/delta", params={"since": "v3"})
+    part = client.get("/api/quran/bundle/delta", params={"since": "v3"}, headers={"Range": "bytes=100-"})
+    assert part.status_code == 206
+    assert part.content == whole.content[100:]
+
+
+def test_delta_for_an_unknown_edition_is_404(client, bundles):
+    record_old_version(bundles, "v4")
+    response = client.get("/api/quran/bundle/delta", params={"since": "v4", "editions": "xx.unknown"})
+    assert response.status_code == 404
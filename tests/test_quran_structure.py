@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+import quran_service
+from quran_structure import (
+    AYAH_COUNTS, SURAHS, TOTAL_AYAHS, TOTAL_SURAHS, InvalidReference, QuranStructure, structure, surah_range,
+)
+
+
+def test_surah_metadata_is_compiled_in():
+    assert [surah["number"] for surah in SURAHS] == list(range(1, TOTAL_SURAHS + 1))
+    assert [surah["numberOfAyahs"] for surah in SURAHS] == list(AYAH_COUNTS)
+    assert SURAHS[0]["englishName"] == "Al-Faatiha"
+    assert SURAHS[1]["revelationType"] == "Medinan"
+    assert SURAHS[113]["revelationType"] == "Meccan"
+    assert all(surah["name"].startswith("سورة ") for surah in SURAHS)
+
+
+def test_surah_ranges_cover_the_mushaf():
+    assert surah_range(1) == (1, 7)
+    assert surah_range(2) == (8, 293)
+    assert surah_range(114) == (TOTAL_AYAHS - 5, TOTAL_AYAHS)
+    with pytest.raises(InvalidReference):
+        surah_range(115)
+
+
+def test_surah_list_needs_no_corpus_or_network(monkeypatch):
+    service = quran_service.QuranService.__new__(quran_service.QuranService)
+    service.store = quran_service.QuranStore("/nonexistent")
+    service.local_mode = False
+
+    def no_network():
+        raise AssertionError("the surah list must not go upstream")
+
+    monkeypatch.setattr(quran_service, "get_http_client", no_network)
+    result = asyncio.run(service.get_surah_list())
+    assert result["data"] == list(SURAHS)
+
+
+@pytest.mark.parametrize("division, number, expected", [
+    ("juz", 1, (1, 148)),
+    ("juz", 2, (149, 259)),
+    ("juz", 30, (5673, TOTAL_AYAHS)),
+    ("manzil", 1, (1, 669)),
+    ("manzil", 7, (4631, TOTAL_AYAHS)),
+    ("page", 1, (1, 7)),
+    ("page", 2, (8, 12)),
+    ("page", 604, (TOTAL_AYAHS - 14, TOTAL_AYAHS)),
+    ("ruku", 2, (8, 14)),
+    ("hizbQuarter", 2, (33, 50)),
+    ("hizb", 1, (1, 81)),
+    ("hizb", 60, (5949, TOTAL_AYAHS)),
+])
+def test_compiled_division_ranges(division, number, expected):
+    assert structure.division_range(division, number) == expected
+
+
+@pytest.mark.parametrize("division, count", [
+    ("juz", 30), ("manzil", 7), ("hizbQuarter", 240), ("hizb", 60), ("page", 604), ("ruku", 556),
+])
+def test_compiled_divisions_tile_the_mushaf(division, count):
+    ranges = [structure.division_range(division, n) for n in range(1, structure.count(division) + 1)]
+    assert len(ranges) == count
+    assert ranges[0][0] == 1 and ranges[-1][1] == TOTAL_AYAHS
+    assert all(last + 1 == first for (_, last), (first, _) in zip(ranges, ranges[1:]))
+    assert [structure.division_of(division, first) for first, _ in ranges] == list(range(1, len(ranges) + 1))
+
+
+def test_juz_and_hizb_boundaries_agree():
+    juz_starts = {structure.division_range("juz", n)[0] for n in range(1, 31)}
+    assert juz_starts == {structure.division_range("hizb", n)[0] for n in range(1, 61, 2)}
+
+
+@pytest.mark.parametrize("division, number", [("juz", 0), ("juz", 31), ("manzil", 8), ("page", 605), ("rub", 1)])
+def test_division_out_of_range(division, number):
+    with pytest.raises(InvalidReference):
+        structure.division_range(division, number)
+
+
+def test_structure_is_independent_of_the_corpus(store):
+    # The test corpus' per-ayah columns are generated from the compiled boundaries
+    assert QuranStructure().boundaries == structure.boundaries
+    assert structure.differing_columns(store.meta["ayahs"]) == []
+    shifted = {"page": [1] + store.meta["ayahs"]["page"][:-1], "ruku": [1] * TOTAL_AYAHS}
+    assert structure.differing_columns(shifted) == ["page", "ruku"]
@@ -0,0 +1,218 @@
+import asyncio
+import os
+from datetime import date, datetime
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+import reading_progress
+from reading_progress import update_streak
+
+# The streak is computed by an update pipeline inside MongoDB, so these tests
+# need a real server; point MONGO_TEST_URL at a disposable database to run them
+# (CI sets MONGO_TEST_REQUIRED so a missing server fails instead of skipping)
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017/alquran_test")
+MONGO_TEST_REQUIRED = bool(os.environ.get("MONGO_TEST_REQUIRED"))
+unreachable = []
+
+
+def no_server():
+    message = f"No MongoDB server at {MONGO_TEST_URL}"
+    if MONGO_TEST_REQUIRED:
+        pytest.fail(message)
+    pytest.skip(message)
+
+
+def run_with_db(test):
+    """Run `await test(db)` against a fresh test database, or skip without a server"""
+    if unreachable:
+        no_server()
+
+    async def main():
+        client = AsyncIOMotorClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except PyMongoError:
+            client.close()
+            unreachable.append(MONGO_TEST_URL)
+            no_server()
+        db = client.get_default_database()
+        await db.user_profiles.drop()
+        await db.user_profiles.create_index("user_id", unique=True)
+        try:
+            return await test(db)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    return asyncio.run(main())
+
+
+def profile(last_read_date, current_streak=3, longest_streak=5) -> dict:
+    return {"user_id": "reader", "streak_data": {
+        "last_read_date": last_read_date, "current_streak": current_streak, "longest_streak": longest_streak,
+    }}
+
+
+async def streak_after(db, existing, days) -> dict:
+    if existing is not None:
+        await db.user_profiles.insert_one(existing)
+    return await update_streak(db, "reader", "reader@example.com", 1, 1, "now", days=days)
+
+
+class CapturingProfiles:
+    def __init__(self):
+        self.pipelines = []
+
+    async def find_one_and_update(self, query, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        return {"streak_data": {}}
+
+
+class CapturingDatabase:
+    def __init__(self):
+        self.user_profiles = CapturingProfiles()
+
+
+def test_batch_days_are_folded_in_order_once_each():
+    db = CapturingDatabase()
+    days = [date(2026, 10, 17), date(2026, 10, 15), date(2026, 10, 17), date(2026, 10, 16)]
+    asyncio.run(update_streak(db, "reader", "", 1, 1, "now", days=days))
+    [pipeline] = db.user_profiles.pipelines
+    reduce = pipeline[1]["$set"]["_streak"]["$reduce"]
+    assert reduce["input"] == {"$literal": [datetime(2026, 10, 15), datetime(2026, 10, 16), datetime(2026, 10, 17)]}
+
+
+def test_batch_spanning_several_days_extends_the_streak_per_day():
+    days = [date(2026, 10, 15), date(2026, 10, 16), date(2026, 10, 17)]
+    streak = run_with_db(lambda db: streak_after(db, profile("2026-10-14", 3, 3), days))
+    assert streak == {"last_read_date": "2026-10-17", "current_streak": 6, "longest_streak": 6}
+
+
+def test_batch_days_already_counted_are_skipped():
+    days = [date(2026, 10, 12), date(2026, 10, 16), date(2026, 10, 17)]
+    streak = run_with_db(lambda db: streak_after(db, profile("2026-10-16", 3, 5), days))
+    assert streak == {"last_read_date": "2026-10-17", "current_streak": 4, "longest_streak": 5}
+
+
+def test_batch_with_a_gap_restarts_after_it():
+    days = [date(2026, 10, 13), date(2026, 10, 16), date(2026, 10, 17)]
+    streak = run_with_db(lambda db: streak_after(db, profile("2026-10-12", 7, 7), days))
+    assert streak == {"last_read_date": "2026-10-17", "current_streak": 2, "longest_streak": 8}
+
+
+TODAY = date(2026, 10, 17)
+
+
+@pytest.mark.parametrize("last_read_date, expected", [
+    ("2026-10-17", (3, 5)),  # same day keeps the streak
+    ("2026-10-16", (4, 5)),  # next day extends it
+    ("2026-10-14", (1, 5)),  # a gap restarts it
+    (None, (1, 5)),
+    ("2026-10-16T21:30:00", (4, 5)),  # full ISO timestamp as stored by older versions
+    (datetime(2026, 10, 16, 21, 30), (4, 5)),  # BSON date
+    (datetime(2026, 10, 17, 8, 0), (3, 5)),
+])
+def test_streak_for_a_read_today(last_read_date, expected):
+    streak = run_with_db(lambda db: streak_after(db, profile(last_read_date), [TODAY]))
+    assert (streak["current_streak"], streak["longest_streak"]) == expected
+    assert streak["last_read_date"] == "2026-10-17"
+
+
+def test_extending_past_the_longest_streak_raises_it():
+    streak = run_with_db(lambda db: streak_after(db, profile("2026-10-16", 5, 5), [TODAY]))
+    assert (streak["current_streak"], streak["longest_streak"]) == (6, 6)
+
+
+def test_missing_streak_data_starts_a_streak():
+    streak = run_with_db(lambda db: streak_after(db, {"user_id": "reader"}, [TODAY]))
+    assert streak == {"last_read_date": "2026-10-17", "current_streak": 1, "longest_streak": 1}
+
+
+def test_first_read_creates_the_profile():
+    async def test(db):
+        streak = await streak_after(db, None, [TODAY])
+        return streak, await db.user_profiles.find_one({"user_id": "reader"}, {"_id": 0, "email": 1})
+
+    streak, stored = run_with_db(test)
+    assert streak == {"last_read_date": "2026-10-17", "current_streak": 1, "longest_streak": 1}
+    assert stored == {"email": "reader@example.com"}
+
+
+def test_concurrent_first_reads_both_succeed():
+    async def test(db):
+        streaks = await asyncio.gather(*(
+            update_streak(db, "reader", "reader@example.com", 1, 1, "now", days=[TODAY]) for _ in range(8)
+        ))
+        return streaks, await db.user_profiles.count_documents({"user_id": "reader"})
+
+    streaks, profiles = run_with_db(test)
+    assert profiles == 1
+    assert all(streak["current_streak"] == 1 for streak in streaks)
+
+
+async def update_streak_default(db, existing):
+    await db.user_profiles.insert_one(existing)
+    return await update_streak(db, "reader", "", 1, 1, "now")
+
+
+def test_default_day_is_today():
+    yesterday = date.fromordinal(datetime.now().date().toordinal() - 1)
+    streak = run_with_db(lambda db: update_streak_default(db, profile(yesterday.isoformat())))
+    assert streak["current_streak"] == 4
+    assert streak["last_read_date"] == datetime.now().date().isoformat()
+
+
+class RacingProfiles(CapturingProfiles):
+    """The first upsert loses the race to create the profile"""
+
+    async def find_one_and_update(self, query, pipeline, **kwargs):
+        if not self.pipelines:
+            self.pipelines.append(pipeline)
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return await super().find_one_and_update(query, pipeline, **kwargs)
+
+
+def test_losing_the_upsert_race_retries_as_an_update():
+    db = CapturingDatabase()
+    db.user_profiles = RacingProfiles()
+    assert asyncio.run(update_streak(db, "reader", "", 1, 1, "now", days=[TODAY])) == {}
+    assert len(db.user_profiles.pipelines) == 2
+
+
+HISTORY = [
+    {"user_id": "reader", "surah_number": 1, "ayat_number": 1, "time_spent": 30, "date": datetime(2026, 10, 16, 8)},
+    {"user_id": "reader", "surah_number": 1, "ayat_number": 2, "time_spent": 20, "date": datetime(2026, 10, 16, 21)},
+    {"user_id": "reader", "surah_number": 2, "ayat_number": 1, "time_spent": -5, "date": datetime(2026, 10, 16, 9)},
+    {"user_id": "reader", "surah_number": None, "ayat_number": None, "time_spent": None,
+     "date": datetime(2026, 10, 17, 7)},
+    {"user_id": "other", "surah_number": 114, "ayat_number": 6, "time_spent": 12, "date": datetime(2026, 10, 17, 23)},
+]
+
+
+def test_backfill_rebuilds_the_incremental_rollups(monkeypatch):
+    async def rollups(db) -> list:
+        # $inc never creates `surahs` for a day without any surah; daily_stats treats both alike
+        docs = await db.reading_daily.find().sort("_id").to_list(length=None)
+        return [{**doc, "surahs": doc.get("surahs", {})} for doc in docs]
+
+    async def test(db):
+        monkeypatch.setattr(reading_progress, "get_database", lambda: db)
+        await db.reading_progress.insert_many([dict(entry) for entry in HISTORY])
+        await reading_progress.record_daily(HISTORY)
+        incremental = await rollups(db)
+        await db.reading_daily.delete_many({})
+        await reading_progress.backfill()
+        return incremental, await rollups(db)
+
+    incremental, backfilled = run_with_db(test)
+    assert backfilled == incremental
+    assert incremental == [
+        {"_id": "other:2026-10-17", "user_id": "other", "day": "2026-10-17", "time_spent": 12, "ayahs": 1,
+         "surahs": {"114": 1}},
+        {"_id": "reader:2026-10-16", "user_id": "reader", "day": "2026-10-16", "time_spent": 50, "ayahs": 3,
+         "surahs": {"1": 2, "2": 1}},
+        {"_id": "reader:2026-10-17", "user_id": "reader", "day": "2026-10-17", "time_spent": 0, "ayahs": 1,
+         "surahs": {}},
+    ]
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import quran_service
+from search_index import EditionIndex, SearchIndex, normalize_arabic, tokenize
+
+
+@pytest.fixture
+def search_index(store):
+    search_index = SearchIndex(store)
+    search_index.build()
+    return search_index
+
+
+def ranked(scores: dict) -> list:
+    return [doc for doc, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def test_tokenize_folds_case_and_arabic_spelling():
+    assert tokenize("The Entirely-Merciful") == ["the", "entirely", "merciful"]
+    assert normalize_arabic("الرَّحْمَٰنِ") == "الرحمن"
+    assert tokenize("إِلَٰهَ رَحْمَةً") == ["اله", "رحمه"]
+
+
+def test_bm25_prefers_more_occurrences_in_shorter_ayahs():
+    index = EditionIndex.build(["mercy mercy", "mercy and more words here", "nothing"])
+    assert ranked(index.search("mercy")) == [1, 2]
+
+
+def test_phrases_must_match_in_order():
+    index = EditionIndex.build(["the most merciful", "merciful the most", "most the merciful"])
+    assert ranked(index.search('"most merciful"')) == [1]
+    assert ranked(index.search('"merciful the"')) == [2]
+    assert index.search('"merciful most"') == {}
+    # Terms outside the quotes still rank, but only within the phrase matches
+    assert ranked(index.search('"the most" merciful')) == [1, 2]
+
+
+def test_quoted_word_is_required():
+    index = EditionIndex.build(["mercy and lord", "lord", "mercy"])
+    assert ranked(index.search('"mercy" lord')) == [1, 3]
+    assert index.search('"absent" lord') == {}
+
+
+def test_doc_range_filters_matches():
+    index = EditionIndex.build(["mercy"] * 5)
+    assert sorted(index.search("mercy", (2, 4))) == [2, 3, 4]
+
+
+def test_search_ranks_and_filters_by_surah(search_index):
+    result = search_index.search("merciful", "en.sahih")["data"]
+    assert [match["number"] for match in result["matches"]] == [3, 1, 293]
+
+    result = search_index.search("merciful", "en.sahih", surah=2)["data"]
+    [match] = result["matches"]
+    assert (match["number"], match["numberInSurah"], match["surah"]["number"]) == (293, 286, 2)
+    assert result["count"] == 1
+
+
+def test_phrase_search_across_the_corpus(search_index):
+    assert [m["number"] for m in search_index.search('"especially merciful"', "en.sahih")["data"]["matches"]] == [3, 1]
+    assert search_index.search('"merciful especially"', "en.sahih")["data"]["matches"] == []
+
+
+def test_arabic_search_ignores_harakat(search_index):
+    matches = search_index.search("الرحمن", "quran-simple", surah=1)["data"]["matches"]
+    assert sorted(match["number"] for match in matches) == [1, 3]
+
+
+def test_pagination(search_index):
+    page = search_index.search("ayah", "en.sahih", offset=10, limit=5)["data"]
+    assert page["count"] > 6000
+    assert (page["offset"], page["limit"], len(page["matches"])) == (10, 5, 5)
+
+
+def test_requests_never_build_the_index(store):
+    service = quran_service.QuranService.__new__(quran_service.QuranService)
+    service.store, service.local_mode = store, True
+    service.search_index = SearchIndex(store)
+    with pytest.raises(quran_service.CorpusNotAvailable):
+        asyncio.run(service.search_quran("merciful", "en.sahih"))
+    assert not service.search_index.has_edition("en.sahih")
@@ -0,0 +1,67 @@
+import logging
+
+import numpy as np
+import pytest
+
+import semantic_search
+from search_index import SearchIndex
+from semantic_search import MODES, SemanticIndex, SemanticModel
+
+
+@pytest.fixture(scope="module")
+def semantic_index(corpus_dir, tmp_path_factory):
+    from quran_store import QuranStore
+
+    store = QuranStore(corpus_dir)
+    assert store.load()
+    index = SemanticIndex(SearchIndex(store))
+    models_dir = tmp_path_factory.mktemp("semantic")
+    index._path = lambda edition: str(models_dir / f"semantic-{edition}.npz")
+    index.load_or_build()
+    yield index
+    store.close()
+
+
+def test_fit_embeds_related_texts_close_together():
+    texts = ["mercy forgiving lord", "mercy forgiving people", "fire torment people", "fire torment lord"] * 5
+    model = SemanticModel.fit(texts, dimensions=8, max_features=100, ivf_lists=2)
+    assert np.allclose(np.linalg.norm(model.embeddings, axis=1), 1, atol=1e-5)
+    [scores] = model.scores(model.embed(["forgiving mercy"]), "exact", probe=1)
+    assert scores[0] > scores[2] and scores[1] > scores[3]
+
+
+def test_fit_rejects_texts_without_usable_terms():
+    with pytest.raises(ValueError):
+        SemanticModel.fit(["one", "two", "three"], dimensions=8, max_features=100, ivf_lists=2)
+
+
+def test_only_the_arabic_edition_is_skipped(semantic_index):
+    assert semantic_index.translation_editions() == ["en.sahih"]
+    assert semantic_index.has_edition("en.sahih")
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_every_mode_finds_the_same_top_hit(semantic_index, mode):
+    result = semantic_index.search("especially merciful", "en.sahih", k=3, mode=mode)["data"]
+    assert result["mode"] == mode
+    assert result["matches"][0]["number"] == 3
+
+
+def test_surah_filter(semantic_index):
+    matches = semantic_index.search("merciful", "en.sahih", k=5, surah=2)["data"]["matches"]
+    assert matches[0]["number"] == 293
+    assert all(8 <= match["number"] <= 293 for match in matches)
+
+
+def test_unusable_edition_is_skipped_with_a_warning(semantic_index, monkeypatch, caplog):
+    index = SemanticIndex(semantic_index.search_index)
+    index._path = lambda edition: "/nonexistent/semantic.npz"
+
+    def fail(*args, **kwargs):
+        raise ValueError("too few terms")
+
+    monkeypatch.setattr(semantic_search.SemanticModel, "fit", fail)
+    with caplog.at_level(logging.WARNING):
+        index.load_or_build()
+    assert not index.has_edition("en.sahih")
+    assert "Skipping semantic index for en.sahih: too few terms" in caplog.text
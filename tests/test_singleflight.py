@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    async def main():
+        flight, calls = SingleFlight(), []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 1}
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"executions": 1, "shared": 4, "abandoned": 0, "in_flight": 0}
+
+
+def test_errors_fan_out_to_every_waiter_and_are_not_cached():
+    async def main():
+        flight, calls = SingleFlight(), []
+
+        async def fail():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+        # The failure is forgotten, so the next call runs again
+        with pytest.raises(ValueError):
+            await flight.do("key", fail)
+        return calls, results
+
+    calls, results = asyncio.run(main())
+    assert len(calls) == 2
+    assert all(isinstance(result, ValueError) and str(result) == "upstream failed" for result in results)
+
+
+def test_cancelled_waiter_does_not_cancel_the_others():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return flight, await second, first
+
+    flight, result, first = asyncio.run(main())
+    assert result == "done"
+    assert first.cancelled()
+    assert flight.counters["abandoned"] == 0
+
+
+def test_last_waiter_leaving_cancels_the_shared_call():
+    async def main():
+        flight, cancelled = SingleFlight(), asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        return flight
+
+    flight = asyncio.run(main())
+    assert flight.stats()["abandoned"] == 1
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+import quran_service
+from quran_service import CorpusNotAvailable, align_editions
+
+
+def surah(identifier, texts, first=1):
+    ayahs = [{"number": first + i, "numberInSurah": i + 1, "juz": 1, "text": text} for i, text in enumerate(texts)]
+    return {"number": 1, "englishName": "Al-Faatiha", "edition": {"identifier": identifier}, "ayahs": ayahs}
+
+
+@pytest.fixture
+def service(store):
+    service = quran_service.QuranService.__new__(quran_service.QuranService)
+    service.store, service.local_mode = store, True
+    return service
+
+
+def test_align_editions_merges_texts_per_ayah():
+    aligned = align_editions([surah("ar", ["a1", "a2"]), surah("en", ["e1", "e2"])])
+    assert aligned["editions"] == [{"identifier": "ar"}, {"identifier": "en"}]
+    assert aligned["ayahs"][1] == {"number": 2, "numberInSurah": 2, "juz": 1, "texts": {"ar": "a2", "en": "e2"}}
+    assert "edition" not in aligned
+
+
+@pytest.mark.parametrize("other", [
+    surah("en", ["e1"]),
+    surah("en", ["e1", "e2", "e3"]),
+    surah("en", ["e1", "e2"], first=2),
+    surah("en", []),
+])
+def test_align_editions_rejects_mismatched_editions(other):
+    with pytest.raises(ValueError):
+        align_editions([surah("ar", ["a1", "a2"]), other])
+
+
+def test_editions_layout_is_the_default(service):
+    result = asyncio.run(service.get_translations(1, ["quran-simple", "en.sahih"]))
+    assert [data["edition"]["identifier"] for data in result["data"]] == ["quran-simple", "en.sahih"]
+
+    aligned = asyncio.run(service.get_translations(1, ["quran-simple", "en.sahih"], "aligned", 2, 3))["data"]
+    assert [ayah["numberInSurah"] for ayah in aligned["ayahs"]] == [2, 3]
+    assert aligned["ayahs"][1]["texts"]["en.sahih"] == "The Entirely Merciful, the Especially Merciful,"
+
+
+def test_missing_edition_fails_the_whole_request(service):
+    with pytest.raises(CorpusNotAvailable):
+        asyncio.run(service.get_translations(1, ["quran-simple", "ms.basmeih"], "aligned"))
+
+
+def test_ranges_and_fields_narrow_surah_and_juz(service):
+    surah = asyncio.run(service.get_surah(2, "en.sahih", 5, 7, {"text"}))["data"]
+    assert [set(ayah) for ayah in surah["ayahs"]] == [{"number", "text"}] * 3
+    assert [ayah["number"] for ayah in surah["ayahs"]] == [12, 13, 14]
+    assert asyncio.run(service.get_surah(1, "en.sahih", 8))["data"]["ayahs"] == []
+
+    juz = asyncio.run(service.get_juz(30, "en.sahih", 1, 2, {"surah", "numberInSurah"}))["data"]
+    assert [(ayah["surah"]["number"], ayah["numberInSurah"]) for ayah in juz["ayahs"]] == [(78, 1), (78, 2)]
+    assert list(juz["surahs"]) == ["78"]
+    assert asyncio.run(service.get_juz(30, "en.sahih", 600))["data"]["surahs"] == {}
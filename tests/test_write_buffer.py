@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+import write_buffer
+from write_buffer import BufferFull, WriteBehindBuffer
+
+
+class FakeCollection:
+    """insert_many with unique _ids, plus scripted outages"""
+
+    def __init__(self):
+        self.docs = {}
+        self.outages = 0
+
+    async def insert_many(self, docs, ordered=True):
+        if self.outages:
+            self.outages -= 1
+            raise AutoReconnect("connection refused")
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["_id"] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+            elif "bad" in doc:
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            else:
+                self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(write_buffer, "get_database", lambda: {"history": collection})
+    return collection
+
+
+def make_buffer(batch_size=10, max_pending=100):
+    return WriteBehindBuffer("history", batch_size=batch_size, flush_interval=60, max_pending=max_pending)
+
+
+def test_flush_writes_in_batches_and_calls_hooks(collection):
+    buffer, flushed = make_buffer(batch_size=2), []
+
+    async def hook(docs):
+        flushed.append([doc["_id"] for doc in docs])
+
+    buffer.on_flush.append(hook)
+    buffer.add([{"_id": i} for i in range(3)])
+    assert asyncio.run(buffer.flush())
+    assert asyncio.run(buffer.flush())
+    assert flushed == [[0, 1], [2]]
+    assert sorted(collection.docs) == [0, 1, 2]
+
+
+def test_failed_flush_requeues_the_batch_in_order(collection):
+    buffer = make_buffer(batch_size=2)
+    buffer.add([{"_id": i} for i in range(3)])
+    collection.outages = 1
+    assert not asyncio.run(buffer.flush())
+    assert [doc["_id"] for doc in buffer._pending] == [0, 1, 2]
+    assert buffer.stats()["errors"] == 1
+
+    asyncio.run(buffer.close())
+    assert sorted(collection.docs) == [0, 1, 2]
+    assert buffer.stats()["pending"] == 0
+
+
+def test_duplicates_are_skipped_and_not_passed_to_hooks(collection):
+    buffer, flushed = make_buffer(), []
+
+    async def hook(docs):
+        flushed.extend(doc["_id"] for doc in docs)
+
+    buffer.on_flush.append(hook)
+    collection.docs["a"] = {"_id": "a"}
+    buffer.add([{"_id": "a"}, {"_id": "b"}, {"_id": "c", "bad": True}])
+    assert asyncio.run(buffer.flush())
+    assert flushed == ["b"]
+    stats = buffer.stats()
+    assert (stats["duplicates"], stats["written"], stats["errors"], stats["pending"]) == (1, 1, 1, 0)
+
+
+def test_full_buffer_rejects_the_whole_batch(collection):
+    buffer = make_buffer(max_pending=3)
+    buffer.add([{"_id": 1}, {"_id": 2}])
+    with pytest.raises(BufferFull):
+        buffer.add([{"_id": 3}, {"_id": 4}])
+    assert [doc["_id"] for doc in buffer._pending] == [1, 2]
+    assert buffer.stats()["rejected"] == 2
+    buffer.add([{"_id": 3}])
+
+
+def test_close_gives_up_while_the_database_is_down(collection, caplog):
+    buffer = make_buffer()
+    buffer.add([{"_id": 1}])
+    collection.outages = 5
+    asyncio.run(buffer.close())
+    assert "Dropping 1 unwritten history documents" in caplog.text